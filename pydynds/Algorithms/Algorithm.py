@@ -3,29 +3,44 @@ from multiprocessing import Event
 from common.SimulatorMessages import ViewUpdateRequest
 from common.pydyndsProcess import pydyndsProcess
 from common.SimulatorMessages import request_messages
+from common.Channel import get_request
 from common import Message
+from common.Computation import Computation
+from common.History import EventHistory
+from common.ResultCache import result_key
+from common.IDGenerator import IDGenerator
 
 __author__ = 'Victor Szczepanski'
 
 import queue
-from threading import Thread, RLock
-import copy
+from threading import RLock
 import time
+from contextlib import ContextDecorator
 
 
 
 class Algorithm(pydyndsProcess):
     """
     This class should be inherited from to allow factory-like construction of Algorithms.
-    When a new Algorithm is added to PyDynDS, add its name to the __new__ constructor.
+    When a new Algorithm is added to PyDynDS, make it discoverable by Algorithms.Registry: register it as an entry
+    point, or add its module with Registry.register_module.
 
-    The pausing feature, weakly provided by pydyndsProcess, is implemented during the sendMessage and doComputation
-    functions by acquiring a shared lock.
+    Pausing is provided by pydyndsProcess: an Algorithm waits at its pause_lock, a PauseGate, in send_message,
+    do_computation, and at each step of run, so a paused Algorithm stops at its next message, computation, or step.
+
+    An Algorithm with a result_cache calls solved when it has solved its current view of the DCOP, and the result is
+    stored under a key of the view, the Algorithm's name and version, and its cache_parameters. With reuse_results,
+    an Algorithm whose new view has a cached result applies it with reuse_result instead of running on the view.
     """
+
+    version = 1 #Increase when a change to the algorithm changes its results, so cached results are not reused.
+
     def __init__(self, algorithm_input_queue=None, algorithm_output_queue=None,
                  simulator_input_queue=None, simulator_output_queue=None, model_input_queue=None,
                  model_output_queue=None, simulator_message_event=None, model_message_event=None,
-                 controller_message_event=None, initialDCOP=None):
+                 controller_message_event=None, initialDCOP=None, instrument=False, profile_dir=None, barrier=None,
+                 history_size=1000, history_path=None, metrics=None, result_cache=None, reuse_results=False,
+                 work_event=None, message_id_counter=None, computation_id_counter=None):
         """
         :param algorithm_input_queue: a multiprocessing.Queue used for receiving control requests from controller.
         :param algorithm_output_queue: a multiprocessing.Queue used for responding to requests from controller.
@@ -37,9 +52,30 @@ class Algorithm(pydyndsProcess):
         :param model_message_event: a multiprocessing.Event used to notify the algorithm that a new request is pending.
         :param controller_message_event: a multiprocessing.Event used to notify the algorithm that a new request is pending.
         :param initialDCOP: the initial state of the DynDCOP.
+        :param instrument: if True, the latency of the view update round trip to the simulator is recorded on
+        channel 'view_update'.
+        :param profile_dir: if not None, the Algorithm's threads are profiled, and their profiles written to this
+        directory.
+        :param barrier: if not None, the Algorithm runs in lockstep mode with the Model and Simulator,
+        one iteration of run per cycle.
+        :param history_size: the number of recent messages and computations kept in memory in `history`.
+        0 keeps only the counters in `stats`.
+        :param history_path: if not None, messages and computations pushed out of `history` are spilled to this file,
+        and can be read back with common.History.read_history. Otherwise they are discarded.
+        :param metrics: if not None, a common.Metrics.SharedMetrics the Algorithm updates in place as it sends messages
+        and does computations.
+        :param result_cache: if not None, a common.ResultCache.ResultCache the Algorithm stores its results in.
+        :param reuse_results: if True, the Algorithm reuses results from result_cache instead of solving a view again.
+        :param work_event: if not None, a multiprocessing.Event the Algorithm sets whenever it has new messages or
+        computations for the Model, so the Model can sleep until then.
+        :param message_id_counter: if not None, a counter from common.IDGenerator.make_counter, shared with the Model
+        and the other Algorithms of a portfolio. The Algorithm assigns each message an ID from it when it is sent.
+        Otherwise, the Model assigns the ID when it reads the message.
+        :param computation_id_counter: as message_id_counter, for computation IDs.
         :return:
         """
-        super().__init__(algorithm_input_queue, algorithm_output_queue, controller_message_event)
+        super().__init__(algorithm_input_queue, algorithm_output_queue, controller_message_event, instrument, profile_dir,
+                         barrier)
         self._DCOP_view = initialDCOP
 
         self._simulator_input_queue = simulator_input_queue
@@ -49,6 +85,10 @@ class Algorithm(pydyndsProcess):
         self._model_input_queue = model_input_queue
         self._model_output_queue = model_output_queue
         self._model_message_event = model_message_event #Used to receive notifications from model that there is a request in model_control_input_queue.
+        self._work_event = work_event
+        #IDs are taken from the shared counters in blocks, so sending a message rarely touches a shared lock.
+        self._messageIDs = IDGenerator(message_id_counter) if message_id_counter is not None else None
+        self._computationIDs = IDGenerator(computation_id_counter) if computation_id_counter is not None else None
 
         self.running = False
         self.done = False
@@ -57,39 +97,66 @@ class Algorithm(pydyndsProcess):
 
         self.stats_lock = RLock()
 
+        #The full history of messages and computations is not part of stats, so stats stay small as a run grows.
+        #Messages in unread_messages are only held until the Model reads them.
+        self.history = EventHistory(history_size, history_path)
+        self.metrics = metrics
+
+        self.result_cache = result_cache
+        self.reuse_results = reuse_results
+        self._keyed_view = None #The view _view_key was computed for.
+        self._view_key = None
+        self._view_start = None #The totals of the stats when the view was keyed.
+        self._view_reused = False
+
         #stats are made available through a dictionary, since namedtuples are not pickleable.
-        self.stats = {'total_messages': 0, 'total_computations': 0, 'last_message': None, 'last_computation': None,
-                      'unread_messages': [], 'unread_computations': []}
+        #current_cost is the cost of the Algorithm's current assignment, as last reported with report_cost.
+        #view_reused is True while the Algorithm waits for a new view after reusing a cached result for its view.
+        #last_message and last_computation only summarize the last message and computation, so stats stay cheap to copy.
+        self.stats = {'total_messages': 0, 'total_computations': 0, 'total_operations': 0, 'last_message': None,
+                      'last_computation': None, 'unread_messages': [], 'unread_computations': [], 'current_cost': None,
+                      'reused_results': 0, 'view_reused': False}
 
         #Start thread to handle incoming requests from model
-        self.model_request_thread = Thread(target=self.model_request_handler)
+        self.model_request_thread = self._make_thread(self.model_request_handler)
         self.model_request_thread.start()
 
-        self.simulation_thread = Thread(target=self.run)
+        self.simulation_thread = self._make_thread(self.run)
 
     @staticmethod
     def factory(desc, *args, **kwargs):
-        subclass_names = {subclass.__name__: subclass for subclass in Algorithm.__subclasses__()}
-        if desc in subclass_names:
-            return subclass_names[desc](*args, **kwargs)
+        """
+        Constructs the algorithm named `desc`. Algorithms are found with Algorithms.Registry, which imports an
+        algorithm's module only when it is selected.
+        :param desc: the name of the algorithm.
+        :return: the new Algorithm.
+        """
+        from Algorithms.Registry import get_algorithm_class
+        algorithm_class = get_algorithm_class(desc)
+        if algorithm_class is not None:
+            return algorithm_class(*args, **kwargs)
         raise NotImplementedError("The provided class name is not a subclass of Algorithm.")
 
     def model_request_handler(self):
         """
         Handles waiting for requests on the model i/o queues.Intended to be run in a thread.
 
-        Accepted request types are request_messages['STATS'].
+        Accepted request types are request_messages['STATS'] and request_messages['CHECKPOINT'], which the Model sends
+        between two updates for a consistent checkpoint.
 
         May implement dependency injection if needed.
         :return:
         """
         while not self._stop:
             try:
-                if not self._model_message_event.wait(1):  # Wait for 1 second for a request from model
-                    continue
-                request = self._model_input_queue.get(block=False)
+                #Block on the queue itself, waking every second to check for a stop.
+                request, waiters = get_request(self._model_input_queue, timeout=1)
                 if request is request_messages['STATS']:
-                    self._model_output_queue.put(self.get_stats())
+                    stats = self.get_stats(clear_unread=True)
+                    for _ in range(waiters): #Coalesced requests are answered with the same stats.
+                        self._model_output_queue.put(stats)
+                elif request is request_messages['CHECKPOINT']:
+                    self._model_output_queue.put(self.get_checkpoint_state())
                 else:
                     raise ValueError("Model request " + str(request) + " not valid.")
             except queue.Empty:
@@ -100,8 +167,9 @@ class Algorithm(pydyndsProcess):
         Stops the simulation thread and prepares it for a new run (as if it has never been run before).
         :return:
         """
-        print("Stopping Algorithm.")
+        self.log.debug("Stopping Algorithm.")
         self.done = True
+        self.history.close()
 
     def end(self):
         """
@@ -128,27 +196,119 @@ class Algorithm(pydyndsProcess):
         See the ActivityDiagram for a visual description of this function's behaviour.
         :return:
         """
-        print("Start of Algorithm run.")
-        #TODO: Replace boolean exit flags with events that pydyndsProcess can signal.
+        self.log.debug("Start of Algorithm run.")
+        if self.barrier is not None:
+            self._lockstep_run()
+            return
+
+        #pre_stop sets done and releases pause_lock, so the loop ends at the next iteration.
         while not self.done:
-            print("Algorithm running!")
-            #check that we still have a valid DCOP instance and perform any pre-processing.
-            with self.pause_lock:
-                if not self.run_setup():
-                    return
+            if not self._run_once():
+                return
 
-            #request update from simulator
-            with self.pause_lock:
-                self.ready()
+        self.log.debug("Exiting Algorithm run...")
 
-            #actually run the algorithm
+    def _run_once(self):
+        """
+        A single iteration of run: setup, view update, Run, and teardown.
+        :return bool: False if the current view of the DCOP is not valid, and the algorithm is done. Else True.
+        """
+        self.cycle_log.debug("Algorithm running!")
+        #check that we still have a valid DCOP instance and perform any pre-processing.
+        with self.pause_lock:
+            if not self.run_setup():
+                return False
+
+        #request update from simulator
+        #Outside lockstep mode, an Algorithm idle on a reused result sleeps until the Simulator has a new view.
+        with self.pause_lock:
+            self.ready(wait_for_change=self._view_reused and self.barrier is None)
+            if self.result_cache is not None and self._view_changed():
+                self._key_view()
+
+        #actually run the algorithm, unless a cached result was reused for this view
+        if not self._view_reused:
             self.Run()
 
-            #any post-processing the algorithm needs before next run.
-            with self.pause_lock:
-                self.run_teardown()
+        #any post-processing the algorithm needs before next run.
+        with self.pause_lock:
+            self.run_teardown()
+        return True
+
+    def lockstep_cycle(self):
+        """
+        Overrides pydyndsProcess.lockstep_cycle. One iteration of run is one round of the algorithm.
+        An algorithm that is done still waits on the barrier, so the Model and Simulator can keep stepping.
+        :return:
+        """
+        self.barrier.wait() #Cycle start: the Simulator's view is up to date.
+        if not self.done:
+            self._run_once()
+        self.barrier.wait() #Algorithm's round is done.
+
+    def _view_changed(self):
+        """
+        :return: True if the view is not the one the result cache key was last computed for.
+        Views are copied through the Simulator's queue, so they are compared by start cycle, which identifies a DCOP
+        within its DynDCOP and is cheap to compare however large the DCOP is.
+        """
+        return self._keyed_view is None or _start_cycle(self._DCOP_view) != _start_cycle(self._keyed_view)
+
+    def _key_view(self):
+        """
+        Computes the result cache key of the current view, and reuses its cached result if configured to.
+        :return:
+        """
+        self._keyed_view = self._DCOP_view
+        self._view_key = result_key(self._DCOP_view, type(self).__name__, self.version, self.cache_parameters())
+        with self.stats_lock:
+            self._view_start = (self.stats['total_messages'], self.stats['total_computations'],
+                                self.stats['total_operations'])
+        result = self.result_cache.get(self._view_key) if self.reuse_results else None
+        self._view_reused = result is not None
+        with self.stats_lock:
+            self.stats['view_reused'] = self._view_reused
+            if self._view_reused:
+                self.stats['reused_results'] = self.stats.get('reused_results', 0) + 1
+        if self._view_reused:
+            self.reuse_result(result)
+            self._notify_work() #So the Model sees the Algorithm is idle until the next DCOP.
 
-        print("Exiting Algorithm run...")
+    def cache_parameters(self):
+        """
+        Users should reimplement this function if their algorithm has parameters that change its results.
+        :return: a dict of the parameters that change this algorithm's results. Part of the key of cached results.
+        """
+        return {}
+
+    def solved(self, solution=None, cost=None):
+        """
+        Records that the Algorithm has solved its current view. If it has a result_cache, the solution, its cost, and
+        the messages, computations, and operations spent on the view are stored in the cache.
+        :param solution: the solution, e.g. a dict of variable names to values. Must be picklable.
+        :param cost: the cost of the solution. If not None, it is also reported with report_cost.
+        :return:
+        """
+        if cost is not None:
+            self.report_cost(cost)
+        if self.result_cache is None or self._view_key is None or self._view_reused:
+            return
+        with self.stats_lock:
+            messages, computations, operations = self._view_start
+            result = {'solution': solution, 'cost': self.stats['current_cost'],
+                      'messages': self.stats['total_messages'] - messages,
+                      'computations': self.stats['total_computations'] - computations,
+                      'operations': self.stats['total_operations'] - operations}
+        self.result_cache.put(self._view_key, result)
+
+    def reuse_result(self, result):
+        """
+        Applies a cached result to the Algorithm, instead of running on its current view.
+        Users should reimplement this function to adopt result['solution'] as their agents' assignment.
+        :param result: a result stored by solved.
+        :return:
+        """
+        self.report_cost(result['cost'])
 
     def run_setup(self):
         """
@@ -172,7 +332,7 @@ class Algorithm(pydyndsProcess):
         """
         pass
 
-    def _send_message(self, source, destination, data=None):
+    def _send_message(self, source, destination, data=None, size=None):
         """
         Represents sending a message from source node `source` to destination node `destination`.
         Constructs a Message to store in various stats.
@@ -182,15 +342,23 @@ class Algorithm(pydyndsProcess):
         :param source:
         :param destination:
         :param data:
-        :return:
+        :param size: the size of data in bytes. If None, it is estimated without serializing data.
+        :return new_message: the recorded Message.
         """
-        new_message = Message.Message(source, destination, data)
+        new_message = Message.Message(source, destination, data, size)
+        if self._messageIDs is not None:
+            new_message.id = self._messageIDs.nextID()
         with self.stats_lock:
             self.stats['total_messages'] += 1
-            self.stats['last_message'] = new_message
+            self.stats['last_message'] = {'id': new_message.id, 'size': new_message.size}
             self.stats['unread_messages'].append(new_message)
+        self.history.append_message(new_message) #Outside stats_lock, since spilling pickles the message's data.
+        self._notify_work()
+        if self.metrics is not None:
+            self.metrics.add('algorithm_messages')
+        return new_message
 
-    def send_message(self, source, destination, data=None):
+    def send_message(self, source, destination, data=None, size=None):
         """
         Represents sending a message from source node `source` to destination node `destination`.
         Constructs a Message to store in various stats.
@@ -198,10 +366,81 @@ class Algorithm(pydyndsProcess):
         In a true algorithm, the message would actually move from the source to the destination.
         :param source:
         :param destination:
+        :param size: the size of data in bytes, if the caller knows it. If None, it is estimated.
         :return new_message: the Message to be sent to the destination.
         """
         with self.pause_lock:
-            return self.send_message(source, destination, data)
+            return self._send_message(source, destination, data, size)
+
+    def _do_computation(self, computation):
+        """
+        Records a computation done by one of the algorithm's agents in various stats.
+
+        Inheriting classes may reimplement this function to define special behaviour.
+        The do_computation function and computation context are preferred in the API.
+        :param computation: the Computation.
+        :return:
+        """
+        if self._computationIDs is not None and computation.id is None:
+            computation.id = self._computationIDs.nextID()
+        with self.stats_lock:
+            self.stats['total_computations'] += 1
+            self.stats['total_operations'] += computation.operations
+            self.stats['last_computation'] = {'id': computation.id, 'operations': computation.operations,
+                                              'cpu_time': computation.cpu_time}
+            self.stats['unread_computations'].append(computation)
+        self.history.append_computation(computation)
+        self._notify_work()
+        if self.metrics is not None:
+            self.metrics.add('algorithm_computations')
+
+    def _notify_work(self):
+        if self._work_event is not None:
+            self._work_event.set()
+
+    def do_computation(self, agent, data=None, operations=0, cpu_time=0.0):
+        """
+        Records a computation done by agent `agent`, whose cost the caller measured itself.
+        Use the computation context to measure the cost instead.
+        :param agent: the agent that did the computation.
+        :param data: optional data describing the computation.
+        :param operations: the number of operations (e.g. constraint checks) the computation did.
+        :param cpu_time: the thread CPU time, in seconds, the computation took.
+        :return new_computation: the recorded Computation.
+        """
+        new_computation = Computation(agent, data, operations, cpu_time)
+        with self.pause_lock:
+            self._do_computation(new_computation)
+        return new_computation
+
+    def computation(self, agent, data=None):
+        """
+        Measures a computation done by agent `agent`, and records it when it ends. Usable as a context manager:
+
+            with self.computation('v1') as c:
+                for value in domain:
+                    c.count() # One constraint check.
+
+        or as a decorator of a function whose every call is one computation:
+
+            @algorithm.computation('v1')
+            def compute(): ...
+
+        The thread CPU time of the computation is measured. Operations are counted by calling count on the context.
+        :param agent: the agent that does the computation.
+        :param data: optional data describing the computation.
+        :return: the computation context.
+        """
+        return _ComputationContext(self, agent, data)
+
+    def report_cost(self, cost):
+        """
+        Records the cost of the Algorithm's current assignment, so the Model can include it in its per-cycle results.
+        :param cost: the cost of the current assignment.
+        :return:
+        """
+        with self.stats_lock:
+            self.stats['current_cost'] = cost
 
     def check_input(self):
         """
@@ -210,44 +449,137 @@ class Algorithm(pydyndsProcess):
         """
         return self._DCOP_view is not None
 
-    def get_stats(self):
+    def get_stats(self, clear_unread=False):
         """
         returns a copy of this algorithm's current stats.
+        The unread messages and computations are not copied themselves, only the lists holding them.
+        :param clear_unread: if True, the unread messages and computations are handed off to the caller, and the
+        Algorithm starts new lists. The Model uses this to read each message and computation exactly once.
         :return:
         """
         with self.stats_lock:
-            stats = copy.deepcopy(self.stats)
+            stats = dict(self.stats) #Every other value is replaced, never changed in place, so it can be shared.
+            if clear_unread:
+                self.stats['unread_messages'] = []
+                self.stats['unread_computations'] = []
+            else:
+                stats['unread_messages'] = list(stats['unread_messages'])
+                stats['unread_computations'] = list(stats['unread_computations'])
         return stats
 
+    def get_agent_state(self):
+        """
+        Returns any state the algorithm's agents keep between runs, so it can be saved in a checkpoint.
+        Users should reimplement this function if their algorithm is not stateless. The returned object must be picklable.
+        :return:
+        """
+        return None
+
+    def set_agent_state(self, agent_state):
+        """
+        Restores agent state returned by get_agent_state.
+        Users should reimplement this function together with get_agent_state.
+        :param agent_state:
+        :return:
+        """
+        pass
+
+    def get_checkpoint_state(self):
+        """
+        Overrides pydyndsProcess.get_checkpoint_state.
+        Pending (unread) messages and computations are included in the stats.
+        :return state: a dict of the Algorithm's stats, agent state, and current view of the DCOP.
+        """
+        return {'stats': self.get_stats(), 'agent_state': self.get_agent_state(), 'dcop_view': self._DCOP_view}
+
+    def restore_checkpoint_state(self, state):
+        """
+        Overrides pydyndsProcess.restore_checkpoint_state.
+        :param state: a dict as returned by get_checkpoint_state.
+        :return:
+        """
+        with self.stats_lock:
+            self.stats = state['stats']
+        self.set_agent_state(state['agent_state'])
+        self._DCOP_view = state['dcop_view']
+
     def _special_control(self, request):
         """
         Provided for other processes to have access to this Algorithm's stats. Intended to be run in a separate thread.
         :return:
         """
         if request is request_messages['STATS']:
-            print("Got STATS request in Algorithm.")
             self._output_queue.put(self.get_stats())
-            print("Successfully copied stats!")
             return True
         return False
 
-    def ready(self):
+    def ready(self, wait_for_change=False):
         """
         Requests the current view of the Model from the Simulator and updates the Algorithm's view.
+        :param wait_for_change: if True, the Simulator answers once its view differs from the last one it sent.
+        :return:
+        """
+        #TODO: Handle errors more transparently.
+        with self.instrumentation.timed('view_update', self._simulator_input_queue):
+            try:
+                self._simulator_input_queue.put(ViewUpdateRequest(wait_for_change=wait_for_change))
+                self._simulator_message_event.set()
+            except Exception:
+                self.log.exception("Could not send view update request to simulator.")
+
+            # Block waiting on response from simulator, waking every second to check for a stop.
+            while not self._stop and not self.done:
+                try:
+                    self._DCOP_view = self._simulator_output_queue.get(timeout=1)
+                    return
+                except queue.Empty:
+                    continue
+                except Exception:
+                    self.log.exception("Could not read view update from simulator.")
+                    return
+
+
+def _start_cycle(view):
+    """
+    :return: the cycle at which `view`, a snapshot dict or a DCOP.DCOP, becomes the current DCOP of its DynDCOP.
+    """
+    if isinstance(view, dict):
+        return view.get('start_cycle')
+    return getattr(view, 'start_cycle', None)
+
+
+class _ComputationContext(ContextDecorator):
+    """
+    Measures the thread CPU time and operation count of one computation, and records it with the Algorithm on exit.
+    """
+
+    def __init__(self, algorithm, agent, data=None):
+        self.algorithm = algorithm
+        self.agent = agent
+        self.data = data
+        self.operations = 0
+        self._start = None
+
+    def _recreate_cm(self):
+        #Each call of a decorated function is a separate computation.
+        return _ComputationContext(self.algorithm, self.agent, self.data)
+
+    def count(self, operations=1):
+        """
+        Counts operations (e.g. constraint checks) done by the computation.
+        :param operations: the number of operations to add.
         :return:
         """
-        #TODO: Handle errors more transparently, and do not block indefinetly.
-        try:
-            self._simulator_input_queue.put(ViewUpdateRequest())
-            self._simulator_message_event.set()
-        except Exception as e:
-            print(e)
+        self.operations += operations
 
-        # Block waiting on response from simulator.
-        try:
-            self._DCOP_view = self._simulator_output_queue.get()
-        except Exception as e:
-            print(e)
+    def __enter__(self):
+        self._start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        cpu_time = time.thread_time() - self._start
+        self.algorithm.do_computation(self.agent, self.data, self.operations, cpu_time)
+        return False
 
 
 class SampleAlgorithm(Algorithm):
@@ -258,11 +590,15 @@ class SampleAlgorithm(Algorithm):
     def __init__(self, algorithm_input_queue=None, algorithm_output_queue=None,
                  simulator_input_queue=None, simulator_output_queue=None, model_input_queue=None,
                  model_output_queue=None, simulator_message_event=None, model_message_event=None,
-                 controller_message_event=None, initialDCOP=None):
+                 controller_message_event=None, initialDCOP=None, instrument=False, profile_dir=None, barrier=None,
+                 history_size=1000, history_path=None, metrics=None, result_cache=None, reuse_results=False,
+                 work_event=None, message_id_counter=None, computation_id_counter=None):
 
         super().__init__(algorithm_input_queue, algorithm_output_queue, simulator_input_queue,
                          simulator_output_queue, model_input_queue, model_output_queue, simulator_message_event,
-                         model_message_event, controller_message_event, initialDCOP)
+                         model_message_event, controller_message_event, initialDCOP, instrument, profile_dir,
+                         barrier, history_size, history_path, metrics, result_cache, reuse_results, work_event,
+                         message_id_counter, computation_id_counter)
 
     def preprocessing(self):
         """
@@ -271,9 +607,7 @@ class SampleAlgorithm(Algorithm):
         Users may reimplement this function.
         :return:
         """
-        print("Preprocessing...")
-        print("Done.")
-        pass
+        self.log.debug("Preprocessing...")
 
     def Run(self):
         """
@@ -281,9 +615,14 @@ class SampleAlgorithm(Algorithm):
         Users should override this function to implement new algorithms.
         :return:
         """
-        print("Beginning SampleAlgorithm...")
-        #Since this is a sample, we will just send one message.
-        self.send_message('v1','v2', [[1,2,3],[4,5,6],[7,8,9]])
+        self.cycle_log.debug("Beginning SampleAlgorithm...")
+        #Since this is a sample, we will just do one computation and send one message.
+        table = [[1,2,3],[4,5,6],[7,8,9]]
+        with self.computation('v1') as computation:
+            for row in table:
+                computation.count(len(row))
+        self.send_message('v1','v2', table)
+        self.solved()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import importlib
+import os
+from threading import RLock
+
+from Algorithms.Algorithm import Algorithm
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Lazy discovery of Algorithm classes by name, used by Algorithm.factory.
+
+Algorithms are found, in order, among:
+    1. algorithms registered with register, as 'module:ClassName' specs.
+    2. entry points in the ENTRY_POINT_GROUP group of installed packages, e.g. in a package's setup.py:
+           entry_points={'pydynds.algorithms': ['MyAlgorithm = my_package.my_module:MyAlgorithm']}
+    3. subclasses, at any depth, of Algorithm that are already imported.
+    4. subclasses of Algorithm in the configured modules: those added with register_module, and those listed in the
+       PYDYNDS_ALGORITHM_MODULES environment variable, separated by commas.
+
+A module is only imported when an algorithm is looked up and not found in an earlier source, so startup does not pay
+for every algorithm in the library. Found classes are cached by name.
+"""
+
+ENTRY_POINT_GROUP = 'pydynds.algorithms'
+MODULES_ENVIRONMENT_VARIABLE = 'PYDYNDS_ALGORITHM_MODULES'
+
+_lock = RLock()
+_cache = {}
+_specs = {}
+_modules = []
+
+
+def register(name, spec):
+    """
+    Registers an algorithm without importing it.
+    :param name: the name the algorithm is selected by.
+    :param spec: 'module:ClassName', where module is importable.
+    :return:
+    """
+    with _lock:
+        _specs[name] = spec
+        _cache.pop(name, None)
+
+
+def register_module(module_name):
+    """
+    Adds a module to search for Algorithm subclasses. The module is imported only if an algorithm is not found elsewhere.
+    :param module_name: the importable name of the module.
+    :return:
+    """
+    with _lock:
+        if module_name not in _modules:
+            _modules.append(module_name)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def _load_spec(spec):
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _entry_point(name):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return None
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP, name=name)
+    except TypeError: #Python < 3.10 does not support selection.
+        found = [entry_point for entry_point in entry_points().get(ENTRY_POINT_GROUP, ()) if entry_point.name == name]
+    for entry_point in found:
+        return entry_point
+    return None
+
+
+def _subclass(name):
+    """
+    :return: the imported subclass of Algorithm, at any depth, named `name`, or None.
+    """
+    pending = list(Algorithm.__subclasses__())
+    while pending:
+        subclass = pending.pop()
+        if subclass.__name__ == name:
+            return subclass
+        pending.extend(subclass.__subclasses__())
+    return None
+
+
+def _configured_modules():
+    configured = os.environ.get(MODULES_ENVIRONMENT_VARIABLE, '')
+    return _modules + [module_name.strip() for module_name in configured.split(',') if module_name.strip()]
+
+
+def _find(name):
+    if name in _specs:
+        return _load_spec(_specs[name])
+    entry_point = _entry_point(name)
+    if entry_point is not None:
+        return entry_point.load()
+    subclass = _subclass(name)
+    if subclass is not None:
+        return subclass
+    for module_name in _configured_modules():
+        importlib.import_module(module_name)
+        subclass = _subclass(name)
+        if subclass is not None:
+            return subclass
+    return None
+
+
+def get_algorithm_class(name):
+    """
+    Finds the Algorithm class named `name`, importing its module if needed.
+    :param name: the name of the algorithm.
+    :return: the class, or None if no algorithm is named `name`.
+    """
+    with _lock:
+        if name not in _cache:
+            algorithm_class = _find(name)
+            if algorithm_class is None:
+                return None
+            if not (isinstance(algorithm_class, type) and issubclass(algorithm_class, Algorithm)):
+                raise TypeError(str(name) + " does not name a subclass of Algorithm: " + str(algorithm_class))
+            _cache[name] = algorithm_class
+        return _cache[name]
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import queue
+import time
+
+from SimulationController import SimulationController, ResponseTimeout
+from common.SimulatorMessages import request_messages, StepRequest
+from common.Checkpoint import write_checkpoint, read_checkpoint
+from common.Channel import BoundedChannel
+
+__author__ = 'Victor Szczepanski'
+
+"""
+An asyncio interface to a SimulationController, so one event loop can drive many simulations at once.
+"""
+
+
+class AsyncSimulationController(object):
+    """
+    Wraps a SimulationController with awaitable operations.
+
+    Responses from the components are polled from their queues without blocking the event loop, so no thread is
+    used per simulation. Every operation takes a timeout, in seconds, after which it raises ResponseTimeout, and may be
+    cancelled. A response that arrives after its operation timed out or was cancelled is discarded, so later
+    operations still receive their own responses.
+
+    Timing out or cancelling an operation only stops waiting for it: the components still complete the request.
+    setup and stop construct and join threads, and are run in the event loop's default executor.
+    """
+
+    poll_interval = 0.001 #Seconds between the first polls of a response queue.
+    max_poll_interval = 0.05 #The poll interval backs off to this while waiting.
+
+    def __init__(self, log_level=logging.INFO, channel_capacity=16, channel_policy=BoundedChannel.policies.COALESCE,
+                 default_timeout=None):
+        """
+        :param default_timeout: the timeout of operations called without one. None waits forever.
+        See SimulationController for the other parameters.
+        """
+        self.controller = SimulationController(log_level, channel_capacity, channel_policy)
+        self.default_timeout = default_timeout
+
+    @property
+    def current_state(self):
+        return self.controller.current_state
+
+    @property
+    def metrics(self):
+        return self.controller.metrics
+
+    def _deadline(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return timeout, None if timeout is None else time.monotonic() + timeout
+
+    async def _receive(self, output_queue, timeout, deadline):
+        interval = self.poll_interval
+        while True:
+            try:
+                response = output_queue.get_nowait()
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise ResponseTimeout("No response from a component within " + str(timeout) + " seconds.")
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+                continue
+            if not self.controller.take_stale_response(output_queue, response):
+                return response
+
+    async def _receive_all(self, output_queues, timeout=None, acknowledgement=False):
+        """
+        Awaits one response from each queue. On timeout or cancellation, the responses still to arrive are discarded
+        when they do.
+        :param acknowledgement: True if the responses are acknowledgements (SUCCESS).
+        :return: the responses, in the order of output_queues.
+        """
+        timeout, deadline = self._deadline(timeout)
+        responses = []
+        try:
+            for output_queue in output_queues:
+                responses.append(await self._receive(output_queue, timeout, deadline))
+        except BaseException:
+            self.controller.abandon_responses(output_queues[len(responses):], acknowledgement)
+            raise
+        return responses
+
+    async def _in_executor(self, function, timeout, *args, **kwargs):
+        timeout, _ = self._deadline(timeout)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, lambda: function(*args, **kwargs)), timeout)
+        except asyncio.TimeoutError:
+            raise ResponseTimeout("Operation did not finish within " + str(timeout) + " seconds.")
+
+    async def setup(self, *args, timeout=None, **kwargs):
+        """
+        See SimulationController.setup.
+        """
+        return await self._in_executor(self.controller.setup, timeout, *args, **kwargs)
+
+    async def start(self, timeout=None):
+        """
+        See SimulationController.start.
+        """
+        if self.controller.current_state is not SimulationController.states.SETUP:
+            return self.controller.start() #Raises InvalidState.
+        await self._receive_all(self.controller.send_request(request_messages['START']), timeout, True)
+        self.controller._started()
+
+    async def step(self, cycles=1, timeout=None):
+        """
+        See SimulationController.step.
+        """
+        self.controller._check_step()
+        if cycles <= 0:
+            return
+        await self._receive_all(self.controller.send_request(StepRequest(cycles)), timeout, True)
+
+    async def get_current_stats(self, timeout=None):
+        """
+        See SimulationController.get_current_stats.
+        """
+        output_queues = self.controller._send_stats_requests()
+        return self.controller._make_stats(await self._receive_all(output_queues, timeout))
+
+    async def checkpoint(self, path, timeout=None):
+        """
+        See SimulationController.checkpoint.
+        """
+        self.controller._check_checkpoint()
+        running = self.controller.current_state is SimulationController.states.RUNNING
+        if running:
+            await self.pause(timeout)
+        try:
+            states = (await self._receive_all(self.controller.send_request(request_messages['CHECKPOINT'], ('model',)),
+                                              timeout))[0]
+            write_checkpoint(path, self.controller._checkpoint_sections(states))
+        finally:
+            if running:
+                await self.resume(timeout)
+
+    async def restore(self, path, timeout=None):
+        """
+        See SimulationController.restore.
+        """
+        self.controller._check_restore()
+        sections = read_checkpoint(path)
+        if self.controller.current_state is SimulationController.states.STOPPED:
+            await self.setup(timeout=timeout, **sections['controller'])
+        await self._receive_all(self.controller._send_restore_requests(sections), timeout, True)
+
+    async def pause(self, timeout=None):
+        """
+        See SimulationController.pause.
+        """
+        self.controller._check_pause()
+        await self._receive_all(self.controller.send_request(request_messages['PAUSE']), timeout, True)
+        self.controller._paused()
+
+    async def resume(self, timeout=None):
+        """
+        See SimulationController.resume.
+        """
+        self.controller._check_resume()
+        await self._receive_all(self.controller.send_request(request_messages['RESUME']), timeout, True)
+        self.controller._resumed()
+
+    async def stop(self, timeout=None):
+        """
+        See SimulationController.stop.
+        """
+        return await self._in_executor(self.controller.stop, timeout)
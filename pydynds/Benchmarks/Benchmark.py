@@ -0,0 +1,222 @@
+from multiprocessing import Queue, Event
+import argparse
+import json
+import platform
+import queue
+import sys
+import time
+from threading import Thread
+
+from Algorithms.Algorithm import Algorithm, SampleAlgorithm
+from Model.Model import Model
+from common.SimulatorMessages import request_messages
+from Benchmarks.Generators import generators
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Benchmarks for PyDynDS. Run from the pydynds directory:
+
+    python -m Benchmarks.Benchmark --sizes 10 1000 100000 --output results.json
+
+Every benchmark result is a dict with the benchmark name, its parameters, and its measurements, so results from
+different versions can be compared by a script.
+"""
+
+BENCHMARK_FORMAT_VERSION = 1
+
+
+class _ViewServer(object):
+    """
+    Answers ViewUpdateRequests from an Algorithm with a fixed view, in place of a Simulator.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.input_queue = Queue()
+        self.output_queue = Queue()
+        self.message_event = Event()
+        self._stop = False
+        self._thread = Thread(target=self._serve)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop:
+            try:
+                self.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.output_queue.put(self.view)
+
+    def stop(self):
+        self._stop = True
+        self._thread.join()
+
+
+def _make_algorithm(view, view_server):
+    kwargs = {'simulator_message_event': view_server.message_event, 'simulator_input_queue': view_server.input_queue,
+              'simulator_output_queue': view_server.output_queue, 'model_message_event': Event(),
+              'model_input_queue': Queue(), 'model_output_queue': Queue(), 'controller_message_event': Event(),
+              'algorithm_input_queue': Queue(), 'algorithm_output_queue': Queue(), 'initialDCOP': view}
+    return Algorithm.factory(SampleAlgorithm.__name__, **kwargs)
+
+
+def _stop_algorithm(algorithm):
+    algorithm.done = True
+    # The control thread blocks on its input queue, so the stop is sent through it like any other request.
+    algorithm._input_queue.put(request_messages['STOP'])
+    algorithm._message_event.set()
+    algorithm._output_queue.get()
+    algorithm._model_message_event.set()
+    for thread in (algorithm.simulation_thread, algorithm.model_request_thread, algorithm.control_thread):
+        if thread.ident is not None:
+            thread.join()
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else None
+
+
+def bench_ipc_round_trip(dyndcop, iterations):
+    """
+    STATS round trips from a Model-side queue to the Algorithm's model request handler, with no pending events.
+    """
+    view_server = _ViewServer(dyndcop[0])
+    algorithm = _make_algorithm(dyndcop[0], view_server)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        algorithm._model_input_queue.put(request_messages['STATS'])
+        algorithm._model_message_event.set()
+        algorithm._model_output_queue.get()
+    elapsed = time.perf_counter() - start
+    _stop_algorithm(algorithm)
+    view_server.stop()
+    return {'round_trips_per_second': _rate(iterations, elapsed), 'seconds': elapsed}
+
+
+def bench_stats_collection(dyndcop, iterations, messages_per_collection=100):
+    """
+    Algorithm.get_stats as called by the Model, with a batch of unread messages pending on every call.
+    """
+    view_server = _ViewServer(dyndcop[0])
+    algorithm = _make_algorithm(dyndcop[0], view_server)
+    constraints = dyndcop[0]['constraints']
+    elapsed = 0.0
+    for i in range(iterations):
+        for j in range(messages_per_collection):
+            (source, destination), table = constraints[(i + j) % len(constraints)]
+            algorithm._send_message(source, destination, table)
+        start = time.perf_counter()
+        algorithm.get_stats(clear_unread=True)
+        elapsed += time.perf_counter() - start
+    _stop_algorithm(algorithm)
+    view_server.stop()
+    return {'collections_per_second': _rate(iterations, elapsed),
+            'messages_per_second': _rate(iterations * messages_per_collection, elapsed), 'seconds': elapsed}
+
+
+def bench_view_update(dyndcop, iterations):
+    """
+    Algorithm.ready round trips, answered with the first snapshot of the DynDCOP.
+    """
+    view_server = _ViewServer(dyndcop[0])
+    algorithm = _make_algorithm(dyndcop[0], view_server)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        algorithm.ready()
+    elapsed = time.perf_counter() - start
+    _stop_algorithm(algorithm)
+    view_server.stop()
+    return {'view_updates_per_second': _rate(iterations, elapsed), 'seconds': elapsed}
+
+
+def bench_algorithm_run(dyndcop, duration):
+    """
+    Iterations of the Algorithm.run loop (setup, view update, Run, teardown) in `duration` seconds.
+    """
+    view_server = _ViewServer(dyndcop[0])
+    algorithm = _make_algorithm(dyndcop[0], view_server)
+    algorithm.simulation_thread.start()
+    time.sleep(duration)
+    _stop_algorithm(algorithm)
+    view_server.stop()
+    runs = algorithm.get_stats()['total_messages'] # SampleAlgorithm sends one message per run.
+    return {'runs_per_second': _rate(runs, duration), 'seconds': duration}
+
+
+def bench_end_to_end(dyndcop, duration, message_delay=1, computation_cost=1):
+    """
+    A Model driving an Algorithm for `duration` seconds. Reports simulated cycles per second of wall time.
+    """
+    view_server = _ViewServer(dyndcop[0])
+    algorithm = _make_algorithm(dyndcop[0], view_server)
+    model = Model(dyn_dcop=dyndcop, algorithm_input_queue=algorithm._model_input_queue,
+                  algorithm_output_queue=algorithm._model_output_queue,
+                  algorithm_message_event=algorithm._model_message_event, message_delay=message_delay,
+                  computation_cost=computation_cost)
+    algorithm.simulation_thread.start()
+    model.simulation_thread.start()
+    time.sleep(duration)
+    model.pre_stop()
+    model.simulation_thread.join()
+    _stop_algorithm(algorithm)
+    view_server.stop()
+    return {'cycles_per_second': _rate(model.currentCycle, duration),
+            'messages_per_second': _rate(model.lastMessageID, duration), 'cycles': model.currentCycle,
+            'seconds': duration}
+
+
+def bench_generate(generator, size, seed, num_steps, change_rate):
+    start = time.perf_counter()
+    dyndcop = generators[generator](size, num_steps=num_steps, change_rate=change_rate, seed=seed)
+    elapsed = time.perf_counter() - start
+    return dyndcop, {'seconds': elapsed, 'constraints': len(dyndcop[0]['constraints'])}
+
+
+def run_benchmarks(sizes=(10, 100, 1000), generator_names=None, seed=0, num_steps=5, change_rate=0.1,
+                   iterations=1000, duration=1.0):
+    """
+    Runs every benchmark on a DynDCOP from every generator, at every size.
+    :return: a dict of run information and a list of results.
+    """
+    if generator_names is None:
+        generator_names = sorted(generators)
+    results = []
+    for generator in generator_names:
+        for size in sizes:
+            params = {'generator': generator, 'variables': size, 'seed': seed, 'steps': num_steps,
+                      'change_rate': change_rate}
+            dyndcop, measurements = bench_generate(generator, size, seed, num_steps, change_rate)
+            results.append({'benchmark': 'generate', 'params': params, 'measurements': measurements})
+            for name, bench, arguments in (('ipc_round_trip', bench_ipc_round_trip, (iterations,)),
+                                          ('stats_collection', bench_stats_collection, (iterations,)),
+                                          ('view_update', bench_view_update, (iterations,)),
+                                          ('algorithm_run', bench_algorithm_run, (duration,)),
+                                          ('end_to_end', bench_end_to_end, (duration,))):
+                results.append({'benchmark': name, 'params': params, 'measurements': bench(dyndcop, *arguments)})
+    return {'format_version': BENCHMARK_FORMAT_VERSION, 'time': time.time(), 'python': sys.version,
+            'platform': platform.platform(), 'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PyDynDS benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                        help='The numbers of variables of the generated DynDCOPs.')
+    parser.add_argument('--generators', type=str, nargs='+', default=None, choices=sorted(generators),
+                        help='The DynDCOP generators to use. Defaults to all.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--steps', type=int, default=5, help='The number of snapshots in each DynDCOP.')
+    parser.add_argument('--change-rate', type=float, default=0.1,
+                        help='The fraction of constraints that change between snapshots.')
+    parser.add_argument('--iterations', type=int, default=1000, help='Iterations of round-trip benchmarks.')
+    parser.add_argument('--duration', type=float, default=1.0, help='Seconds to run each timed benchmark.')
+    parser.add_argument('--output', type=str, default=None, help='The JSON file to write. Defaults to stdout.')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.generators, args.seed, args.steps, args.change_rate, args.iterations,
+                            args.duration)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
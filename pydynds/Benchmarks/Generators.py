@@ -0,0 +1,142 @@
+import random
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Seeded generators of synthetic DynDCOPs for benchmarking.
+
+A generated DynDCOP is a list of DCOP snapshots ordered by start cycle. Each snapshot is a dict:
+
+    {'start_cycle': int,
+     'variables': [variable name, ...],
+     'domains': {variable name: domain size},
+     'constraints': [((variable name, variable name), cost table), ...]}
+
+where a cost table is a list of rows, indexed by the value of the first variable and then the second.
+
+Every generator takes a seed, so the same arguments always generate the same DynDCOP.
+Between snapshots, a `change_rate` fraction of the constraints are replaced.
+"""
+
+
+def _variable_names(num_variables):
+    return ['v' + str(i) for i in range(num_variables)]
+
+
+def _random_table(rng, domain_size, max_cost=10):
+    return [[rng.randint(0, max_cost) for _ in range(domain_size)] for _ in range(domain_size)]
+
+
+def _inequality_table(domain_size, cost=1):
+    return [[cost if i == j else 0 for j in range(domain_size)] for i in range(domain_size)]
+
+
+def _random_edge(rng, num_variables, edges):
+    while True:
+        first, second = rng.randrange(num_variables), rng.randrange(num_variables)
+        if first == second:
+            continue
+        edge = (min(first, second), max(first, second))
+        if edge not in edges:
+            return edge
+
+
+def _make_dyndcop(rng, num_variables, domain_size, edges, make_table, num_steps, change_rate, step_cycles):
+    """
+    Builds a DynDCOP from an initial set of edges. In each following step, `change_rate` of the constraints are
+    replaced by constraints on new random edges.
+    """
+    names = _variable_names(num_variables)
+    domains = dict((name, domain_size) for name in names)
+    constraints = [((names[first], names[second]), make_table()) for first, second in sorted(edges)]
+    edge_set = set(edges)
+
+    dyndcop = [{'start_cycle': 0, 'variables': names, 'domains': domains, 'constraints': constraints}]
+    for step in range(1, num_steps):
+        constraints = list(constraints)
+        num_changes = int(round(change_rate * len(constraints)))
+        for index in rng.sample(range(len(constraints)), min(num_changes, len(constraints))):
+            (first, second), _ = constraints[index]
+            edge_set.discard((int(first[1:]), int(second[1:])))
+            first, second = _random_edge(rng, num_variables, edge_set)
+            edge_set.add((first, second))
+            constraints[index] = ((names[first], names[second]), make_table())
+        dyndcop.append({'start_cycle': step * step_cycles, 'variables': names, 'domains': domains,
+                        'constraints': constraints})
+    return dyndcop
+
+
+def graph_coloring(num_variables, density=2.0, num_colors=3, num_steps=5, change_rate=0.1, step_cycles=100, seed=0):
+    """
+    Random graph colouring: each constraint costs 1 when its two variables have the same colour.
+    :param num_variables: the number of variables (nodes).
+    :param density: the average number of constraints per variable.
+    :param num_colors: the domain size of every variable.
+    :param num_steps: the number of DCOP snapshots in the DynDCOP.
+    :param change_rate: the fraction of constraints replaced between snapshots.
+    :param step_cycles: the number of cycles between snapshots.
+    :param seed: the random seed.
+    :return: the DynDCOP.
+    """
+    rng = random.Random(seed)
+    max_edges = num_variables * (num_variables - 1) // 2
+    edges = set()
+    while len(edges) < min(int(density * num_variables), max_edges):
+        edges.add(_random_edge(rng, num_variables, edges))
+    table = _inequality_table(num_colors)
+    return _make_dyndcop(rng, num_variables, num_colors, edges, lambda: table, num_steps, change_rate, step_cycles)
+
+
+def scale_free(num_variables, edges_per_variable=2, domain_size=3, num_steps=5, change_rate=0.1, step_cycles=100,
+               seed=0):
+    """
+    A scale-free constraint graph built by Barabasi-Albert preferential attachment, with random cost tables.
+    :param num_variables: the number of variables (nodes).
+    :param edges_per_variable: the number of constraints each new variable attaches with.
+    :param domain_size: the domain size of every variable.
+    :param num_steps: the number of DCOP snapshots in the DynDCOP.
+    :param change_rate: the fraction of constraints replaced between snapshots.
+    :param step_cycles: the number of cycles between snapshots.
+    :param seed: the random seed.
+    :return: the DynDCOP.
+    """
+    rng = random.Random(seed)
+    edges = set()
+    endpoints = [] # Every endpoint of every edge, so a uniform choice from it is proportional to degree.
+    for node in range(1, num_variables):
+        targets = set()
+        while len(targets) < min(edges_per_variable, node):
+            targets.add(rng.choice(endpoints) if endpoints else rng.randrange(node))
+        for target in targets:
+            edges.add((target, node))
+            endpoints.extend((target, node))
+    return _make_dyndcop(rng, num_variables, domain_size, edges, lambda: _random_table(rng, domain_size),
+                         num_steps, change_rate, step_cycles)
+
+
+def meeting_scheduling(num_variables, num_slots=8, meetings_per_agent=3, num_steps=5, change_rate=0.1,
+                       step_cycles=100, seed=0):
+    """
+    Meeting scheduling: each variable is a meeting, whose value is its time slot. Each agent attends several meetings,
+    and every pair of meetings that share an attendee costs 1 if they are scheduled in the same slot.
+    :param num_variables: the number of meetings.
+    :param num_slots: the number of time slots (the domain size of every meeting).
+    :param meetings_per_agent: the number of meetings each agent attends.
+    :param num_steps: the number of DCOP snapshots in the DynDCOP.
+    :param change_rate: the fraction of constraints replaced between snapshots.
+    :param step_cycles: the number of cycles between snapshots.
+    :param seed: the random seed.
+    :return: the DynDCOP.
+    """
+    rng = random.Random(seed)
+    edges = set()
+    for _ in range(max(1, num_variables // 2)):
+        meetings = rng.sample(range(num_variables), min(meetings_per_agent, num_variables))
+        for i, first in enumerate(meetings):
+            for second in meetings[i + 1:]:
+                edges.add((min(first, second), max(first, second)))
+    table = _inequality_table(num_slots)
+    return _make_dyndcop(rng, num_variables, num_slots, edges, lambda: table, num_steps, change_rate, step_cycles)
+
+
+generators = {'graph_coloring': graph_coloring, 'scale_free': scale_free, 'meeting_scheduling': meeting_scheduling}
@@ -0,0 +1,357 @@
+from array import array
+import pickle
+import struct
+
+__author__ = 'Victor Szczepanski'
+
+"""
+A compact representation of a single DCOP, suitable for instances with hundreds of thousands of variables.
+
+Variables are indexed by integers 0..n-1. Everything but the variable names and cost tables is kept in flat arrays
+of unsigned 32 bit integers:
+
+    domain_sizes:         domain size of each variable.
+    scope_offsets:        constraint c's scope is scope_variables[scope_offsets[c]:scope_offsets[c + 1]].
+    scope_variables:      the variables of every constraint's scope, concatenated.
+    adjacency_offsets:    the constraint graph in CSR form: the neighbours of variable v are
+    adjacency:            adjacency[adjacency_offsets[v]:adjacency_offsets[v + 1]], sorted.
+    incidence_offsets:    the constraints whose scope includes variable v are
+    incidence:            incidence[incidence_offsets[v]:incidence_offsets[v + 1]].
+
+Slices are returned as memoryviews, so iterating over neighbours does not copy. The adjacency and incidence arrays
+are derived from the scopes when they are first used, and are not pickled, which keeps a pickled DCOP small.
+A DCOP can also be published to shared memory, with its derived arrays, and attached to from other processes without
+copying any array.
+"""
+
+_SHARED_MAGIC = b'PDDSDCP\x00'
+_SHARED_VERSION = 1
+#magic, version, variables, constraints, scope entries, adjacency entries, metadata length
+_SHARED_HEADER = struct.Struct('<8sHQQQQQ')
+
+_TYPECODE = 'I'
+
+
+def _csr(rows):
+    """
+    Builds a CSR index from a list of rows.
+    :return: offsets, values.
+    """
+    offsets = array(_TYPECODE, [0])
+    values = array(_TYPECODE)
+    total = 0
+    for row in rows:
+        values.extend(row)
+        total += len(row)
+        offsets.append(total)
+    return offsets, values
+
+
+class Variable(object):
+    """
+    A lightweight handle to one variable of a DCOP, for code that prefers names to indices.
+    """
+    __slots__ = ('dcop', 'index')
+
+    def __init__(self, dcop, index):
+        self.dcop = dcop
+        self.index = index
+
+    @property
+    def name(self):
+        return self.dcop.variable_names[self.index]
+
+    @property
+    def domain_size(self):
+        return self.dcop.domain_sizes[self.index]
+
+    def neighbors(self):
+        return [Variable(self.dcop, neighbor) for neighbor in self.dcop.neighbors(self.index)]
+
+    def constraints(self):
+        return [Constraint(self.dcop, constraint) for constraint in self.dcop.constraints_of(self.index)]
+
+    def __eq__(self, other):
+        return isinstance(other, Variable) and other.dcop is self.dcop and other.index == self.index
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        return 'Variable(' + repr(self.name) + ')'
+
+
+class Constraint(object):
+    """
+    A lightweight handle to one constraint of a DCOP.
+    """
+    __slots__ = ('dcop', 'index')
+
+    def __init__(self, dcop, index):
+        self.dcop = dcop
+        self.index = index
+
+    @property
+    def scope(self):
+        return [Variable(self.dcop, variable) for variable in self.dcop.scope(self.index)]
+
+    @property
+    def table(self):
+        return self.dcop.tables[self.index]
+
+    def __repr__(self):
+        return 'Constraint(' + repr([variable.name for variable in self.scope]) + ')'
+
+
+class DCOP(object):
+    """
+    A DCOP with integer-indexed variables, its constraint scopes in flat arrays, and a CSR constraint graph.
+    """
+    __slots__ = ('start_cycle', 'variable_names', 'domain_sizes', 'scope_offsets', 'scope_variables', 'tables',
+                 '_adjacency_offsets', '_adjacency', '_incidence_offsets', '_incidence', '_indices', '_shared_memory',
+                 '_shared_views')
+
+    def __init__(self, variable_names, domain_sizes, scopes, tables, start_cycle=0):
+        """
+        :param variable_names: the name of each variable, by index.
+        :param domain_sizes: the domain size of each variable, by index.
+        :param scopes: the scope of each constraint, as a sequence of variable indices.
+        :param tables: the cost table of each constraint, in the same order as scopes.
+        :param start_cycle: the cycle at which this DCOP becomes the current DCOP of its DynDCOP.
+        :return:
+        """
+        self.start_cycle = start_cycle
+        self.variable_names = list(variable_names)
+        self.domain_sizes = array(_TYPECODE, domain_sizes)
+        self.tables = list(tables)
+        self.scope_offsets, self.scope_variables = _csr(scopes)
+        self._reset()
+
+    def _reset(self):
+        self._adjacency_offsets = None
+        self._adjacency = None
+        self._incidence_offsets = None
+        self._incidence = None
+        self._indices = None
+        self._shared_memory = None
+        self._shared_views = ()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, compress_tables=False):
+        """
+        Converts a snapshot dict, as made by Benchmarks.Generators, into a DCOP.
+        :param snapshot: a dict with 'start_cycle', 'variables', 'domains', and 'constraints'.
+        :param compress_tables: if True, cost tables are converted with DCOP.Tables.make_table, which stores mostly
+        default tables sparsely. A table shared by several constraints is converted once.
+        :return: the DCOP.
+        """
+        names = snapshot['variables']
+        indices = dict((name, index) for index, name in enumerate(names))
+        scopes = [[indices[name] for name in scope] for scope, _ in snapshot['constraints']]
+        tables = [table for _, table in snapshot['constraints']]
+        if compress_tables:
+            from DCOP.Tables import make_table
+            converted = {}
+            for constraint, (scope, table) in enumerate(snapshot['constraints']):
+                domain_sizes = tuple(snapshot['domains'][name] for name in scope)
+                key = (id(table), domain_sizes)
+                if key not in converted:
+                    converted[key] = make_table(domain_sizes, table)
+                tables[constraint] = converted[key]
+        return cls(names, [snapshot['domains'][name] for name in names], scopes, tables,
+                   snapshot.get('start_cycle', 0))
+
+    def to_snapshot(self):
+        """
+        :return: this DCOP as a snapshot dict, the inverse of from_snapshot.
+        """
+        names = self.variable_names
+        return {'start_cycle': self.start_cycle, 'variables': list(names),
+                'domains': dict((name, self.domain_sizes[index]) for index, name in enumerate(names)),
+                'constraints': [(tuple(names[variable] for variable in self.scope(constraint)), self.tables[constraint])
+                                for constraint in range(self.num_constraints)]}
+
+    @property
+    def num_variables(self):
+        return len(self.domain_sizes)
+
+    @property
+    def num_constraints(self):
+        return len(self.scope_offsets) - 1
+
+    def _build_graph(self):
+        """
+        Derives the adjacency and incidence arrays from the constraint scopes.
+        :return:
+        """
+        neighbors = [set() for _ in range(self.num_variables)]
+        incident = [[] for _ in range(self.num_variables)]
+        offsets = self.scope_offsets.tolist()
+        scope_variables = self.scope_variables.tolist()
+        for constraint in range(len(offsets) - 1):
+            scope = scope_variables[offsets[constraint]:offsets[constraint + 1]]
+            for variable in scope:
+                incident[variable].append(constraint)
+                neighbors[variable].update(scope)
+        for variable, variable_neighbors in enumerate(neighbors):
+            variable_neighbors.discard(variable)
+        self._adjacency_offsets, self._adjacency = _csr(sorted(variable_neighbors) for variable_neighbors in neighbors)
+        self._incidence_offsets, self._incidence = _csr(incident)
+
+    @property
+    def adjacency_offsets(self):
+        if self._adjacency_offsets is None:
+            self._build_graph()
+        return self._adjacency_offsets
+
+    @property
+    def adjacency(self):
+        if self._adjacency is None:
+            self._build_graph()
+        return self._adjacency
+
+    @property
+    def incidence_offsets(self):
+        if self._incidence_offsets is None:
+            self._build_graph()
+        return self._incidence_offsets
+
+    @property
+    def incidence(self):
+        if self._incidence is None:
+            self._build_graph()
+        return self._incidence
+
+    def index(self, name):
+        """
+        :return: the index of the variable named `name`.
+        """
+        if self._indices is None:
+            self._indices = dict((variable_name, index) for index, variable_name in enumerate(self.variable_names))
+        return self._indices[name]
+
+    def variable(self, name):
+        """
+        :return: a Variable handle to the variable named `name`.
+        """
+        return Variable(self, self.index(name))
+
+    def neighbors(self, variable):
+        """
+        :param variable: the index of a variable.
+        :return: a memoryview of the indices of the variables that share a constraint with `variable`.
+        """
+        offsets = self.adjacency_offsets
+        return memoryview(self._adjacency)[offsets[variable]:offsets[variable + 1]]
+
+    def degree(self, variable):
+        offsets = self.adjacency_offsets
+        return offsets[variable + 1] - offsets[variable]
+
+    def constraints_of(self, variable):
+        """
+        :param variable: the index of a variable.
+        :return: a memoryview of the indices of the constraints whose scope includes `variable`.
+        """
+        offsets = self.incidence_offsets
+        return memoryview(self._incidence)[offsets[variable]:offsets[variable + 1]]
+
+    def scope(self, constraint):
+        """
+        :param constraint: the index of a constraint.
+        :return: a memoryview of the indices of the variables in the constraint's scope.
+        """
+        return memoryview(self.scope_variables)[self.scope_offsets[constraint]:self.scope_offsets[constraint + 1]]
+
+    def __getstate__(self):
+        return {'start_cycle': self.start_cycle, 'variable_names': self.variable_names, 'tables': self.tables,
+                'domain_sizes': bytes(self.domain_sizes), 'scope_offsets': bytes(self.scope_offsets),
+                'scope_variables': bytes(self.scope_variables)}
+
+    def __setstate__(self, state):
+        self.start_cycle = state['start_cycle']
+        self.variable_names = state['variable_names']
+        self.tables = state['tables']
+        self.domain_sizes = array(_TYPECODE, state['domain_sizes'])
+        self.scope_offsets = array(_TYPECODE, state['scope_offsets'])
+        self.scope_variables = array(_TYPECODE, state['scope_variables'])
+        self._reset()
+
+    def _arrays(self):
+        return (self.domain_sizes, self.scope_offsets, self.scope_variables, self.adjacency_offsets, self.adjacency,
+                self.incidence_offsets, self.incidence)
+
+    def publish(self, name=None):
+        """
+        Copies this DCOP into a new block of shared memory, from which other processes can attach to it with
+        DCOP.attach without copying its arrays. The caller owns the block, and should close and unlink it when it is
+        no longer needed.
+        :param name: the name of the shared memory block. If None, a unique name is chosen.
+        :return: the multiprocessing.shared_memory.SharedMemory block. Its name is passed to attach.
+        """
+        from multiprocessing import shared_memory
+        metadata = pickle.dumps((self.start_cycle, self.variable_names, self.tables), protocol=pickle.HIGHEST_PROTOCOL)
+        arrays = [bytes(values) for values in self._arrays()]
+        header = _SHARED_HEADER.pack(_SHARED_MAGIC, _SHARED_VERSION, self.num_variables, self.num_constraints,
+                                     len(self.scope_variables), len(self.adjacency), len(metadata))
+        block = shared_memory.SharedMemory(name=name, create=True,
+                                           size=len(header) + sum(len(data) for data in arrays) + len(metadata))
+        offset = 0
+        for data in [header] + arrays + [metadata]:
+            block.buf[offset:offset + len(data)] = data
+            offset += len(data)
+        return block
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to a DCOP published with publish. Its arrays are read-only views of the shared memory.
+        Call close when done with it.
+        :param name: the name of the shared memory block.
+        :return: the DCOP.
+        """
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(name=name)
+        magic, version, num_variables, num_constraints, num_scope_entries, num_adjacency, metadata_length = \
+            _SHARED_HEADER.unpack_from(block.buf, 0)
+        if magic != _SHARED_MAGIC or version != _SHARED_VERSION:
+            block.close()
+            raise ValueError("Shared memory block " + str(name) + " does not hold a published DCOP.")
+
+        buffer = block.buf.toreadonly()
+        offset = _SHARED_HEADER.size
+        views = [buffer]
+        for length in (num_variables, num_constraints + 1, num_scope_entries, num_variables + 1, num_adjacency,
+                       num_variables + 1, num_scope_entries):
+            size = array(_TYPECODE).itemsize * length
+            views.append(buffer[offset:offset + size])
+            views.append(views[-1].cast(_TYPECODE))
+            offset += size
+        start_cycle, variable_names, tables = pickle.loads(buffer[offset:offset + metadata_length])
+
+        dcop = cls.__new__(cls)
+        dcop._reset()
+        dcop.start_cycle = start_cycle
+        dcop.variable_names = variable_names
+        dcop.tables = tables
+        (dcop.domain_sizes, dcop.scope_offsets, dcop.scope_variables, dcop._adjacency_offsets, dcop._adjacency,
+         dcop._incidence_offsets, dcop._incidence) = views[2::2]
+        dcop._shared_memory = block
+        dcop._shared_views = views
+        return dcop
+
+    def close(self):
+        """
+        Detaches a DCOP returned by attach from its shared memory. The DCOP may not be used afterwards.
+        :return:
+        """
+        if self._shared_memory is None:
+            return
+        for view in reversed(self._shared_views):
+            view.release()
+        self._shared_memory.close()
+        self._reset()
+
+    def __repr__(self):
+        return 'DCOP(variables=' + str(self.num_variables) + ', constraints=' + str(self.num_constraints) + \
+               ', start_cycle=' + str(self.start_cycle) + ')'
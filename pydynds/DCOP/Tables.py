@@ -0,0 +1,276 @@
+from array import array
+from collections import Counter
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Cost tables of constraints, in three representations with one interface:
+
+    DenseTable:      every cost stored, in a NumPy array if NumPy is available, else a flat array of doubles.
+    SparseTable:     a default cost, and a dict of the assignments whose cost differs from it.
+    FunctionalTable: costs computed by a function when they are looked up, so nothing is stored.
+
+An assignment is a tuple of value indices, one per variable of the constraint's scope, in scope order.
+make_table picks a representation from the density of the costs that differ from the most common cost.
+"""
+
+DEFAULT_DENSITY_THRESHOLD = 0.25
+
+
+def _assignments(domain_sizes):
+    return itertools.product(*[range(size) for size in domain_sizes])
+
+
+def _flatten(costs):
+    for cost in costs:
+        if isinstance(cost, (list, tuple)):
+            for nested in _flatten(cost):
+                yield nested
+        else:
+            yield cost
+
+
+def _num_assignments(domain_sizes):
+    count = 1
+    for size in domain_sizes:
+        count *= size
+    return count
+
+
+class ConstraintTable(object):
+    """
+    The interface of every cost table.
+    """
+
+    def __init__(self, domain_sizes):
+        """
+        :param domain_sizes: the domain size of each variable in the constraint's scope, in scope order.
+        :return:
+        """
+        self.domain_sizes = tuple(domain_sizes)
+
+    @property
+    def num_assignments(self):
+        return _num_assignments(self.domain_sizes)
+
+    def cost(self, assignment):
+        """
+        :param assignment: a tuple of value indices, in scope order.
+        :return: the cost of `assignment`.
+        """
+        raise NotImplementedError
+
+    def __getitem__(self, assignment):
+        return self.cost(tuple(assignment))
+
+    def costs(self):
+        """
+        Generates (assignment, cost) for every assignment, in lexicographic order of assignment.
+        """
+        for assignment in _assignments(self.domain_sizes):
+            yield assignment, self.cost(assignment)
+
+    def min_cost(self):
+        return min(cost for _, cost in self.costs())
+
+    def max_cost(self):
+        return max(cost for _, cost in self.costs())
+
+    def min_over(self, position):
+        """
+        Projects the table onto one variable by minimization.
+        :param position: the position of the variable in the scope.
+        :return: a list of the lowest cost of any assignment with each value of the variable.
+        """
+        best = [None] * self.domain_sizes[position]
+        for assignment, cost in self.costs():
+            value = assignment[position]
+            if best[value] is None or cost < best[value]:
+                best[value] = cost
+        return best
+
+    def to_dense(self):
+        """
+        :return: a DenseTable with the same costs.
+        """
+        return DenseTable(self.domain_sizes, [cost for _, cost in self.costs()])
+
+    @property
+    def nbytes(self):
+        """
+        :return: the approximate size of the table's costs in bytes. Used by common.Link.estimate_size.
+        """
+        raise NotImplementedError
+
+
+class DenseTable(ConstraintTable):
+    """
+    Stores every cost, in lexicographic order of assignment.
+    """
+
+    def __init__(self, domain_sizes, costs):
+        """
+        :param domain_sizes: the domain size of each variable in the scope.
+        :param costs: the costs in lexicographic order of assignment, as a flat sequence, a nested list (indexed by the
+        value of the first variable, then the second, ...), or a NumPy array of shape domain_sizes.
+        :return:
+        """
+        super().__init__(domain_sizes)
+        if numpy is not None:
+            self._costs = numpy.asarray(costs, dtype=float).reshape(-1)
+        else:
+            self._costs = array('d', _flatten(costs))
+        if len(self._costs) != self.num_assignments:
+            raise ValueError("Expected " + str(self.num_assignments) + " costs, got " + str(len(self._costs)))
+        self._strides = []
+        stride = 1
+        for size in reversed(self.domain_sizes):
+            self._strides.insert(0, stride)
+            stride *= size
+
+    def cost(self, assignment):
+        return self._costs[sum(value * stride for value, stride in zip(assignment, self._strides))]
+
+    def costs(self):
+        return zip(_assignments(self.domain_sizes), self._costs)
+
+    def min_cost(self):
+        return min(self._costs)
+
+    def max_cost(self):
+        return max(self._costs)
+
+    def min_over(self, position):
+        if numpy is not None:
+            return list(self._costs.reshape(self.domain_sizes).min(
+                axis=tuple(axis for axis in range(len(self.domain_sizes)) if axis != position)))
+        return super().min_over(position)
+
+    def to_dense(self):
+        return self
+
+    @property
+    def nbytes(self):
+        return self._costs.nbytes if numpy is not None else self._costs.itemsize * len(self._costs)
+
+    def __reduce__(self):
+        return DenseTable, (self.domain_sizes, self._costs)
+
+
+class SparseTable(ConstraintTable):
+    """
+    Stores a default cost, and only the assignments whose cost differs from it.
+    """
+
+    def __init__(self, domain_sizes, default=0, exceptions=None):
+        """
+        :param domain_sizes: the domain size of each variable in the scope.
+        :param default: the cost of every assignment not in exceptions.
+        :param exceptions: a dict of assignment tuples to their costs.
+        :return:
+        """
+        super().__init__(domain_sizes)
+        self.default = default
+        self.exceptions = dict(exceptions) if exceptions is not None else {}
+
+    def cost(self, assignment):
+        return self.exceptions.get(assignment, self.default)
+
+    def _has_default(self):
+        """
+        :return: True if some assignment has the default cost.
+        """
+        return len(self.exceptions) < self.num_assignments
+
+    def min_cost(self):
+        candidates = list(self.exceptions.values())
+        if self._has_default():
+            candidates.append(self.default)
+        return min(candidates)
+
+    def max_cost(self):
+        candidates = list(self.exceptions.values())
+        if self._has_default():
+            candidates.append(self.default)
+        return max(candidates)
+
+    def min_over(self, position):
+        #A value has an assignment with the default cost unless every assignment with it is an exception.
+        exceptions_per_value = Counter(assignment[position] for assignment in self.exceptions)
+        assignments_per_value = self.num_assignments // self.domain_sizes[position]
+        best = [self.default if exceptions_per_value[value] < assignments_per_value else None
+                for value in range(self.domain_sizes[position])]
+        for assignment, cost in self.exceptions.items():
+            value = assignment[position]
+            if best[value] is None or cost < best[value]:
+                best[value] = cost
+        return best
+
+    @property
+    def density(self):
+        """
+        :return: the fraction of assignments stored as exceptions.
+        """
+        return len(self.exceptions) / self.num_assignments
+
+    @property
+    def nbytes(self):
+        return len(self.exceptions) * 8 * (len(self.domain_sizes) + 1)
+
+
+class FunctionalTable(ConstraintTable):
+    """
+    Computes costs with a function of the assignment's values. Nothing is stored, so the function must be picklable
+    (e.g. defined at module level) if the table is sent between processes.
+    """
+
+    def __init__(self, domain_sizes, function):
+        """
+        :param domain_sizes: the domain size of each variable in the scope.
+        :param function: a function of one value index per variable, in scope order, that returns the cost.
+        :return:
+        """
+        super().__init__(domain_sizes)
+        self.function = function
+
+    def cost(self, assignment):
+        return self.function(*assignment)
+
+    @property
+    def nbytes(self):
+        return 0
+
+
+def make_table(domain_sizes, costs=None, function=None, density_threshold=DEFAULT_DENSITY_THRESHOLD):
+    """
+    Makes the most compact table for the given costs.
+    If a function is given, the table is a FunctionalTable. Otherwise, the most common cost becomes the default, and
+    the table is a SparseTable if at most `density_threshold` of the assignments have another cost, or a DenseTable.
+    :param domain_sizes: the domain size of each variable in the scope.
+    :param costs: the costs, as accepted by DenseTable, or a dict of assignment tuples to costs, where missing
+    assignments cost 0.
+    :param function: a function of the assignment's values that returns the cost.
+    :param density_threshold: the largest fraction of non-default costs stored as a SparseTable.
+    :return: the table.
+    """
+    if function is not None:
+        return FunctionalTable(domain_sizes, function)
+    num_assignments = _num_assignments(domain_sizes)
+
+    if isinstance(costs, dict):
+        if len(costs) <= density_threshold * num_assignments:
+            return SparseTable(domain_sizes, 0, dict((tuple(a), c) for a, c in costs.items() if c != 0))
+        return SparseTable(domain_sizes, 0, costs).to_dense()
+
+    dense = DenseTable(domain_sizes, costs)
+    default, count = Counter(cost for _, cost in dense.costs()).most_common(1)[0]
+    if num_assignments - count > density_threshold * num_assignments:
+        return dense
+    return SparseTable(domain_sizes, default,
+                       dict((assignment, cost) for assignment, cost in dense.costs() if cost != default))
@@ -1,7 +1,17 @@
-from threading import Thread
+import heapq
+import logging
+import queue
+import time
+from threading import RLock
 
 from common.SimulatorMessages import request_messages
 from common.pydyndsProcess import pydyndsProcess
+from common.Message import Message
+from common.Computation import Computation, ComputationCostModel
+from common.Trace import TraceWriter, TraceReader
+from common.Link import LinkModel
+from common.IDGenerator import IDGenerator
+from common.Results import ResultsWriter
 
 __author__ = 'Victor Szczepanski'
 
@@ -12,42 +22,98 @@ class Model(pydyndsProcess):
     Thus, we use Properties to prevent accidental modification. If the developer wishes to modify these objects,
     please modify the appropriate property.
 
-    TODO: Decide if we want to simulate messages or computations with variable delays, instead of assuming every
-    message or computation takes the same time.
+    Messages are delayed by the Model's LinkModel, so large messages may take longer than small ones.
+    Computations take the cycles given by the Model's ComputationCostModel, from the cost the Algorithm measured.
+
+    Outside lockstep mode, the Model sleeps between updates until an Algorithm has new work for it.
+
+    For a portfolio of Algorithms, the Model reads the stats of every Algorithm in each update, and advances by the
+    time of the slowest, so all of them see the same sequence of DCOPs. It keeps per-algorithm stats and cost curves,
+    read with request_messages['PORTFOLIO_STATS'].
     """
 
-    def __init__(self, dyn_dcop=None, algorithm_input_queue=None, algorithm_output_queue=None, model_request_queue=None, model_response_queue=None, model_message_event=None, algorithm_message_event=None, message_delay=0, computation_cost=0):
+    stop_poll_interval = 1 #Seconds between checks for a stop while the Model waits for the Algorithms.
+
+    def __init__(self, dyn_dcop=None, algorithm_input_queue=None, algorithm_output_queue=None, model_request_queue=None, model_response_queue=None, model_message_event=None, algorithm_message_event=None, message_delay=0, computation_cost=0, trace_path=None, instrument=False, profile_dir=None, simulator_queue=None, barrier=None, results_path=None, results_format='csv', link_model=None, computation_cost_model=None, message_id_counter=None, computation_id_counter=None, metrics=None, algorithm_channels=None, work_event=None):
         """
         Initializes the model.
         :param dyn_dcop: the DynDCOP instance to simulate
         :param algorithm: the algorithm that is processing the DynDCOP. The Model polls the algorithm for stats that it
         uses to advance time in the DynDCOP.
+        :param trace_path: if not None, every message and computation read from the algorithm is recorded to this file.
+        :param instrument: if True, the latency of the STATS round trip to the algorithm is recorded on channel 'stats'.
+        :param profile_dir: if not None, the Model's threads are profiled, and their profiles written to this directory.
+        :param simulator_queue: a multiprocessing.Queue used to send new DCOPs to the simulator when the DynDCOP changes.
+        :param barrier: if not None, the Model runs in lockstep mode with the Algorithm and Simulator.
+        :param results_path: if not None, a row of results is written to this path with every update, replacing any
+        results already there. See common.Results for the columns.
+        :param results_format: the format of the results, 'csv' or 'npz'.
+        :param link_model: a common.Link.LinkModel that gives the number of cycles to deliver each message.
+        If None, every message takes message_delay cycles.
+        :param computation_cost_model: a common.Computation.ComputationCostModel that converts the measured cost of
+        each computation into cycles. If None, every computation takes computation_cost cycles.
+        :param message_id_counter: a counter from IDGenerator.make_counter, shared with every other process that
+        assigns message IDs. If None, the Model's message IDs are only unique within the Model. The Model only assigns
+        IDs to messages that have none, e.g. those of Algorithms without a counter, or those replayed from a trace.
+        :param computation_id_counter: as message_id_counter, for computation IDs.
+        :param metrics: if not None, a common.Metrics.SharedMetrics the Model updates in place with every update.
+        :param algorithm_channels: for a portfolio, a list of (name, input queue, output queue, message event), one per
+        Algorithm, used instead of algorithm_input_queue, algorithm_output_queue, and algorithm_message_event.
+        :param work_event: a multiprocessing.Event the Algorithms set when they have new messages or computations.
+        If not None, the Model sleeps on it between updates until there is new work. Otherwise, it updates continuously.
 
         TODO: Mark fields as synchronized
         :return:
         """
-        super().__init__(model_request_queue, model_response_queue, model_message_event)
-        assert model_message_event is not algorithm_message_event
+        super().__init__(model_request_queue, model_response_queue, model_message_event, instrument, profile_dir,
+                         barrier)
+        assert model_message_event is None or model_message_event is not algorithm_message_event
         self._dynDCOP = dyn_dcop
         self._algorithm_input_queue = algorithm_input_queue
         self._algorithm_output_queue = algorithm_output_queue
         self._algorithm_message_event = algorithm_message_event
+        self._simulator_queue = simulator_queue
+        self._work_event = work_event
+        self._portfolio = algorithm_channels is not None
+        if algorithm_channels is None:
+            algorithm_channels = [(None, algorithm_input_queue, algorithm_output_queue, algorithm_message_event)]
+        self._algorithm_channels = algorithm_channels
+        #The stats of each Algorithm of a portfolio, by name. active_cycles counts the cycles the Model would have
+        #advanced by for the Algorithm alone. cost_curve holds (cycle, cost) at each change of the Algorithm's cost.
+        self._portfolio_stats = dict((name, {'active_cycles': 0, 'messages': 0, 'bytes': 0, 'computations': 0,
+                                             'cost_curve': []})
+                                     for name, _, _, _ in algorithm_channels) if self._portfolio else {}
 
         self._running = False
         self._finished = False
 
-        self.currentDCOP = None #TODO: init with initial state of DynDCOP.
+        #Assumption: self.dynDCOP orders dcops by start cycle.
+        self._dcopIndex = 0
+        self.currentDCOP = dyn_dcop[0] if dyn_dcop else None
         self._currentCycle = 0
-        self._lastMessageID = 0
-        self._lastComputationID = 0
+        self._messageIDs = IDGenerator(message_id_counter)
+        self._computationIDs = IDGenerator(computation_id_counter)
 
         #Settings
         self.messageDelay = message_delay
+        self.linkModel = link_model if link_model is not None else LinkModel(message_delay)
         self.computationCost = computation_cost
-
-        self.simulation_thread = Thread(target=self.run)
-
-        print("Done setting up Model.")
+        self.computationCostModel = computation_cost_model if computation_cost_model is not None else \
+            ComputationCostModel(computation_cost)
+        self.tracePath = trace_path
+        self._trace_writer = None
+        self.resultsPath = results_path
+        self.resultsFormat = results_format
+        self._results_writer = None
+        self._pending_deliveries = [] #A heap of the delivery cycles of messages not yet delivered.
+        self._messagesDelivered = 0 #The number of messages delivered so far.
+        self._lastDelivered = 0 #The number of messages delivered in the last update.
+        self._update_lock = RLock() #Held for each update, so a checkpoint is never taken in the middle of one.
+        self.metrics = metrics
+
+        self.simulation_thread = self._make_thread(self.run)
+
+        self.log.debug("Done setting up Model.")
 
     @property
     def dynDCOP(self):
@@ -99,15 +165,19 @@ class Model(pydyndsProcess):
 
     @property
     def lastMessageID(self):
-        return self._lastMessageID
+        return self._messageIDs.currentID
 
     @lastMessageID.setter
     def lastMessageID(self, new_id=0):
         raise ValueError("lastMessageID is protected in Model. Change the setter property to allow modifications.")
 
+    @property
+    def messagesDelivered(self):
+        return self._messagesDelivered
+
     @property
     def lastComputationID(self):
-        return self._lastComputationID
+        return self._computationIDs.currentID
 
     @lastComputationID.setter
     def lastComputationID(self, new_id=0):
@@ -122,8 +192,65 @@ class Model(pydyndsProcess):
         if request is request_messages['CURRENT_STATE']:
             self._output_queue.put(self.currentDCOP)
             return True
+        if request is request_messages['PORTFOLIO_STATS']:
+            self._output_queue.put(self.get_portfolio_stats())
+            return True
+        if request is request_messages['CHECKPOINT']:
+            self._output_queue.put(self.get_checkpoint_states())
+            return True
         return False
 
+    def get_portfolio_stats(self):
+        """
+        :return: a copy of the stats of each Algorithm of a portfolio, by name. Empty if there is no portfolio.
+        """
+        return dict((name, dict(stats, cost_curve=list(stats['cost_curve'])))
+                    for name, stats in self._portfolio_stats.items())
+
+    def get_checkpoint_state(self):
+        """
+        Overrides pydyndsProcess.get_checkpoint_state.
+        :return state: a dict of the Model's current cycle, the next unreserved IDs of its ID counters, current DCOP, the
+        delivery cycles of messages still in flight, and the number of messages delivered.
+        """
+        with self._update_lock:
+            return {'current_cycle': self._currentCycle, 'last_message_id': self._messageIDs.nextUnreservedID,
+                    'last_computation_id': self._computationIDs.nextUnreservedID, 'current_dcop': self.currentDCOP,
+                    'finished': self._finished, 'dcop_index': self._dcopIndex,
+                    'portfolio_stats': self.get_portfolio_stats(), 'pending_deliveries': list(self._pending_deliveries),
+                    'messages_delivered': self._messagesDelivered}
+
+    def get_checkpoint_states(self):
+        """
+        Takes the checkpoint states of the Model and of every Algorithm between two updates, so each message an
+        Algorithm sent is either in the Model's state or in the Algorithm's unread messages, never in both or neither.
+        :return states: a list of the Model's state, followed by the state of each Algorithm, in the order of the
+        algorithm channels.
+        """
+        with self._update_lock:
+            for _, input_queue, _, message_event in self._algorithm_channels:
+                input_queue.put(request_messages['CHECKPOINT'])
+                message_event.set()
+            return [self.get_checkpoint_state()] + [self._get_response(output_queue)
+                                                    for _, _, output_queue, _ in self._algorithm_channels]
+
+    def restore_checkpoint_state(self, state):
+        """
+        Overrides pydyndsProcess.restore_checkpoint_state.
+        :param state: a dict as returned by get_checkpoint_state.
+        :return:
+        """
+        with self._update_lock:
+            self._currentCycle = state['current_cycle']
+            self._messageIDs.skip_to(state['last_message_id'])
+            self._computationIDs.skip_to(state['last_computation_id'])
+            self.currentDCOP = state['current_dcop']
+            self._finished = state['finished']
+            self._dcopIndex = state['dcop_index']
+            self._portfolio_stats.update(state.get('portfolio_stats', {}))
+            self._pending_deliveries = list(state['pending_deliveries']) #Still a heap.
+            self._messagesDelivered = state['messages_delivered']
+
     def run(self):
         """
         Launches the model's update process. Use this function when starting a new Model in a thread or subprocess.
@@ -134,80 +261,336 @@ class Model(pydyndsProcess):
         """
         self._running = True
         self._finished = False
-        #TODO: Replace boolean exit flags with events that pydyndsProcess can signal.
-        while self._running:
-            self._update()
-
-        print("Exiting model run...")
+        if self.tracePath is not None:
+            self._trace_writer = TraceWriter(self.tracePath)
+        if self.resultsPath is not None:
+            self._results_writer = ResultsWriter(self.resultsPath, self.resultsFormat)
+        #pre_stop sets _stop and releases pause_lock, and _wait_for_work polls for it, so the loop ends on a stop.
+        try:
+            if self.barrier is not None:
+                self._lockstep_run()
+            else:
+                while self._wait_for_work():
+                    with self.pause_lock:
+                        if not self._stop:
+                            self._update()
+        finally:
+            if self._trace_writer is not None:
+                self._trace_writer.close()
+                self._trace_writer = None
+            if self._results_writer is not None:
+                self._results_writer.close()
+                self._results_writer = None
+
+        self.log.debug("Exiting model run...")
+
+    def replay(self, trace_path):
+        """
+        Re-drives the Model from a trace recorded by an earlier run, without an Algorithm.
+        The messages and computations of each recorded update are fed through the same cycle accounting as a live run.
+        They keep their recorded IDs and cycles, so the replay reproduces the recorded cycle counts whatever the
+        Model's LinkModel and ComputationCostModel, and moves through the DCOPs of the Model's DynDCOP as the recorded
+        run did.
+        An update with no messages or computations that still moved the recorded cycle is a skip to the next DCOP (see
+        _skip_to_next_dcop), and the replay skips to the recorded cycle too.
+        :param trace_path: the trace file to replay.
+        :returns stats: a dict with the final cycle and the total number of messages and computations replayed.
+        """
+        total_messages = 0
+        total_computations = 0
+        recorded_cycle = self._currentCycle
+        for message_records, computation_records, cycle in TraceReader(trace_path).updates():
+            if not message_records and not computation_records and cycle != recorded_cycle:
+                self._currentCycle = max(self._currentCycle, cycle)
+            recorded_cycle = cycle
+            new_messages = [_replayed_message(record) for record in message_records]
+            new_computations = [_replayed_computation(record) for record in computation_records]
+            if new_messages:
+                self._messageIDs.skip_to(max(message.id for message in new_messages) + 1)
+            if new_computations:
+                self._computationIDs.skip_to(max(computation.id for computation in new_computations) + 1)
+            self._advance_timed(new_messages, new_computations)
+            self._update_current_dcop()
+            total_messages += len(new_messages)
+            total_computations += len(new_computations)
+
+        return {'cycle': self._currentCycle, 'total_messages': total_messages,
+                'total_computations': total_computations}
 
     def pre_stop(self):
-        print("pre_stop Model.")
+        self.log.debug("pre_stop Model.")
         self._stop = True
         self._running = False
 
+    def _wait_for_work(self):
+        """
+        Blocks until an Algorithm has new work for the Model, then clears the work event, so work that arrives during
+        the update wakes the Model for the next one.
+        :return bool: True if the Model should update. False if it is stopping.
+        """
+        if self._work_event is not None:
+            while not self._stop and not self._work_event.wait(self.stop_poll_interval):
+                pass
+            self._work_event.clear()
+        return not self._stop
+
+    def _get_response(self, output_queue):
+        """
+        Blocks until `output_queue` has a response from an Algorithm.
+        :return: the response, or None if the Model is stopping.
+        """
+        while not self._stop:
+            try:
+                return output_queue.get(timeout=self.stop_poll_interval)
+            except queue.Empty:
+                continue
+        return None
+
     def _update(self):
         """
         Polls the algorithm for new stats to use to update the model with.
         :return:
         """
+        with self._update_lock:
+            if self.cycle_log.isEnabledFor(logging.DEBUG):
+                self.cycle_log.debug("Model update. Number of pending requests to algorithm: %d",
+                                     self._algorithm_input_queue.qsize())
+            with self.instrumentation.timed('stats', self._algorithm_input_queue):
+                #Ask every Algorithm first, so a portfolio's Algorithms answer in parallel.
+                for _, input_queue, _, message_event in self._algorithm_channels:
+                    input_queue.put(request_messages['STATS'])
+                    message_event.set()
+                responses = [self._get_response(output_queue) for _, _, output_queue, _ in self._algorithm_channels]
+            self.cycle_log.debug("Got response from algorithm: %s", responses)
+            if None in responses: #Stopped while waiting for the Algorithms.
+                return
+
+            if self._portfolio:
+                new_stats = {'unread_messages': [message for stats in responses
+                                                 for message in stats['unread_messages']],
+                             'unread_computations': [computation for stats in responses
+                                                     for computation in stats['unread_computations']]}
+            else:
+                new_stats = responses[0]
+
+            start_cycle = self._currentCycle
+            self._advance(new_stats['unread_messages'], new_stats['unread_computations'])
+            if self._portfolio:
+                self._update_portfolio_stats(responses, start_cycle)
+            if not new_stats['unread_messages'] and not new_stats['unread_computations'] and \
+                    all(stats.get('view_reused') for stats in responses):
+                #Every Algorithm is idle until the DCOP changes, so nothing happens until then.
+                self._skip_to_next_dcop()
+
+            new_dcop = self._update_current_dcop()
+            if self._results_writer is not None:
+                self._write_results(new_stats)
+            if self.metrics is not None:
+                self._update_metrics(new_stats)
+            #In lockstep mode the Simulator expects exactly one update per cycle, even if the DCOP did not change.
+            if self._simulator_queue is not None and (new_dcop is not None or self.barrier is not None):
+                self._simulator_queue.put(new_dcop)
+
+    def _update_portfolio_stats(self, responses, start_cycle):
+        """
+        Adds the update that just finished to the stats of each Algorithm of the portfolio.
+        :param responses: the stats read from each Algorithm in this update, in the order of the algorithm channels.
+        :param start_cycle: the cycle at which the update started.
+        :return:
+        """
+        for (name, _, _, _), new_stats in zip(self._algorithm_channels, responses):
+            stats = self._portfolio_stats[name]
+            new_messages = new_stats['unread_messages']
+            new_computations = new_stats['unread_computations']
+            end_cycle = max([message.deliveryCycle for message in new_messages] +
+                            [computation.endCycle for computation in new_computations] + [start_cycle])
+            stats['active_cycles'] += end_cycle - start_cycle
+            stats['messages'] += len(new_messages)
+            stats['bytes'] += sum(message.size for message in new_messages)
+            stats['computations'] += len(new_computations)
+            cost = new_stats.get('current_cost')
+            if cost is not None and (not stats['cost_curve'] or stats['cost_curve'][-1][1] != cost):
+                stats['cost_curve'].append((self._currentCycle, cost))
+
+    def _write_results(self, new_stats):
+        """
+        Writes the results row of the update that just finished.
+        :param new_stats: the stats read from the algorithm in this update.
+        :return:
+        """
+        new_messages = new_stats['unread_messages']
+        self._results_writer.write_row(self._currentCycle, len(new_messages), self._lastDelivered,
+                                       sum(message.size for message in new_messages),
+                                       len(new_stats['unread_computations']), new_stats.get('current_cost'),
+                                       self._dcopIndex)
 
-        #TODO: Use message passing with the algorithm's queues
-        print("Model Update!")
-        print("Number of pending requests to algorithm: " + str(self._algorithm_input_queue.qsize()))
-        self._algorithm_input_queue.put(request_messages['STATS'])
-        self._algorithm_message_event.set()
-        new_messages = self._algorithm_output_queue.get()
-        print("Got response from algorithm: " + str(new_messages))
-        #new_computations = self.algorithm.newComputations
-
-        #message_time = self._compute_messages_time(new_messages)
-        #computation_time = self._compute_computations_time(new_computations)
-
-        #TODO: store and calculate stats
+    def _update_metrics(self, new_stats):
+        """
+        Updates the shared metrics with the update that just finished.
+        :param new_stats: the stats read from the algorithm in this update.
+        :return:
+        """
+        metrics = self.metrics
+        metrics.set('cycle', self._currentCycle)
+        metrics.add('model_updates')
+        metrics.add('messages', len(new_stats['unread_messages']))
+        metrics.add('bytes', sum(message.size for message in new_stats['unread_messages']))
+        metrics.add('computations', len(new_stats['unread_computations']))
+        if new_stats.get('current_cost') is not None:
+            metrics.set('current_cost', new_stats['current_cost'])
+        metrics.set('dcop_step', self._dcopIndex)
+        try:
+            metrics.set('stats_queue_depth', self._algorithm_input_queue.qsize())
+        except NotImplementedError:  # qsize is not implemented on all platforms.
+            pass
+        metrics.set('last_update_time', time.time())
 
-        #advance model by greater of message cost or computation cost
+    def lockstep_cycle(self):
+        """
+        Overrides pydyndsProcess.lockstep_cycle.
+        Waits for the Algorithm's round, then reads its stats and sends the Simulator the DCOP for the next cycle.
+        :return:
+        """
+        self.barrier.wait() #Cycle start: the Simulator's view is up to date.
+        self.barrier.wait() #Algorithm's round is done.
+        self._update()
 
-        #self.currentCycle = max(message_time, computation_time) # This allows computations to be parallel to eachother and messages
+    def _skip_to_next_dcop(self):
+        """
+        Advances the current cycle to the start cycle of the next DCOP of the DynDCOP, if there is one.
+        The skip is recorded in the trace as an update without messages or computations.
+        :return:
+        """
+        if self._dynDCOP and self._dcopIndex + 1 < len(self._dynDCOP):
+            self._currentCycle = max(self._currentCycle, _start_cycle(self._dynDCOP[self._dcopIndex + 1]))
+            if self._trace_writer is not None:
+                self._trace_writer.write_cycle(self._currentCycle)
 
-        #Assumption: self.dynDCOP orders dcops by start cycle.
-        if self._finished is not True:
-            pass
-            """
-            for dcop in self.dynDCOP:
-                if dcop.startCyle > self.currentCycle:
-                    self.currentDCOP = dcop
-                    if dcop.startCyle < self.currentCycle:
-                        self._finished = True
-            """
+    def _update_current_dcop(self):
+        """
+        Moves to the latest DCOP of the DynDCOP whose start cycle has been reached.
+        :return: the new current DCOP, or None if it did not change.
+        """
+        if not self._dynDCOP:
+            return None
+        index = self._dcopIndex
+        while index + 1 < len(self._dynDCOP) and _start_cycle(self._dynDCOP[index + 1]) <= self._currentCycle:
+            index += 1
+        if index == self._dcopIndex:
+            return None
+        self._dcopIndex = index
+        self.currentDCOP = self._dynDCOP[index]
+        return self.currentDCOP
+
+    def _advance(self, new_messages=(), new_computations=()):
+        """
+        Assigns IDs, if they have none yet, and cycles to messages and computations that are new since the last update,
+        and advances the model by the greater of the message time or the computation time.
+        This allows computations to be parallel to each other and to messages.
+        :param new_messages: the messages read from the algorithm in this update.
+        :param new_computations: the computations read from the algorithm in this update.
+        :return:
+        """
+        for message in new_messages:
+            if message.id is None:
+                message.id = self._messageIDs.nextID()
+            message.startCycle = self._currentCycle
+            message.deliveryCycle = self._currentCycle + self.linkModel.delivery_cycles(message)
+
+        for computation in new_computations:
+            if computation.id is None:
+                computation.id = self._computationIDs.nextID()
+            computation.startCycle = self._currentCycle
+            computation.endCycle = self._currentCycle + self.computationCostModel.cycles(computation)
+        self._advance_timed(new_messages, new_computations)
+
+    def _advance_timed(self, new_messages=(), new_computations=()):
+        """
+        Advances the model by the greater of the message time or the computation time, delivers the messages due, and
+        records the update in the trace.
+        :param new_messages: the messages read in this update, with their IDs and cycles assigned.
+        :param new_computations: the computations read in this update, with their IDs and cycles assigned.
+        :return:
+        """
+        message_time = 0
+        computation_time = 0
+        if new_messages:
+            message_time = self._compute_messages_time(new_messages)
+        if new_computations:
+            computation_time = self._compute_computations_time(new_computations)
+
+        self._currentCycle += max(message_time, computation_time)
+        self._deliver(new_messages)
+
+        if self._trace_writer is not None:
+            for message in new_messages:
+                self._trace_writer.write_message(message)
+            for computation in new_computations:
+                self._trace_writer.write_computation(computation)
+            self._trace_writer.write_cycle(self._currentCycle)
+
+    def _deliver(self, new_messages=()):
+        """
+        Adds new messages to the messages in flight, and delivers those due by the current cycle.
+        :param new_messages: the messages sent in this update, with their delivery cycles assigned.
+        :return:
+        """
+        for message in new_messages:
+            heapq.heappush(self._pending_deliveries, message.deliveryCycle)
+        delivered = 0
+        while self._pending_deliveries and self._pending_deliveries[0] <= self._currentCycle:
+            heapq.heappop(self._pending_deliveries)
+            delivered += 1
+        self._lastDelivered = delivered
+        self._messagesDelivered += delivered
 
     def _compute_messages_time(self, new_messages=()):
         """
-        Using the settings of this Model, calculates the time, in cycles, to advance due to new messages sent.
-        :param new_messages: the new messages that have completed being sent.
+        Calculates the time, in cycles, to advance due to new messages sent: the time until the last of them is delivered.
+        :param new_messages: the new messages that have completed being sent, with their delivery cycles assigned.
         :return: the number of cycles to advance the model by.
         """
-        last_first_cycle = _find_latest_start(new_messages)
-        return last_first_cycle - self._currentCycle + self.messageDelay
+        last_delivery_cycle = max(message.deliveryCycle for message in new_messages)
+        return last_delivery_cycle - self._currentCycle
 
     def _compute_computations_time(self, new_computations=()):
-        last_first_cycle = _find_latest_start(new_computations)
-        return last_first_cycle - self._currentCycle + self.computationCost
+        """
+        Calculates the time, in cycles, to advance due to new computations: the time until the last of them ends.
+        Computations of different agents are concurrent, so this counts non-concurrent cost.
+        :param new_computations: the new computations, with their end cycles assigned.
+        :return: the number of cycles to advance the model by.
+        """
+        last_end_cycle = max(computation.endCycle for computation in new_computations)
+        return last_end_cycle - self._currentCycle
+
+
+def _replayed_message(record):
+    """
+    :param record: a message record read from a trace.
+    :return: the recorded Message, with its recorded ID and cycles.
+    """
+    message = Message(record[5], record[6], size=record[4])
+    message.id, message.startCycle, message.deliveryCycle = record[1:4]
+    return message
 
 
-def _find_latest_start(new_items=()):
+def _replayed_computation(record):
     """
-    Finds the start cycle of the latest item.
-    Assumes all items take the same time (have the same cost)
-    :param new_items: the list of items to check
-    :returns last_first_cycle: the the latest start cycle.
+    :param record: a computation record read from a trace.
+    :return: the recorded Computation, with its recorded ID and cycles.
     """
+    computation = Computation(record[6], operations=record[4], cpu_time=record[5])
+    computation.id, computation.startCycle, computation.endCycle = record[1:4]
+    return computation
 
-    last_first_cycle = new_items[0].startCycle
-    for message in new_items:
-        if message.startCycle > last_first_cycle:
-            last_first_cycle = message.startCycle
 
-    return last_first_cycle
+def _start_cycle(dcop):
+    """
+    :return: the cycle at which `dcop` becomes the current DCOP of its DynDCOP.
+    """
+    if isinstance(dcop, dict):
+        return dcop['start_cycle']
+    return dcop.start_cycle
 
 
 if __name__ == "__main__":
@@ -0,0 +1,393 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import hmac
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import secrets
+import signal
+import socket
+import threading
+import time
+
+from SimulationController import SimulationController
+from Algorithms.Registry import get_algorithm_class
+from common.DynDCOPFile import load_dyndcop
+from common.Logging import get_logger
+
+__author__ = 'Victor Szczepanski'
+
+"""
+A long-running simulation daemon. Start it with:
+
+    python pydynds.py serve --socket /tmp/pydynds.sock
+    python pydynds.py serve --port 7878 --token-file ~/.pydynds-token
+
+Clients connect over the Unix socket or to localhost TCP, and send one job per connection as a line of JSON:
+
+    {"dyndcop": path, "algorithm": name, "message_delay": int, "computation_cost": int,
+     "cycles": int, "duration": seconds, "stats_interval": seconds, "token": string}
+
+"dyndcop" must be a JSON DynDCOP file, since a pickled one could run arbitrary code in the server. "algorithm" may be a
+list of names, to run a portfolio. See SimulationController.setup.
+
+The Unix socket is only accessible to the user running the server. A TCP server may be reached by any local user, so it
+writes a random token to its token file, readable only by that user, and rejects jobs without the token.
+
+With cycles, the simulation runs synchronously for that many cycles. Otherwise, it runs for duration seconds.
+The server answers with a stream of JSON lines, each with a "status":
+
+    queued:  the job is waiting for a free worker. "position" is its place in the queue.
+    running: the job has started.
+    stats:   "metrics" holds the simulation's live metrics. Sent every stats_interval seconds.
+    done:    "metrics" and "stats" hold the final metrics and the Algorithm's totals, or each Algorithm's by name.
+    error:   "error" describes what went wrong.
+
+Jobs run in a pool of max_jobs worker processes, by default one per CPU, started with the server. Each worker keeps
+PyDynDS imported between jobs, and runs one job at a time, so jobs run in parallel on separate CPUs. The rest wait in
+first come, first served order.
+"""
+
+_log = get_logger('Server')
+
+DEFAULT_STATS_INTERVAL = 1.0
+_STEP_CHUNK = 100 #Cycles stepped between stats messages of a synchronous job.
+_POLL_INTERVAL = 1.0 #Seconds between checks that a busy worker is still alive.
+_FINAL_STATUSES = ('done', 'error')
+
+
+def _json_safe(values):
+    """
+    :return: the entries of `values` that are numbers or None, with NaN replaced by None.
+    """
+    safe = {}
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            safe[key] = None if isinstance(value, float) and math.isnan(value) else value
+        elif value is None:
+            safe[key] = None
+    return safe
+
+
+def _run_job(job, send, cancel, log_level):
+    """
+    Runs a job in a worker process.
+    :param job: the job's dict.
+    :param send: a function that sends a message about the job to its client.
+    :param cancel: a multiprocessing.Event set when the client has gone, after which the job stops early.
+    :param log_level: the level of the simulation's logs.
+    :return:
+    """
+    controller = SimulationController(log_level=log_level)
+    stats_interval = job.get('stats_interval', DEFAULT_STATS_INTERVAL)
+    cycles = job.get('cycles')
+    try:
+        dyndcop = load_dyndcop(job['dyndcop'], trusted=False)
+        controller.setup(job['algorithm'], dyndcop, job.get('message_delay', 0), job.get('computation_cost', 0),
+                         synchronous=cycles is not None)
+        controller.start()
+        send({'status': 'running'})
+        if cycles is not None:
+            remaining = cycles
+            while remaining > 0 and not cancel.is_set():
+                chunk = min(remaining, _STEP_CHUNK)
+                controller.step(chunk)
+                remaining -= chunk
+                send({'status': 'stats', 'metrics': _json_safe(controller.metrics.snapshot())})
+        else:
+            end = time.monotonic() + job.get('duration', 0)
+            while time.monotonic() < end and not cancel.is_set():
+                cancel.wait(min(stats_interval, max(0, end - time.monotonic())))
+                send({'status': 'stats', 'metrics': _json_safe(controller.metrics.snapshot())})
+        if cancel.is_set():
+            send({'status': 'error', 'error': 'Cancelled.'})
+            return
+        metrics = _json_safe(controller.metrics.snapshot())
+        stats = controller.get_current_stats()
+        if 'portfolio' in stats:
+            stats = dict((name, _json_safe(values)) for name, values in stats['portfolio'].items())
+        else:
+            stats = _json_safe(stats)
+    finally:
+        controller.stop()
+    send({'status': 'done', 'metrics': metrics, 'stats': stats})
+
+
+def _work(jobs, messages, cancel, log_level):
+    """
+    The main loop of a worker process: runs each job from `jobs`, and puts its messages on `messages`, until it reads
+    None.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN) #The server stops its workers itself.
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        try:
+            _run_job(job, messages.put, cancel, log_level)
+        except Exception as error:
+            _log.exception("Job failed.")
+            messages.put({'status': 'error', 'error': str(error)})
+    #The components' threads exit within a poll interval of a stop. Wait for them, since the process closes the
+    #queues they read when it exits.
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and not thread.daemon:
+            thread.join(_POLL_INTERVAL * 5)
+
+
+class _Worker(object):
+    """
+    A worker process, with its queues of jobs and messages.
+    """
+
+    def __init__(self, context, log_level):
+        self.jobs = context.Queue()
+        self.messages = context.Queue()
+        self.cancel = context.Event()
+        self.process = context.Process(target=_work, args=(self.jobs, self.messages, self.cancel, log_level),
+                                       daemon=True)
+        self.process.start()
+
+    def next_message(self):
+        """
+        :return: the next message about the running job, or None if there is none within _POLL_INTERVAL seconds.
+        """
+        try:
+            return self.messages.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    def close(self, timeout=5):
+        if self.process.is_alive():
+            self.cancel.set()
+            self.jobs.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class SimulationServer(object):
+    """
+    Runs simulation jobs for clients of a local socket, in a pool of worker processes.
+    """
+
+    def __init__(self, max_jobs=None, log_level=logging.WARNING, token=None):
+        """
+        :param max_jobs: the number of worker processes, and so of jobs that may run at once. Defaults to the number
+        of CPUs.
+        :param log_level: the level of the simulations' logs.
+        :param token: if not None, jobs must include this token. Required to listen on TCP.
+        :return:
+        """
+        self.max_jobs = max_jobs if max_jobs is not None else (os.cpu_count() or 1)
+        self.log_level = log_level
+        self.token = token
+        self._context = multiprocessing.get_context('spawn') #Forking the event loop's threads is not safe.
+        self._workers = []
+        self._idle = None
+        self._waiting = []
+        self._executor = None
+        self._server = None
+
+    async def _send(self, writer, message):
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def _acquire_worker(self, writer):
+        ticket = object()
+        self._waiting.append(ticket)
+        try:
+            if self._idle.empty():
+                await self._send(writer, {'status': 'queued', 'position': self._waiting.index(ticket) + 1})
+            return await self._idle.get()
+        finally:
+            self._waiting.remove(ticket)
+
+    def _release_worker(self, worker):
+        if not worker.process.is_alive():
+            _log.warning("Replacing a worker process that exited.")
+            self._workers.remove(worker)
+            worker = _Worker(self._context, self.log_level)
+            self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def _run_job(self, worker, job, writer):
+        """
+        Runs `job` on `worker`, and forwards its messages to the client until it is done. If the client goes, the job
+        is cancelled, and its remaining messages are discarded.
+        """
+        loop = asyncio.get_running_loop()
+        worker.cancel.clear()
+        worker.jobs.put(job)
+        disconnected = False
+        while True:
+            message = await loop.run_in_executor(self._executor, worker.next_message)
+            if message is None:
+                if not worker.process.is_alive():
+                    raise RuntimeError("The worker process running the job exited.")
+                continue
+            if not disconnected:
+                try:
+                    await self._send(writer, message)
+                except ConnectionError:
+                    disconnected = True
+                    worker.cancel.set()
+            if message['status'] in _FINAL_STATUSES:
+                break
+        if disconnected:
+            raise ConnectionResetError("Client disconnected.")
+
+    def _check_job(self, job):
+        """
+        :raises ValueError: if `job` is not a valid job.
+        """
+        if self.token is not None and not hmac.compare_digest(str(job.get('token', '')).encode('utf-8'),
+                                                                  self.token.encode('utf-8')):
+            raise ValueError("Invalid token.")
+        if 'dyndcop' not in job or 'algorithm' not in job:
+            raise ValueError("A job needs a 'dyndcop' path and an 'algorithm' name.")
+        for name in job['algorithm'] if isinstance(job['algorithm'], list) else [job['algorithm']]:
+            if get_algorithm_class(name) is None:
+                raise ValueError("Unknown algorithm: " + str(name))
+
+    async def _handle(self, reader, writer):
+        try:
+            line = await reader.readline()
+            job = json.loads(line.decode('utf-8'))
+            self._check_job(job)
+            worker = await self._acquire_worker(writer)
+            try:
+                _log.info("Running job: %s", dict((key, value) for key, value in job.items() if key != 'token'))
+                await self._run_job(worker, job, writer)
+            finally:
+                self._release_worker(worker)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            _log.warning("Client disconnected.")
+        except Exception as error:
+            _log.exception("Job failed.")
+            try:
+                await self._send(writer, {'status': 'error', 'error': str(error)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def start(self, socket_path=None, host='127.0.0.1', port=0):
+        """
+        Starts the worker processes, and starts accepting jobs on the Unix socket `socket_path`, or on localhost TCP if
+        it is None.
+        :raises ValueError: if the server would listen on TCP without a token.
+        :return: the asyncio server.
+        """
+        if socket_path is None and self.token is None:
+            raise ValueError("A TCP server needs a token, since any local user can connect to it.")
+        self._workers = [_Worker(self._context, self.log_level) for _ in range(self.max_jobs)]
+        self._idle = asyncio.Queue()
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_jobs)
+        if socket_path is not None:
+            umask = os.umask(0o177) #The socket is made readable and writable only by this user.
+            try:
+                self._server = await asyncio.start_unix_server(self._handle, path=socket_path)
+            finally:
+                os.umask(umask)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        _log.info("Serving on %s with %d workers.", socket_path or self._server.sockets[0].getsockname(),
+                  self.max_jobs)
+        return self._server
+
+    def close(self):
+        """
+        Stops accepting jobs, and stops the worker processes.
+        :return:
+        """
+        if self._server is not None:
+            self._server.close()
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    async def serve_forever(self, socket_path=None, host='127.0.0.1', port=0):
+        server = await self.start(socket_path, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def write_token(path):
+    """
+    Writes a new random token to `path`, readable and writable only by this user.
+    :return: the token.
+    """
+    token = secrets.token_hex(16)
+    if os.path.exists(path):
+        os.remove(path)
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as f:
+        f.write(token)
+    return token
+
+
+def read_token(path):
+    """
+    :return: the token written to `path` by a TCP server.
+    """
+    with open(path) as f:
+        return f.read().strip()
+
+
+def serve(socket_path=None, host='127.0.0.1', port=0, max_jobs=None, log_level=logging.WARNING, token_path=None):
+    """
+    Runs a SimulationServer until interrupted or terminated.
+    :param token_path: the file a TCP server writes its token to. Required to listen on TCP.
+    """
+    token = None
+    if socket_path is None:
+        if token_path is None:
+            raise ValueError("A TCP server needs a token file.")
+        token = write_token(token_path)
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        asyncio.run(SimulationServer(max_jobs, log_level, token).serve_forever(socket_path, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def submit(job, socket_path=None, host='127.0.0.1', port=None, token=None):
+    """
+    Submits a job to a running server, and generates the server's messages about it until it is done.
+    :param job: a dict, as described in this module's documentation.
+    :param token: the server's token, for a TCP server. See read_token.
+    :return:
+    """
+    if token is not None:
+        job = dict(job, token=token)
+    if socket_path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socket_path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile('rwb') as stream:
+        stream.write(json.dumps(job).encode('utf-8') + b'\n')
+        stream.flush()
+        for line in stream:
+            message = json.loads(line.decode('utf-8'))
+            yield message
+            if message['status'] in _FINAL_STATUSES:
+                return
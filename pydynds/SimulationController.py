@@ -1,10 +1,17 @@
-from multiprocessing import Queue, Event
+from multiprocessing import Queue, Event, Barrier
+import logging
+import queue
 import time
 
 from Algorithms.Algorithm import Algorithm, SampleAlgorithm
 from Model.Model import Model
 from Simulator.Simulator import Simulator
-from common.SimulatorMessages import request_messages
+from common.SimulatorMessages import request_messages, RestoreRequest, StepRequest
+from common.Checkpoint import write_checkpoint, read_checkpoint
+from common.Logging import get_logger, start_logging
+from common.Channel import BoundedChannel
+from common.IDGenerator import IDGenerator
+from common.Metrics import SharedMetrics
 
 __author__ = 'Victor Szczepanski'
 
@@ -15,9 +22,14 @@ run simulations in PyDynDS.
 
 from enum import Enum
 
+_log = get_logger('SimulationController')
+
 class InvalidState(RuntimeError):
     pass
 
+class ResponseTimeout(TimeoutError):
+    pass
+
 class SimulationController(object):
     """
     Controls access to the simulation.
@@ -32,7 +44,8 @@ class SimulationController(object):
 
     Also note that calling the stop function will cause all internal state to be lost -
     including any stats from the Algorithm or state of the Model.
-    Only call this method after collecting any relevant information.
+    Only call this method after collecting any relevant information, or after saving a checkpoint.
+    A checkpoint can be restored with restore, which sets up the simulation again if necessary.
 
     A visual state diagram is made available in  docs/design/SimulatorControlStates.png
 
@@ -47,7 +60,23 @@ class SimulationController(object):
 
     states = Enum('States', 'STOPPED SETUP RUNNING PAUSED')
 
-    def __init__(self):
+    stop_join_timeout = 5 # Seconds to wait for each profiled thread to exit in stop.
+
+    def __init__(self, log_level=logging.INFO, channel_capacity=16, channel_policy=BoundedChannel.policies.COALESCE,
+                 response_timeout=None):
+        """
+        :param log_level: the level of PyDynDS logs. All components log through a shared background writer.
+        :param channel_capacity: the capacity of the request channels from the Model and Simulator to the Algorithm.
+        0 means unbounded.
+        :param channel_policy: what the request channels do when they are full. See common.Channel.BoundedChannel.
+        :param response_timeout: the number of seconds to wait for each component's response to a request before
+        raising ResponseTimeout. None waits forever.
+        """
+        self.log_queue = start_logging(log_level)
+        self.channel_capacity = channel_capacity
+        self.channel_policy = channel_policy
+        self.response_timeout = response_timeout
+
         # We initialize these class variables in __init__ to make it more clear. However, these are reinitialized in _init.
         self.running = False
         self.paused = False
@@ -96,72 +125,402 @@ class SimulationController(object):
         self.model_control_output_queue = Queue()
         self.model_control_message_event = Event()
 
+        # A portfolio runs several Algorithms on one Model and Simulator. algorithms holds all of them, and algorithm
+        # is the first.
+        self.portfolio = False
+        self.algorithms = []
+
+        # The arguments of the last call to setup, saved in checkpoints so a run can be restored from STOPPED.
+        self._setup_args = None
+
+        # The numbers of acknowledgements (SUCCESS) and other responses still to arrive on each control output queue
+        # (by id) whose callers stopped waiting. They are discarded when they arrive, so responses stay matched to
+        # their requests. They are counted separately, since a step is acknowledged only after its cycles are done,
+        # possibly after the responses to later requests.
+        self._stale_responses = {}
+
         #shared message events
         self.algorithm_model_message_event = Event()
         self.algorithm_simulator_message_event = Event()
+        #Set by the Algorithms when they have new work for the Model, which sleeps on it between updates.
+        self.algorithm_work_event = Event()
 
         #component queues
-        self.algorithm_model_input_queue = Queue()
+        self.algorithm_model_input_queue = BoundedChannel(self.channel_capacity, self.channel_policy)
         self.algorithm_model_output_queue = Queue()
-        self.algorithm_simulator_input_queue = Queue()
+        self.algorithm_simulator_input_queue = BoundedChannel(self.channel_capacity, self.channel_policy)
         self.algorithm_simulator_output_queue = Queue()
+        self.simulator_model_queue = Queue()
+
+        #The queues and events of each Algorithm, as keyword arguments of Algorithm. The first Algorithm's are the
+        #attributes above.
+        self._algorithm_queues = [self._make_algorithm_queues(first=True)]
+
+        #Shared by the Model, Algorithm, and Simulator in lockstep mode.
+        self.cycle_barrier = None
+
+        #Shared by every process that assigns message or computation IDs, so IDs are unique across processes.
+        self.message_id_counter = IDGenerator.make_counter()
+        self.computation_id_counter = IDGenerator.make_counter()
+
+        #Live metrics, updated in place by the Model and Algorithm. Read them with metrics.snapshot.
+        self.metrics = SharedMetrics()
 
-    def setup(self, algorithm_name, dyndcop, message_delay=0, computation_cost=0):
+    def _make_algorithm_queues(self, first=False):
+        """
+        :param first: if True, returns the queues and events of the first Algorithm, made by _init.
+        :return: a dict of the queues and events of one Algorithm, by the name of their parameter of Algorithm.
+        """
+        if first:
+            return {'algorithm_input_queue': self.algorithm_control_input_queue,
+                    'algorithm_output_queue': self.algorithm_control_output_queue,
+                    'controller_message_event': self.algorithm_control_message_event,
+                    'model_input_queue': self.algorithm_model_input_queue,
+                    'model_output_queue': self.algorithm_model_output_queue,
+                    'model_message_event': self.algorithm_model_message_event,
+                    'simulator_input_queue': self.algorithm_simulator_input_queue,
+                    'simulator_output_queue': self.algorithm_simulator_output_queue,
+                    'simulator_message_event': self.algorithm_simulator_message_event}
+        return {'algorithm_input_queue': Queue(), 'algorithm_output_queue': Queue(),
+                'controller_message_event': Event(),
+                'model_input_queue': BoundedChannel(self.channel_capacity, self.channel_policy),
+                'model_output_queue': Queue(), 'model_message_event': Event(),
+                'simulator_input_queue': BoundedChannel(self.channel_capacity, self.channel_policy),
+                'simulator_output_queue': Queue(), 'simulator_message_event': Event()}
+
+    def setup(self, algorithm_name, dyndcop, message_delay=0, computation_cost=0, trace_path=None, instrument=False,
+              profile_dir=None, synchronous=False, history_size=1000, history_path=None, results_path=None,
+              results_format='csv', link_model=None, computation_cost_model=None, result_cache=None,
+              reuse_results=False):
         """
         Sets up the Simulator, Algorithm, and Model using provided arguments.
+        If setup fails after making some of the components, they are stopped, and the simulation is left STOPPED.
+        :param algorithm_name: the name of the Algorithm, or a list of names to run a portfolio of Algorithms on one
+        Model and Simulator. The Simulator shares its view with all of them, and the Model advances by the slowest of
+        them in each update, so they all see the same DCOPs. get_current_stats then returns the stats of each Algorithm,
+        by name, under the key 'portfolio'.
+        :param trace_path: if not None, the Model records every message and computation to this trace file.
+        The trace can be replayed with Model.replay.
+        :param instrument: if True, the Model and Algorithm record latency histograms and queue depths for their
+        inter-process channels. These are included in get_current_stats under the key 'ipc'.
+        :param profile_dir: if not None, every thread of the Model and Algorithm runs under a profiler and writes its
+        profile to this directory when the simulation is stopped. Use common.Profiling.merge_profiles to combine them.
+        :param synchronous: if True, the Model, Algorithm, and Simulator run in lockstep through a shared cycle barrier.
+        After start, they only advance when step is called.
+        :param history_size: the number of recent messages and computations the Algorithm keeps in memory.
+        :param history_path: if not None, the Algorithm spills older messages and computations to this file. Each
+        Algorithm of a portfolio spills to its own file, named history_path + '.' + its name.
+        :param results_path: if not None, the Model streams one row of results per update to this path, replacing
+        any results already there. Read them with common.Results.read_results.
+        :param results_format: the format of the results, 'csv' or 'npz'. npz requires NumPy.
+        :param link_model: a common.Link.LinkModel of the latency and bandwidth of the links between agents, used by
+        the Model to compute when each message is delivered. If None, every message takes message_delay cycles.
+        :param computation_cost_model: a common.Computation.ComputationCostModel used by the Model to convert the
+        measured cost of each computation into cycles. If None, every computation takes computation_cost cycles.
+        :param result_cache: if not None, a common.ResultCache.ResultCache each Algorithm stores the results of the
+        views it solves in.
+        :param reuse_results: if True, each Algorithm reuses cached results instead of solving a view again.
         :raises InvalidState: if setup is called and simulation is not STOPPED, raises this exception.
+        :raises ValueError: if a portfolio names an Algorithm more than once.
         :returns Simulator, Algorithm, Model: references to the new Simualtor, Algorithm, and Model objects.
         """
         if self.current_state is not SimulationController.states.STOPPED:
             raise InvalidState("Cannot setup a not stopped simulation. Current State: " + str(self.current_state))
 
-        print("Making model...")
-        self.model = Model(dyn_dcop=dyndcop, algorithm_input_queue=self.algorithm_model_input_queue,
-                           algorithm_output_queue=self.algorithm_model_output_queue,
-                           model_request_queue=self.model_control_input_queue,
-                           model_response_queue=self.model_control_output_queue,
-                           model_message_event=self.model_control_message_event,
-                           algorithm_message_event=self.algorithm_model_message_event,
-                           message_delay=message_delay, computation_cost=computation_cost)
-
-        print("Made model.")
-        #Get initial state from model to pass to algorithm
-        print("Getting initial state of DynDCOP...")
-        self.model_control_input_queue.put(request_messages['CURRENT_STATE'])
-        self.model_control_message_event.set()
-        dcop = self.model_control_output_queue.get()
-
-        print("Got state: " + str(dcop))
-
-        print("Making Simulator...")
-        self.simulator = Simulator()
-        print("Made Simulator.")
-
-        print("Making Algorithm...")
-        alg_kwargs = {'simulator_message_event': self.algorithm_simulator_message_event,
-                      'simulator_input_queue': self.algorithm_simulator_input_queue,
-                      'simulator_output_queue': self.algorithm_simulator_output_queue,
-                      'model_message_event': self.algorithm_model_message_event,
-                      'model_input_queue': self.algorithm_model_input_queue,
-                      'model_output_queue': self.algorithm_model_output_queue,
-                      'controller_message_event': self.algorithm_control_message_event,
-                      'algorithm_input_queue': self.algorithm_control_input_queue,
-                      'algorithm_output_queue': self.algorithm_control_output_queue,
-                      'initialDCOP': dcop}
-        self.algorithm = Algorithm.factory(algorithm_name, **alg_kwargs)
-
-        print("Made Algorithm: " + str(type(self.algorithm)))
+        self._setup_args = {'algorithm_name': algorithm_name, 'dyndcop': dyndcop, 'message_delay': message_delay,
+                            'computation_cost': computation_cost, 'trace_path': trace_path,
+                            'instrument': instrument, 'profile_dir': profile_dir, 'synchronous': synchronous,
+                            'history_size': history_size, 'history_path': history_path,
+                            'results_path': results_path, 'results_format': results_format,
+                            'link_model': link_model, 'computation_cost_model': computation_cost_model,
+                            'result_cache': result_cache, 'reuse_results': reuse_results}
+        self.portfolio = not isinstance(algorithm_name, str)
+        algorithm_names = list(algorithm_name) if self.portfolio else [algorithm_name]
+        if len(set(algorithm_names)) != len(algorithm_names):
+            raise ValueError("A portfolio cannot name an Algorithm more than once: " + str(algorithm_names))
+        self._algorithm_queues += [self._make_algorithm_queues() for _ in algorithm_names[1:]]
+        if synchronous:
+            self.cycle_barrier = Barrier(2 + len(algorithm_names))
+
+        try:
+            _log.info("Making model...")
+            self.model = Model(dyn_dcop=dyndcop, algorithm_input_queue=self.algorithm_model_input_queue,
+                               algorithm_output_queue=self.algorithm_model_output_queue,
+                               model_request_queue=self.model_control_input_queue,
+                               model_response_queue=self.model_control_output_queue,
+                               model_message_event=self.model_control_message_event,
+                               algorithm_message_event=self.algorithm_model_message_event,
+                               message_delay=message_delay, computation_cost=computation_cost, trace_path=trace_path,
+                               instrument=instrument, profile_dir=profile_dir,
+                               simulator_queue=self.simulator_model_queue, barrier=self.cycle_barrier,
+                               results_path=results_path, results_format=results_format, link_model=link_model,
+                               computation_cost_model=computation_cost_model,
+                               message_id_counter=self.message_id_counter,
+                               computation_id_counter=self.computation_id_counter, metrics=self.metrics,
+                               algorithm_channels=[(name, queues['model_input_queue'], queues['model_output_queue'],
+                                                    queues['model_message_event'])
+                                                   for name, queues in zip(algorithm_names, self._algorithm_queues)]
+                               if self.portfolio else None, work_event=self.algorithm_work_event)
+
+            _log.info("Made model.")
+            #Get initial state from model to pass to algorithm
+            _log.info("Getting initial state of DynDCOP...")
+            dcop = self._receive_all(self.send_request(request_messages['CURRENT_STATE'], ('model',)))[0]
+
+            _log.debug("Got state: %s", dcop)
+
+            _log.info("Making Simulator...")
+            self.simulator = Simulator(simulator_input_queue=self.simulator_control_input_queue,
+                                       simulator_output_queue=self.simulator_control_output_queue,
+                                       algorithm_input_queue=self.algorithm_simulator_input_queue,
+                                       algorithm_output_queue=self.algorithm_simulator_output_queue,
+                                       model_input_queue=self.simulator_model_queue,
+                                       simulator_message_event=self.simulator_control_message_event,
+                                       algorithm_message_event=self.algorithm_simulator_message_event,
+                                       initial_view=dcop, instrument=instrument, profile_dir=profile_dir,
+                                       barrier=self.cycle_barrier,
+                                       algorithm_queues=[(queues['simulator_input_queue'],
+                                                          queues['simulator_output_queue'])
+                                                         for queues in self._algorithm_queues] if self.portfolio else None)
+            _log.info("Made Simulator.")
+
+            _log.info("Making Algorithm...")
+            alg_kwargs = {'initialDCOP': dcop,
+                          'instrument': instrument,
+                          'profile_dir': profile_dir,
+                          'barrier': self.cycle_barrier,
+                          'history_size': history_size,
+                          'history_path': history_path,
+                          'metrics': self.metrics,
+                          'result_cache': result_cache,
+                          'reuse_results': reuse_results,
+                          'work_event': self.algorithm_work_event,
+                          'message_id_counter': self.message_id_counter,
+                          'computation_id_counter': self.computation_id_counter}
+            self.algorithms = [Algorithm.factory(name, **dict(alg_kwargs, history_path=self._history_path(name),
+                                                              **queues))
+                               for name, queues in zip(algorithm_names, self._algorithm_queues)]
+            self.algorithm = self.algorithms[0]
+        except BaseException:
+            self.stop() #Stops the components made before the failure, whose threads would otherwise never exit.
+            raise
+
+        _log.info("Made Algorithms: %s", ", ".join(type(algorithm).__name__ for algorithm in self.algorithms))
         self.current_state = SimulationController.states.SETUP
-        print("Done with Setup.")
+        _log.info("Done with Setup.")
+
+    def _history_path(self, algorithm_name):
+        """
+        :return: the spill file of the history of the Algorithm named algorithm_name, or None if it has none.
+        """
+        history_path = self._setup_args['history_path']
+        if history_path is None or not self.portfolio:
+            return history_path
+        return history_path + '.' + algorithm_name
 
     def get_current_stats(self):
         """
         We name this function as a getter, rather than a property, since it incurs some inter-process communication.
         :return current stats from the algorithm:
         """
-        self.algorithm_control_input_queue.put(request_messages['STATS'])
-        self.algorithm_control_message_event.set()
-        return self.algorithm_control_output_queue.get()
+        output_queues = self._send_stats_requests()
+        return self._make_stats(self._receive_all(output_queues))
+
+    def _send_stats_requests(self):
+        output_queues = self.send_request(request_messages['STATS'], ('algorithm',))
+        if self.portfolio:
+            output_queues += self.send_request(request_messages['PORTFOLIO_STATS'], ('model',))
+        if self._setup_args is not None and self._setup_args['instrument']:
+            output_queues += self.send_request(request_messages['INSTRUMENTATION'], ('model', 'algorithm'))
+        return output_queues
+
+    def _make_stats(self, responses):
+        """
+        :param responses: the responses to the requests sent by _send_stats_requests.
+        :return: the stats.
+        """
+        algorithm_stats, responses = responses[:len(self.algorithms)], responses[len(self.algorithms):]
+        for stats, queues in zip(algorithm_stats, self._algorithm_queues):
+            stats['channels'] = {'algorithm_model': queues['model_input_queue'].stats(),
+                                 'algorithm_simulator': queues['simulator_input_queue'].stats()}
+        if not self.portfolio:
+            stats = algorithm_stats[0]
+            if responses:
+                stats['ipc'] = {'Model': responses[0], 'Algorithm': responses[1]}
+            return stats
+
+        model_stats, responses = responses[0], responses[1:]
+        stats = {'portfolio': dict((name, dict(algorithm_stats[index], **model_stats[name]))
+                                   for index, name in enumerate(self._setup_args['algorithm_name']))}
+        if responses:
+            stats['ipc'] = {'Model': responses[0]}
+            for index, name in enumerate(self._setup_args['algorithm_name']):
+                stats['portfolio'][name]['ipc'] = responses[1 + index]
+        return stats
+
+    #send_request, take_stale_response, and abandon_responses let a wrapper, such as AsyncSimulationController, wait
+    #for the responses to requests itself, while keeping them matched to their requests.
+
+    def send_request(self, request, components=('model', 'simulator', 'algorithm')):
+        """
+        Sends a control request to each of `components`.
+        :param request: the request.
+        :param components: the names of the components: 'model', 'simulator', or 'algorithm'. 'algorithm' sends the
+        request to every Algorithm of a portfolio.
+        :return: the output queues to read each component's response from, in the order of components.
+        """
+        output_queues = []
+        for component in components:
+            if component == 'algorithm':
+                channels = [(queues['algorithm_input_queue'], queues['controller_message_event'],
+                             queues['algorithm_output_queue']) for queues in self._algorithm_queues]
+            else:
+                channels = [(getattr(self, component + '_control_input_queue'),
+                             getattr(self, component + '_control_message_event'),
+                             getattr(self, component + '_control_output_queue'))]
+            for input_queue, message_event, output_queue in channels:
+                input_queue.put(request)
+                message_event.set()
+                output_queues.append(output_queue)
+        return output_queues
+
+    def take_stale_response(self, output_queue, response):
+        """
+        :return: True if `response`, read from output_queue, is stale and should be discarded.
+        """
+        stale = self._stale_responses.get(id(output_queue))
+        if stale is None:
+            return False
+        kind = 0 if response is request_messages['SUCCESS'] else 1
+        if stale[kind] > 0:
+            stale[kind] -= 1
+            return True
+        return False
+
+    def abandon_responses(self, output_queues, acknowledgement):
+        """
+        Marks the responses still to arrive on output_queues as stale.
+        :param acknowledgement: True if the responses are acknowledgements (SUCCESS).
+        """
+        for output_queue in output_queues:
+            self._stale_responses.setdefault(id(output_queue), [0, 0])[0 if acknowledgement else 1] += 1
+
+    def _receive_all(self, output_queues, timeout=None, acknowledgement=False):
+        """
+        Reads one response from each queue, discarding stale responses.
+        :param output_queues: the queues returned by send_request.
+        :param timeout: the number of seconds to wait for all responses. Defaults to response_timeout.
+        :param acknowledgement: True if the responses are acknowledgements (SUCCESS).
+        :raises ResponseTimeout: if the responses do not arrive in time.
+        :return: the responses, in the order of output_queues.
+        """
+        if timeout is None:
+            timeout = self.response_timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        responses = []
+        for index, output_queue in enumerate(output_queues):
+            while True:
+                try:
+                    response = output_queue.get(timeout=None if deadline is None else
+                                                max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    self.abandon_responses(output_queues[index:], acknowledgement)
+                    raise ResponseTimeout("No response from a component within " + str(timeout) + " seconds.")
+                if not self.take_stale_response(output_queue, response):
+                    break
+            responses.append(response)
+        return responses
+
+    def checkpoint(self, path):
+        """
+        Saves the state of the Model, Simulator, and Algorithm, including messages the Model has not yet read, to
+        `path`.
+        The setup arguments are saved as well, so the checkpoint can be restored into a STOPPED SimulationController.
+        A RUNNING simulation is paused for the snapshot, and resumed after it. The Model takes its own and the
+        Algorithms' snapshots between two of its updates, so every message is counted exactly once.
+        :param path: the file to write the checkpoint to.
+        :raises InvalidState: if the simulation is STOPPED.
+        :return:
+        """
+        self._check_checkpoint()
+        running = self.current_state is SimulationController.states.RUNNING
+        if running:
+            self.pause()
+        try:
+            states = self._receive_all(self.send_request(request_messages['CHECKPOINT'], ('model',)))[0]
+            write_checkpoint(path, self._checkpoint_sections(states))
+        finally:
+            if running:
+                self.resume()
+
+    def _checkpoint_sections(self, responses):
+        """
+        :param responses: the states of the Model and each Algorithm, as returned by Model.get_checkpoint_states.
+        :return: the sections of a checkpoint. The algorithm section of a portfolio is a list, in portfolio order.
+        """
+        #The Simulator's view always catches up with the Model's current DCOP, but may lag it by an update still in
+        #the Simulator's queue, so the Model's current DCOP is saved as the view.
+        return {'controller': self._setup_args, 'model': responses[0],
+                'simulator': {'view': responses[0]['current_dcop']},
+                'algorithm': responses[1:] if self.portfolio else responses[1]}
+
+    def _check_checkpoint(self):
+        if self.current_state is SimulationController.states.STOPPED:
+            raise InvalidState("Cannot checkpoint a stopped simulation.")
+
+    def restore(self, path):
+        """
+        Restores the Model, Simulator, and Algorithm from a checkpoint written by checkpoint.
+        If the simulation is STOPPED, it is first setup with the arguments saved in the checkpoint.
+        The simulation is left in SETUP, and may be started as usual.
+        :param path: the checkpoint file to read.
+        :raises InvalidState: if the simulation is not STOPPED or SETUP.
+        :return:
+        """
+        self._check_restore()
+        sections = read_checkpoint(path)
+        if self.current_state is SimulationController.states.STOPPED:
+            self.setup(**sections['controller'])
+
+        self._receive_all(self._send_restore_requests(sections), acknowledgement=True)
+
+    def _send_restore_requests(self, sections):
+        """
+        Sends each component its state from the checkpoint `sections`.
+        :return: the output queues to read the acknowledgements from.
+        """
+        algorithm_states = sections['algorithm'] if self.portfolio else [sections['algorithm']]
+        output_queues = self.send_request(RestoreRequest(sections['model']), ('model',))
+        output_queues += self.send_request(RestoreRequest(sections['simulator']), ('simulator',))
+        for state, queues in zip(algorithm_states, self._algorithm_queues):
+            queues['algorithm_input_queue'].put(RestoreRequest(state))
+            queues['controller_message_event'].set()
+            output_queues.append(queues['algorithm_output_queue'])
+        return output_queues
+
+    def _check_restore(self):
+        if self.current_state is not SimulationController.states.STOPPED and \
+                self.current_state is not SimulationController.states.SETUP:
+            raise InvalidState("Can only restore a stopped or setup simulation. Current State: " + str(self.current_state))
+
+    def step(self, cycles=1):
+        """
+        Advances a synchronous simulation by `cycles` cycles. The components step through the cycles on their own,
+        synchronized by the cycle barrier, and each responds once when it has finished all of them.
+        INVARIANT: the simulation was setup with synchronous=True, and is RUNNING.
+        :param cycles: the number of cycles to advance.
+        :raises InvalidState: if the simulation is not a RUNNING synchronous simulation.
+        :return:
+        """
+        self._check_step()
+        if cycles <= 0:
+            return
+        self._receive_all(self.send_request(StepRequest(cycles)), acknowledgement=True)
+
+    def _check_step(self):
+        if self.current_state is not SimulationController.states.RUNNING or self.cycle_barrier is None:
+            raise InvalidState("Can only step a running synchronous simulation. Current State: " +
+                               str(self.current_state))
 
     def start(self):
         """
@@ -175,13 +534,11 @@ class SimulationController(object):
         if self.current_state is not SimulationController.states.SETUP:
             raise InvalidState("Simulation is not setup. Current State: " + str(self.current_state))
 
-        self.model_control_input_queue.put(request_messages['START'])
-        self.model_control_message_event.set()
-        self.simulator_control_input_queue.put(request_messages['START'])
-        self.simulator_control_message_event.set()
-        self.algorithm_control_input_queue.put(request_messages['START'])
-        self.algorithm_control_message_event.set()
+        # Consume the responses so they are not mistaken for the response to a later request.
+        self._receive_all(self.send_request(request_messages['START']), acknowledgement=True)
+        self._started()
 
+    def _started(self):
         self.current_state = SimulationController.states.RUNNING
         self.running = True
 
@@ -191,33 +548,69 @@ class SimulationController(object):
         Internal state will be the same as after initialization of SimulationController.
         :return:
         """
-        if self.current_state is SimulationController.states.STOPPED:
-            return
+        if self.current_state is SimulationController.states.STOPPED and self.model is None:
+            return #Nothing was setup, or setup failed before making any component.
         try:
-            # Send stop messages to algorithm, model, and simulator.
-            self.algorithm_control_input_queue.put(request_messages['STOP'])
-            print("Sending message event to algorithm from Controller")
-            self.algorithm_control_message_event.set()
-            print(type(self.algorithm).__name__)
+            # Send stop messages to algorithms, model, and simulator.
+            for queues in self._algorithm_queues:
+                queues['algorithm_input_queue'].put(request_messages['STOP'])
+                queues['controller_message_event'].set()
             self.simulator_control_input_queue.put(request_messages['STOP'])
             self.simulator_control_message_event.set()
             self.model_control_input_queue.put(request_messages['STOP'])
             self.model_control_message_event.set()
-        except Exception as e:
-            print(e)
+        except Exception:
+            _log.exception("Could not send stop requests.")
             return
 
+        if self._setup_args['profile_dir'] is not None:
+            # Profiles are written as each thread exits, so wait for them before the caller merges the profiles.
+            for component in [component for component in [self.model, self.simulator] + self.algorithms
+                              if component is not None]:
+                for thread in [component.control_thread, component.simulation_thread,
+                               getattr(component, 'model_request_thread', None)] + \
+                        getattr(component, 'view_request_threads', []):
+                    if thread is not None and thread.ident is not None:
+                        thread.join(SimulationController.stop_join_timeout)
+
         self._init()
 
     def pause(self):
-        if not self.running and self.current_state is not SimulationController.states.RUNNING:
-            raise InvalidState("Cannot pause a stopped simulation. Current State: " + self.current_state)
+        """
+        Pauses the simulation. Each component stops at its next cycle boundary and sleeps until resumed, while stats can
+        still be collected.
+        :raises InvalidState: if the simulation is not RUNNING.
+        :return:
+        """
+        self._check_pause()
+        self._receive_all(self.send_request(request_messages['PAUSE']), acknowledgement=True)
+        self._paused()
+
+    def _check_pause(self):
+        if self.current_state is not SimulationController.states.RUNNING:
+            raise InvalidState("Cannot pause a not running simulation. Current State: " + str(self.current_state))
+
+    def _paused(self):
         self.paused = True
         self.current_state = SimulationController.states.PAUSED
 
     def resume(self):
+        """
+        Resumes a paused simulation. The components wake as soon as they receive the request.
+        :raises InvalidState: if the simulation is not PAUSED.
+        :return:
+        """
+        self._check_resume()
+        self._receive_all(self.send_request(request_messages['RESUME']), acknowledgement=True)
+        self._resumed()
+
+    def _check_resume(self):
         if self.current_state is not SimulationController.states.PAUSED:
-            raise InvalidState("Cannot resume a not paused simulation. Current State: " + self.current_state)
+            raise InvalidState("Cannot resume a not paused simulation. Current State: " + str(self.current_state))
+
+    def _resumed(self):
+        self.paused = False
+        self.current_state = SimulationController.states.RUNNING
 
 
 if __name__ == "__main__":
@@ -1,14 +1,146 @@
-from multiprocessing import Process
+import queue
+from threading import Condition
+
+from common.SimulatorMessages import ViewUpdateRequest
+from common.Channel import get_request
+from common.pydyndsProcess import pydyndsProcess
 
 __author__ = 'Victor Szczepanski'
 
-class Simulator(Process):
-    def __init__(self, simulator_input_queue=None, simulator_output_queue=None, algorithm_input_queue=None,
-                 algorithm_output_queue=None, model_input_queue=None, model_output_queue=None):
+class Simulator(pydyndsProcess):
+    """
+    The Simulator mediates the Algorithm's access to the Model. It keeps the Algorithm's view of the current DCOP,
+    answers the Algorithm's ViewUpdateRequests with it, and replaces it when the Model moves to a new DCOP.
 
-        self.simulator_input_queue=simulator_input_queue
-        self.simulator_output_queue=simulator_output_queue
+    For a portfolio of Algorithms, one view is shared by all of them, and each has its own request thread.
+    Algorithms must treat the view as read-only.
+    """
+    def __init__(self, simulator_input_queue=None, simulator_output_queue=None, algorithm_input_queue=None,
+                 algorithm_output_queue=None, model_input_queue=None, model_output_queue=None,
+                 simulator_message_event=None, algorithm_message_event=None, initial_view=None, instrument=False,
+                 profile_dir=None, barrier=None, algorithm_queues=None):
+        """
+        :param simulator_input_queue: a multiprocessing.Queue used for receiving control requests from controller.
+        :param simulator_output_queue: a multiprocessing.Queue used for responding to requests from controller.
+        :param algorithm_input_queue: a multiprocessing.Queue used to read ViewUpdateRequests from the algorithm.
+        :param algorithm_output_queue: a multiprocessing.Queue used for sending views to the algorithm.
+        :param model_input_queue: a multiprocessing.Queue used to read new DCOPs from the model.
+        :param model_output_queue: unused. Kept for symmetry with the other components.
+        :param simulator_message_event: a multiprocessing.Event used to notify the simulator of a control request.
+        :param algorithm_message_event: a multiprocessing.Event set by the algorithm with each ViewUpdateRequest.
+        :param initial_view: the initial state of the DynDCOP.
+        :param algorithm_queues: for a portfolio, a list of (input queue, output queue) pairs, one per Algorithm, used
+        instead of algorithm_input_queue and algorithm_output_queue.
+        :return:
+        """
+        super().__init__(simulator_input_queue, simulator_output_queue, simulator_message_event, instrument,
+                         profile_dir, barrier)
+        self.simulator_input_queue = simulator_input_queue
+        self.simulator_output_queue = simulator_output_queue
         self.algorithm_input_queue = algorithm_input_queue
         self.algorithm_output_queue = algorithm_output_queue
         self.model_input_queue = model_input_queue
         self.model_output_queue = model_output_queue
+        self._algorithm_message_event = algorithm_message_event
+
+        self._view = initial_view
+        self._view_version = 0 #Counts the updates applied to the view.
+        self._view_condition = Condition() #Notified when the view is updated, or the Simulator stops.
+
+        if algorithm_queues is None:
+            algorithm_queues = [(algorithm_input_queue, algorithm_output_queue)]
+        self.view_request_threads = [self._make_thread(lambda queues=queues: self.view_request_handler(*queues))
+                                     for queues in algorithm_queues]
+        self.view_request_thread = self.view_request_threads[0]
+        self.simulation_thread = self._make_thread(self.run)
+
+    @property
+    def view(self):
+        return self._view
+
+    @view.setter
+    def view(self, new_view=None):
+        raise ValueError("view is protected in Simulator. Change the setter property to allow modifications.")
+
+    def post_start(self):
+        for thread in self.view_request_threads:
+            thread.start()
+
+    def view_request_handler(self, input_queue=None, output_queue=None):
+        """
+        Answers ViewUpdateRequests from an algorithm with the current view. Intended to be run in a thread.
+        :param input_queue: the queue to read the algorithm's requests from. Defaults to algorithm_input_queue.
+        :param output_queue: the queue to send views to the algorithm on. Defaults to algorithm_output_queue.
+        :return:
+        """
+        input_queue = input_queue if input_queue is not None else self.algorithm_input_queue
+        output_queue = output_queue if output_queue is not None else self.algorithm_output_queue
+        sent_version = None #The version of the last view sent to this algorithm.
+        while not self._stop:
+            try:
+                #Block on the queue itself, so a request is never missed between an event and the queue's feeder.
+                request, waiters = get_request(input_queue, timeout=1)
+            except queue.Empty:
+                continue
+            if not isinstance(request, ViewUpdateRequest):
+                raise ValueError("Algorithm request " + str(request) + " not valid.")
+            with self._view_condition:
+                while request.wait_for_change and self._view_version == sent_version and not self._stop:
+                    self._view_condition.wait()
+                if self._stop:
+                    return
+                sent_version = self._view_version
+                view = self._view
+            for _ in range(waiters): #Coalesced requests are answered with the same view.
+                output_queue.put(view)
+
+    def _apply_update(self, new_view):
+        if new_view is not None:
+            with self._view_condition:
+                self._view = new_view
+                self._view_version += 1
+                self._view_condition.notify_all()
+            self.log.debug("Applied new view from Model.")
+
+    def restore_checkpoint_state(self, state):
+        """
+        Overrides pydyndsProcess.restore_checkpoint_state.
+        :param state: a dict with the restored Model's current DCOP as 'view'.
+        :return:
+        """
+        self._apply_update(state['view'])
+
+    def run(self):
+        """
+        Applies new DCOPs from the model to the view until stopped.
+        :return:
+        """
+        if self.barrier is not None:
+            self._lockstep_run()
+            return
+
+        while not self._stop:
+            try:
+                self._apply_update(self.model_input_queue.get(timeout=1))
+            except queue.Empty:
+                continue
+
+    def lockstep_cycle(self):
+        """
+        Overrides pydyndsProcess.lockstep_cycle.
+        Waits for the Algorithm's round and the Model's update, then applies the Model's update before the next cycle.
+        :return:
+        """
+        self.barrier.wait() #Cycle start: view is up to date.
+        self.barrier.wait() #Algorithm's round is done.
+        while not self._stop: #The Model sends exactly one update per cycle.
+            try:
+                self._apply_update(self.model_input_queue.get(timeout=1))
+                return
+            except queue.Empty:
+                continue
+
+    def pre_stop(self):
+        with self._view_condition:
+            self._stop = True
+            self._view_condition.notify_all()
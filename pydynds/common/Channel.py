@@ -0,0 +1,190 @@
+from multiprocessing import Queue, Value
+from enum import Enum
+import queue
+
+from common.SimulatorMessages import request_messages, ViewUpdateRequest
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Bounded request channels between PyDynDS processes.
+"""
+
+
+def _coalesce_key(item):
+    """
+    :return: the kind of requests that may be coalesced with `item`, or None if `item` may not be coalesced.
+    """
+    if item is request_messages['STATS']:
+        return 'STATS'
+    if isinstance(item, ViewUpdateRequest):
+        return 'ViewUpdateRequest'
+    return None
+
+
+def _expects_reply(item):
+    """
+    :return: True if the sender of `item` waits for a reply to it, so it must never be dropped.
+    """
+    return any(item is request for request in request_messages.values()) or isinstance(item, ViewUpdateRequest)
+
+
+class BoundedChannel(object):
+    """
+    A multiprocessing.Queue with a bounded capacity and a policy for what to do when it is full.
+    It supports the subset of the Queue interface used by PyDynDS (put, get, get_nowait, qsize, empty),
+    so it can be passed anywhere a Queue is expected.
+
+    Policies:
+        BLOCK:       put blocks until there is room.
+        DROP_OLDEST: put drops the oldest item that expects no reply to make room, and counts it as dropped.
+                     Requests whose senders wait for a reply (STATS requests and ViewUpdateRequests) are never
+                     dropped, and block like BLOCK. An item that expects no reply is itself dropped if every item in
+                     the channel is such a request.
+        COALESCE:    a STATS request or ViewUpdateRequest is not added if a request of the same kind is already
+                     pending, and is counted as coalesced. The pending request then stands for both: its receiver
+                     answers every request it stands for with the one reply (see get_request), and a pending
+                     ViewUpdateRequest waits for a change only if all of them do. Other items block like BLOCK.
+
+    A capacity of 0 means the channel is unbounded.
+    """
+
+    policies = Enum('Policies', 'BLOCK DROP_OLDEST COALESCE', module=__name__, qualname='BoundedChannel.policies')
+
+    def __init__(self, capacity=0, policy=None):
+        if policy is None:
+            policy = BoundedChannel.policies.BLOCK
+        self.capacity = capacity
+        self.policy = policy
+        self._queue = Queue(capacity)
+        self._dropped = Value('L', 0)
+        self._coalesced = Value('L', 0)
+        #The number of requests the pending request of each kind stands for. 0 if none is pending.
+        self._pending = {'STATS': Value('L', 0), 'ViewUpdateRequest': Value('L', 0)}
+        self._wait_for_change = Value('b', False) #True if the pending ViewUpdateRequest waits for a change.
+        self._droppable = Value('L', 0) #The number of items in the channel that expect no reply.
+
+    @property
+    def dropped(self):
+        return self._dropped.value
+
+    @property
+    def coalesced(self):
+        return self._coalesced.value
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy is BoundedChannel.policies.COALESCE:
+            key = _coalesce_key(item)
+            if key is not None:
+                pending = self._pending[key]
+                #Held while the request is added, so no request is coalesced into one that is not added.
+                with pending.get_lock():
+                    if key == 'ViewUpdateRequest':
+                        if pending.value == 0:
+                            self._wait_for_change.value = item.wait_for_change
+                        elif not item.wait_for_change:
+                            self._wait_for_change.value = False
+                    if pending.value == 0:
+                        self._queue.put(item, block, timeout)
+                    else:
+                        with self._coalesced.get_lock():
+                            self._coalesced.value += 1
+                    pending.value += 1
+                return
+        elif self.policy is BoundedChannel.policies.DROP_OLDEST and self.capacity > 0 and not _expects_reply(item):
+            with self._droppable.get_lock():
+                self._droppable.value += 1
+            while True:
+                try:
+                    self._queue.put(item, block=False)
+                    return
+                except queue.Full:
+                    if not self._drop_oldest():
+                        self._drop(item)
+                        return
+        self._queue.put(item, block, timeout)
+
+    def _drop_oldest(self):
+        """
+        Drops the oldest item in the channel that expects no reply. Older requests that expect a reply are moved to the
+        back of the channel, behind the items that were added after them.
+        :return: True if an item was dropped. False if the channel holds no item that may be dropped.
+        """
+        while self._droppable.value > 1: #One of them is the item being added.
+            try:
+                oldest = self._queue.get(block=False)
+            except queue.Empty:
+                return True #Emptied by the receiver.
+            if not _expects_reply(oldest):
+                self._drop(oldest)
+                return True
+            self._queue.put(oldest)
+        return False
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def _drop(self, item):
+        self._received(item)
+        with self._dropped.get_lock():
+            self._dropped.value += 1
+
+    def _received(self, item):
+        """
+        :return: the number of requests `item` stands for.
+        """
+        if self.policy is BoundedChannel.policies.COALESCE:
+            key = _coalesce_key(item)
+            if key is not None:
+                pending = self._pending[key]
+                with pending.get_lock():
+                    waiters = pending.value
+                    pending.value = 0
+                    if key == 'ViewUpdateRequest':
+                        item.wait_for_change = bool(self._wait_for_change.value)
+                return waiters
+        elif self.policy is BoundedChannel.policies.DROP_OLDEST and self.capacity > 0 and not _expects_reply(item):
+            with self._droppable.get_lock():
+                self._droppable.value -= 1
+        return 1
+
+    def get(self, block=True, timeout=None):
+        return self.get_request(block, timeout)[0]
+
+    def get_request(self, block=True, timeout=None):
+        """
+        As get, for a receiver that replies to requests.
+        :return: the request, and the number of requests it stands for, each waiting for a reply.
+        """
+        item = self._queue.get(block, timeout)
+        return item, self._received(item)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._queue.empty()
+
+    def stats(self):
+        """
+        :return: a dict of this channel's capacity, policy, current depth, and dropped and coalesced counts.
+        """
+        try:
+            depth = self.qsize()
+        except NotImplementedError:  # qsize is not implemented on all platforms.
+            depth = None
+        return {'capacity': self.capacity, 'policy': self.policy.name, 'depth': depth, 'dropped': self.dropped,
+                'coalesced': self.coalesced}
+
+
+def get_request(channel, block=True, timeout=None):
+    """
+    Gets a request from `channel`, a BoundedChannel or a multiprocessing.Queue.
+    :return: the request, and the number of requests it stands for, each waiting for a reply. Always 1 for a Queue.
+    """
+    if isinstance(channel, BoundedChannel):
+        return channel.get_request(block, timeout)
+    return channel.get(block, timeout), 1
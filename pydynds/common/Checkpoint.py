@@ -0,0 +1,91 @@
+import mmap
+import os
+import pickle
+import struct
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Reading and writing of binary simulation snapshots.
+
+A checkpoint file is a small header followed by a sequence of named sections, one per component:
+
+    magic (8 bytes) | version (uint16) | section count (uint16)
+    name length (uint16) | name (utf-8) | payload length (uint64) | payload (pickle) ...
+
+Each section payload is pickled separately, so a reader can skip sections it does not need.
+"""
+
+CHECKPOINT_MAGIC = b'PYDYNDS\x00'
+CHECKPOINT_VERSION = 1
+
+_HEADER = struct.Struct('<8sHH')
+_NAME_LENGTH = struct.Struct('<H')
+_PAYLOAD_LENGTH = struct.Struct('<Q')
+
+_BUFFER_SIZE = 1 << 20
+
+
+class InvalidCheckpoint(ValueError):
+    pass
+
+
+def write_checkpoint(path, sections):
+    """
+    Writes `sections` to `path` as a checkpoint file.
+    The file is written to a temporary file first and moved into place, so an existing checkpoint is never left
+    half-written if the process dies during the write.
+    :param path: the file to write.
+    :param sections: a dict of section name to picklable state.
+    :return:
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb', buffering=_BUFFER_SIZE) as f:
+        f.write(_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(sections)))
+        for name, state in sections.items():
+            encoded_name = name.encode('utf-8')
+            payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(_NAME_LENGTH.pack(len(encoded_name)))
+            f.write(encoded_name)
+            f.write(_PAYLOAD_LENGTH.pack(len(payload)))
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path, names=None):
+    """
+    Reads a checkpoint file written by write_checkpoint. The file is memory-mapped, and only the requested sections
+    are unpickled.
+    :param path: the file to read.
+    :param names: an optional collection of section names to load. If None, all sections are loaded.
+    :raises InvalidCheckpoint: if the file is not a checkpoint, or was written by an unsupported version.
+    :returns sections: a dict of section name to state.
+    """
+    sections = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _HEADER.size:
+            raise InvalidCheckpoint("File too short to be a checkpoint: " + str(path))
+        magic, version, count = _HEADER.unpack_from(mm, 0)
+        if magic != CHECKPOINT_MAGIC:
+            raise InvalidCheckpoint("Not a PyDynDS checkpoint: " + str(path))
+        if version != CHECKPOINT_VERSION:
+            raise InvalidCheckpoint("Unsupported checkpoint version " + str(version) + " in " + str(path))
+
+        offset = _HEADER.size
+        view = memoryview(mm)
+        try:
+            for _ in range(count):
+                name_length, = _NAME_LENGTH.unpack_from(mm, offset)
+                offset += _NAME_LENGTH.size
+                name = bytes(view[offset:offset + name_length]).decode('utf-8')
+                offset += name_length
+                payload_length, = _PAYLOAD_LENGTH.unpack_from(mm, offset)
+                offset += _PAYLOAD_LENGTH.size
+                if names is None or name in names:
+                    sections[name] = pickle.loads(view[offset:offset + payload_length])
+                offset += payload_length
+        finally:
+            view.release()
+    return sections
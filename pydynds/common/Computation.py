@@ -0,0 +1,63 @@
+import math
+
+__author__ = 'Victor Szczepanski'
+
+class Computation(object):
+    """
+    Represents a computation done by a single agent of an Algorithm.
+
+    id, startCycle, and endCycle are assigned by the Model when it reads the computation from the Algorithm.
+    operations and cpu_time are the measured cost of the computation, used by the Model's ComputationCostModel.
+    """
+    def __init__(self, agent, data=None, operations=0, cpu_time=0.0):
+        """
+        :param agent: the agent (usually a variable) that did the computation.
+        :param data: optional data describing the computation.
+        :param operations: the number of operations (e.g. constraint checks) the computation did.
+        :param cpu_time: the thread CPU time, in seconds, the computation took.
+        :return:
+        """
+        self.agent = agent
+        self.data = data
+        self.operations = operations
+        self.cpu_time = cpu_time
+
+        self.id = None
+        self.startCycle = None
+        self.endCycle = None
+
+    def __str__(self):
+        return ''.join(['(', str(self.agent), ', ', str(self.data), ')'])
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class ComputationCostModel(object):
+    """
+    Converts the measured cost of a computation into simulated cycles:
+
+        cost + ceil(operations * cycles_per_operation + cpu_time * cycles_per_second)
+
+    With cost=0 and cycles_per_operation=1, the Model's cycle count is the number of non-concurrent constraint checks
+    (NCCCs), if algorithms count one operation per constraint check.
+    """
+
+    def __init__(self, cost=0, cycles_per_operation=0, cycles_per_second=0):
+        """
+        :param cost: the number of cycles every computation takes, regardless of its measured cost.
+        :param cycles_per_operation: the number of cycles per operation counted by the computation.
+        :param cycles_per_second: the number of cycles per second of thread CPU time measured for the computation.
+        :return:
+        """
+        self.cost = cost
+        self.cycles_per_operation = cycles_per_operation
+        self.cycles_per_second = cycles_per_second
+
+    def cycles(self, computation):
+        """
+        :param computation: a Computation.
+        :return: the number of cycles `computation` takes.
+        """
+        measured = computation.operations * self.cycles_per_operation + computation.cpu_time * self.cycles_per_second
+        return self.cost + int(math.ceil(measured))
@@ -0,0 +1,90 @@
+import math
+import time
+
+try:
+    import curses
+except ImportError:  # curses is not available on all platforms.
+    curses = None
+
+__author__ = 'Victor Szczepanski'
+
+"""
+A live terminal dashboard of a simulation, drawn with curses from a common.Metrics.SharedMetrics block.
+The dashboard only reads shared memory, so refreshing it never interrupts the simulation.
+"""
+
+_ROWS = (('Cycle', 'cycle', '{0:.0f}'), ('Cycles / s', 'cycle_rate', '{0:.1f}'),
+         ('DCOP step', 'dcop_step', '{0:.0f}'), ('Current cost', 'current_cost', '{0:g}'),
+         ('Messages', 'messages', '{0:.0f}'), ('Messages / s', 'message_rate', '{0:.1f}'),
+         ('Bytes / s', 'byte_rate', '{0:.0f}'), ('Computations', 'computations', '{0:.0f}'),
+         ('Model updates / s', 'update_rate', '{0:.1f}'), ('Stats queue depth', 'stats_queue_depth', '{0:.0f}'),
+         ('Algorithm messages', 'algorithm_messages', '{0:.0f}'),
+         ('Algorithm computations', 'algorithm_computations', '{0:.0f}'))
+
+
+def _rate(current, previous, field):
+    elapsed = current['time'] - previous['time']
+    if elapsed <= 0:
+        return float('nan')
+    return (current[field] - previous[field]) / elapsed
+
+
+def dashboard_rows(current, previous=None):
+    """
+    Computes the dashboard's rows from two snapshots of SharedMetrics.
+    :param current: the latest snapshot.
+    :param previous: the snapshot of the previous refresh, used for rates. If None, rates are not available.
+    :return: a list of (label, formatted value) tuples.
+    """
+    values = dict(current)
+    for rate_field, field in (('cycle_rate', 'cycle'), ('message_rate', 'messages'), ('byte_rate', 'bytes'),
+                              ('update_rate', 'model_updates')):
+        values[rate_field] = _rate(current, previous, field) if previous is not None else float('nan')
+    rows = []
+    for label, field, value_format in _ROWS:
+        value = values[field]
+        rows.append((label, '-' if math.isnan(value) else value_format.format(value)))
+    return rows
+
+
+def _draw(screen, metrics, refresh_rate, keys):
+    from SimulationController import InvalidState
+    curses.curs_set(0)
+    screen.timeout(int(1000 / refresh_rate))
+    previous = None
+    status = '' #The error of the last key pressed, if any.
+    while True:
+        current = metrics.snapshot()
+        screen.erase()
+        screen.addstr(0, 0, 'PyDynDS', curses.A_BOLD)
+        for row, (label, value) in enumerate(dashboard_rows(current, previous), start=2):
+            screen.addstr(row, 0, '{0:<24}{1:>16}'.format(label, value))
+        help_text = '  '.join(sorted(key + ': ' + name for key, (name, _) in keys.items()))
+        screen.addstr(len(_ROWS) + 3, 0, 'q: quit' + ('  ' + help_text if help_text else ''))
+        screen.addstr(len(_ROWS) + 4, 0, status)
+        screen.refresh()
+        previous = current
+
+        key = screen.getch() #Waits up to one refresh period.
+        if key == ord('q'):
+            return
+        if key != -1 and chr(key) in keys:
+            try:
+                keys[chr(key)][1]()
+                status = ''
+            except InvalidState as e: #e.g. pausing a simulation that is not running.
+                status = str(e)
+
+
+def run_dashboard(metrics, refresh_rate=4.0, keys=None):
+    """
+    Shows the dashboard in the terminal until the user presses q.
+    :param metrics: the SharedMetrics of the simulation.
+    :param refresh_rate: the number of refreshes per second.
+    :param keys: a dict of single character keys to (name, function) tuples. Pressing a key calls its function,
+    e.g. {'p': ('pause', controller.pause)}. If the function raises InvalidState, the error is shown under the help.
+    :return:
+    """
+    if curses is None:
+        raise ImportError("The dashboard requires curses.")
+    curses.wrapper(_draw, metrics, refresh_rate, keys if keys is not None else {})
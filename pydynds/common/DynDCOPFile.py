@@ -0,0 +1,43 @@
+import json
+import pickle
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Reading and writing DynDCOP files.
+
+A DynDCOP is a list of DCOP snapshots, as described in Benchmarks.Generators. Files ending in .json are JSON, with
+constraint scopes as lists. Any other file is a pickle, which may also hold DCOP objects. Unpickling a file can run
+arbitrary code, so only load pickles from trusted sources.
+"""
+
+
+def save_dyndcop(dyndcop, path):
+    """
+    Writes a DynDCOP to `path`, as JSON if it ends in .json, else as a pickle.
+    """
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(dyndcop, f)
+    else:
+        with open(path, 'wb') as f:
+            pickle.dump(dyndcop, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_dyndcop(path, trusted=True):
+    """
+    :param path: a file written by save_dyndcop.
+    :param trusted: if False, only JSON files are read.
+    :raises ValueError: if `trusted` is False and `path` is not a JSON file.
+    :return: the DynDCOP.
+    """
+    if path.endswith('.json'):
+        with open(path) as f:
+            dyndcop = json.load(f)
+        for snapshot in dyndcop:
+            snapshot['constraints'] = [(tuple(scope), table) for scope, table in snapshot['constraints']]
+        return dyndcop
+    if not trusted:
+        raise ValueError("Only JSON DynDCOP files (.json) are accepted: " + str(path))
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,183 @@
+from collections import deque
+from threading import Lock
+import pickle
+import struct
+
+from common.Logging import get_logger
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Bounded retention of an Algorithm's message and computation history.
+
+The most recent events are kept in memory in a ring buffer. Older events are either discarded, or spilled to an
+append-only file, so a long run keeps a flat memory footprint while its full history stays readable with read_history.
+Each EventHistory starts a new spill file, replacing any file already at its path.
+
+A spill file is a header followed by one record per event:
+
+    kind (uint8) | sequence number (uint64) | payload length (uint32) | source | destination | payload (pickle)
+
+where source and destination are stored as a uint16 length followed by utf-8 bytes.
+For computations, source is the agent and destination is empty.
+"""
+
+HISTORY_MAGIC = b'PDDSHST\x00'
+HISTORY_VERSION = 1
+
+KIND_MESSAGE = 1
+KIND_COMPUTATION = 2
+
+_HEADER = struct.Struct('<8sH')
+_RECORD = struct.Struct('<BQI')
+_STRING_LENGTH = struct.Struct('<H')
+
+_BUFFER_SIZE = 1 << 16
+
+_log = get_logger('History')
+
+
+class InvalidHistory(ValueError):
+    pass
+
+
+def _pack_string(value):
+    encoded = ('' if value is None else str(value)).encode('utf-8')
+    return _STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+class EventHistory(object):
+    """
+    Keeps the last `size` events in memory. Events pushed out of memory are written to `spill_path` if it is not None,
+    and discarded otherwise. Events spilled after close are counted in `lost`.
+
+    Appending is thread-safe. Payloads are pickled for the spill file outside of the caller's locks, so callers should
+    append outside any lock they share with other threads.
+    """
+
+    def __init__(self, size=1000, spill_path=None, spill_payloads=True):
+        """
+        :param size: the number of events to keep in memory.
+        :param spill_path: the file to spill older events to. None to discard them.
+        :param spill_payloads: if False, payloads are not written to the spill file.
+        :return:
+        """
+        self.size = size
+        self.spill_path = spill_path
+        self.spill_payloads = spill_payloads
+        self.spilled = 0
+        self.lost = 0
+        self._next_sequence = 0
+        self._recent = deque()
+        self._lock = Lock() #Guards the events in memory.
+        self._spill_lock = Lock() #Guards the spill file, and keeps it in sequence order.
+        self._file = None
+        if spill_path is not None:
+            self._file = open(spill_path, 'wb', buffering=_BUFFER_SIZE)
+            self._file.write(_HEADER.pack(HISTORY_MAGIC, HISTORY_VERSION))
+
+    def __len__(self):
+        return self._next_sequence
+
+    def append_message(self, message):
+        self._append(KIND_MESSAGE, message.source, message.destination, message.data)
+
+    def append_computation(self, computation):
+        self._append(KIND_COMPUTATION, computation.agent, None, computation.data)
+
+    def _append(self, kind, source, destination, data):
+        with self._lock:
+            self._recent.append((kind, self._next_sequence, source, destination, data))
+            self._next_sequence += 1
+            if len(self._recent) <= self.size:
+                return
+            event = self._recent.popleft()
+            self._spill_lock.acquire() #Before the next event can be spilled, so spilled events stay in order.
+        try:
+            self._spill(event)
+        finally:
+            self._spill_lock.release()
+
+    def _spill(self, event):
+        if self._file is None:
+            return
+        if self._file.closed:
+            if self.lost == 0:
+                _log.warning("History of %s is closed. Events spilled after close are lost.", self.spill_path)
+            self.lost += 1
+            return
+        kind, sequence, source, destination, data = event
+        payload = b''
+        if self.spill_payloads and data is not None:
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(_RECORD.pack(kind, sequence, len(payload)) + _pack_string(source) +
+                         _pack_string(destination) + payload)
+        self.spilled += 1
+
+    def recent(self, kind=None):
+        """
+        :param kind: KIND_MESSAGE or KIND_COMPUTATION to select one kind of event. None for both.
+        :return: a list of the events in memory, as (kind, sequence number, source, destination, payload) tuples.
+        """
+        with self._lock:
+            return [event for event in self._recent if kind is None or event[0] == kind]
+
+    def events(self, kind=None):
+        """
+        Generates the full history: the spilled events, followed by the events in memory.
+        Spilled sources and destinations are read back as strings.
+        :param kind: KIND_MESSAGE or KIND_COMPUTATION to select one kind of event. None for both.
+        :return:
+        """
+        if self._file is not None:
+            with self._spill_lock:
+                if not self._file.closed:
+                    self._file.flush()
+            for event in read_history(self.spill_path, kind):
+                yield event
+        for event in self.recent(kind):
+            yield event
+
+    def close(self):
+        if self._file is not None:
+            with self._spill_lock:
+                self._file.close()
+
+
+def read_history(path, kind=None):
+    """
+    Generates the events in a spill file written by EventHistory.
+    :param path: the spill file.
+    :param kind: KIND_MESSAGE or KIND_COMPUTATION to select one kind of event. None for both.
+    :return: generates (kind, sequence number, source, destination, payload) tuples.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise InvalidHistory("File too short to be a history: " + str(path))
+        magic, version = _HEADER.unpack(header)
+        if magic != HISTORY_MAGIC:
+            raise InvalidHistory("Not a PyDynDS history: " + str(path))
+        if version != HISTORY_VERSION:
+            raise InvalidHistory("Unsupported history version " + str(version) + " in " + str(path))
+
+        while True:
+            record = f.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                return
+            event_kind, sequence, payload_length = _RECORD.unpack(record)
+            strings = []
+            for _ in range(2):
+                length_bytes = f.read(_STRING_LENGTH.size)
+                if len(length_bytes) < _STRING_LENGTH.size:
+                    return
+                length, = _STRING_LENGTH.unpack(length_bytes)
+                strings.append(f.read(length).decode('utf-8'))
+            if kind is not None and event_kind != kind:
+                f.seek(payload_length, 1)
+                continue
+            payload = f.read(payload_length)
+            if len(payload) < payload_length:
+                return
+            data = pickle.loads(payload) if payload else None
+            yield (event_kind, sequence, strings[0], strings[1] if event_kind == KIND_MESSAGE else None, data)
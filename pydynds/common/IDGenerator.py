@@ -1,25 +1,79 @@
+from multiprocessing import Value
+
 __author__ = 'Victor Szczepanski'
 
 class IDGenerator(object):
     """
-    Simply yields the next integer, beginning from 0.
+    Yields increasing integers, beginning from 0, that are unique across every IDGenerator sharing the same counter.
+
+    The shared counter is only locked to take a block of `block_size` IDs, which are then handed out locally,
+    so generators in different processes do not contend on every ID. IDs from one generator are increasing; IDs from
+    different generators interleave by block.
     """
 
-    def __init__(self):
+    def __init__(self, counter=None, block_size=1024):
+        """
+        :param counter: a multiprocessing.Value('Q') shared by the generators that must not repeat IDs.
+        If None, the generator has its own counter.
+        :param block_size: the number of IDs taken from the counter at a time.
+        :return:
+        """
+        self._counter = counter if counter is not None else Value('Q', 0)
+        self.block_size = block_size
         self._currentID = 0
+        self._blockEnd = 0
+
+    @staticmethod
+    def make_counter():
+        """
+        :return: a new counter to share between IDGenerators, possibly in different processes.
+        """
+        return Value('Q', 0)
+
+    def _next_block(self):
+        with self._counter.get_lock():
+            self._currentID = self._counter.value
+            self._counter.value += self.block_size
+        self._blockEnd = self._currentID + self.block_size
 
     def nextID(self):
         """
         Generates the next ID.
         :return: Next ID to use.
         """
+        if self._currentID >= self._blockEnd:
+            self._next_block()
         self._currentID += 1
         return self._currentID - 1
 
-    @property.setter
-    def currentID(self, newID=0):
-        raise ValueError("currentID is protected.")
+    def skip_to(self, next_id):
+        """
+        Makes every ID generated from now on, by any generator sharing the counter, at least `next_id`.
+        Used to continue from a restored checkpoint.
+        :param next_id: the lowest ID that may be generated.
+        :return:
+        """
+        with self._counter.get_lock():
+            self._counter.value = max(self._counter.value, next_id)
+        self._currentID = next_id
+        self._blockEnd = next_id
 
-    @property.getter
+    @property
     def currentID(self):
-        return self._currentID
\ No newline at end of file
+        """
+        :return: the next ID this generator will hand out from its current block.
+        """
+        return self._currentID
+
+    @property
+    def nextUnreservedID(self):
+        """
+        :return: the lowest ID not yet reserved by any generator sharing the counter. Save this, not currentID, in a
+        checkpoint, so that after skip_to it no generator on the counter repeats an ID handed out before the
+        checkpoint.
+        """
+        return self._counter.value
+
+    @currentID.setter
+    def currentID(self, newID=0):
+        raise ValueError("currentID is protected.")
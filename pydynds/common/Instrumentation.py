@@ -0,0 +1,176 @@
+import time
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Low-overhead latency and queue-depth instrumentation for the request/response channels between PyDynDS processes.
+
+Each process owns an Instrumentation object. When it is disabled, timed returns a shared no-op context manager,
+so instrumented code paths cost a single method call.
+"""
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of latencies in nanoseconds with HDR-style log-linear buckets.
+    Values are grouped by power of two, and each power of two is split into 2**(sub_bucket_bits-1) linear sub-buckets,
+    so every recorded value is known to within a relative error of 2**(1-sub_bucket_bits).
+    """
+
+    def __init__(self, sub_bucket_bits=5):
+        self._sub_bucket_bits = sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        exponent = value.bit_length() - self._sub_bucket_bits
+        if exponent <= 0:
+            return value
+        return exponent * self._half + (value >> exponent)
+
+    def _value(self, index):
+        exponent = index // self._half - 1
+        if exponent <= 0:
+            return index
+        return (index - exponent * self._half) << exponent
+
+    def record(self, value):
+        """
+        Records a single latency.
+        :param value: the latency, in nanoseconds.
+        :return:
+        """
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        :param percent: the percentile to find, from 0 to 100.
+        :return: the lower bound of the bucket holding the percentile, in nanoseconds. None if nothing is recorded.
+        """
+        if self.count == 0:
+            return None
+        threshold = self.count * percent / 100.0
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= threshold:
+                return self._value(index)
+        return self.max
+
+    def snapshot(self):
+        """
+        :return: a picklable dict summarizing this histogram.
+        """
+        return {'count': self.count, 'min': self.min, 'max': self.max,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99),
+                'p99.9': self.percentile(99.9)}
+
+
+class Gauge(object):
+    """
+    Tracks the last and maximum value of a sampled quantity, like the depth of a queue.
+    """
+
+    def __init__(self):
+        self.last = 0
+        self.max = 0
+
+    def record(self, value):
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {'last': self.last, 'max': self.max}
+
+
+class _Timer(object):
+    """
+    Context manager that records the time spent in its block to a histogram.
+    """
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+        return False
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+
+def _queue_depth(queue):
+    try:
+        return queue.qsize()
+    except (NotImplementedError, AttributeError):  # qsize is not implemented on all platforms.
+        return 0
+
+
+class Instrumentation(object):
+    """
+    A collection of named channels, each with a latency histogram and a queue-depth gauge.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._gauges = {}
+
+    def timed(self, channel, queue=None):
+        """
+        Times a request/response round trip on `channel`.
+        If `queue` is provided, its depth is sampled into the channel's gauge.
+        :param channel: the name of the channel.
+        :param queue: the queue the request is sent on.
+        :return: a context manager that times its block.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        if queue is not None:
+            gauge = self._gauges.get(channel)
+            if gauge is None:
+                gauge = self._gauges[channel] = Gauge()
+            gauge.record(_queue_depth(queue))
+        histogram = self._histograms.get(channel)
+        if histogram is None:
+            histogram = self._histograms[channel] = LatencyHistogram()
+        return _Timer(histogram)
+
+    def snapshot(self):
+        """
+        :return: a picklable dict of channel name to its latency and queue-depth summaries.
+        """
+        channels = {}
+        for channel, histogram in list(self._histograms.items()):
+            channels[channel] = {'latency_ns': histogram.snapshot()}
+        for channel, gauge in list(self._gauges.items()):
+            channels.setdefault(channel, {})['queue_depth'] = gauge.snapshot()
+        return channels
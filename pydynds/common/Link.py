@@ -0,0 +1,94 @@
+import math
+import sys
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Payload sizes and the communication cost of messages.
+
+estimate_size approximates the number of bytes a payload takes on the wire without serializing it, so it can be
+called for every message an Algorithm sends. LinkModel turns a message's size into the number of cycles it takes to
+be delivered.
+"""
+
+_SCALAR_SIZE = 8
+
+
+def _estimate_str(data):
+    return len(data)
+
+
+def _estimate_scalar(data):
+    return _SCALAR_SIZE
+
+
+def _estimate_sequence(data):
+    return sum(estimate_size(item) for item in data)
+
+
+def _estimate_dict(data):
+    return sum(estimate_size(key) + estimate_size(value) for key, value in data.items())
+
+
+#Estimators for known types. Register an estimator for a custom payload type with register_size_estimator.
+_estimators = {type(None): lambda data: 0, bool: _estimate_scalar, int: _estimate_scalar, float: _estimate_scalar,
+               complex: lambda data: 2 * _SCALAR_SIZE, str: _estimate_str, bytes: len, bytearray: len,
+               memoryview: lambda data: data.nbytes, list: _estimate_sequence, tuple: _estimate_sequence,
+               set: _estimate_sequence, frozenset: _estimate_sequence, dict: _estimate_dict}
+
+
+def register_size_estimator(payload_type, estimator):
+    """
+    Registers a function that estimates the size, in bytes, of payloads of type `payload_type`.
+    :param payload_type: the type of payload.
+    :param estimator: a function of a payload that returns its size in bytes.
+    :return:
+    """
+    _estimators[payload_type] = estimator
+
+
+def estimate_size(data):
+    """
+    Estimates the size, in bytes, of a message payload, without pickling it.
+    Arrays (anything with an nbytes attribute, such as a NumPy array) report their buffer size. Containers report the
+    sum of their items. Objects of unknown types report sys.getsizeof.
+    :param data: the payload.
+    :return: the estimated size of the payload.
+    """
+    estimator = _estimators.get(type(data))
+    if estimator is not None:
+        return estimator(data)
+    nbytes = getattr(data, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(data)
+
+
+class LinkModel(object):
+    """
+    Models the links between agents by a latency, in cycles, and a bandwidth, in bytes per cycle.
+    A message of `size` bytes is delivered latency + ceil(size / bandwidth) cycles after it is sent.
+    Links between particular pairs of agents may have their own latency and bandwidth.
+    """
+
+    def __init__(self, latency=0, bandwidth=None, edges=None):
+        """
+        :param latency: the number of cycles every message takes, regardless of its size.
+        :param bandwidth: the number of bytes a link carries per cycle. None for unlimited bandwidth.
+        :param edges: a dict of (source, destination) to a (latency, bandwidth) tuple that overrides the defaults for
+        messages from source to destination.
+        :return:
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.edges = edges if edges is not None else {}
+
+    def delivery_cycles(self, message):
+        """
+        :param message: a Message with its size set.
+        :return: the number of cycles it takes to deliver `message`.
+        """
+        latency, bandwidth = self.edges.get((message.source, message.destination), (self.latency, self.bandwidth))
+        if bandwidth is None or not message.size:
+            return latency
+        return latency + int(math.ceil(message.size / bandwidth))
@@ -0,0 +1,161 @@
+import atexit
+import logging
+import logging.handlers
+from multiprocessing import Queue
+import threading
+import time
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Logging for PyDynDS components.
+
+Every component logs through a logger named 'pydynds.<Component>'. Events that happen on every cycle are logged on
+the child logger 'pydynds.<Component>.cycle', which is rate limited, so a verbose log level does not slow down the
+simulation loop.
+
+Records are formatted lazily: pass arguments to the logger rather than building the string, e.g.
+    logger.debug("Got response: %s", response)
+so large objects are only converted to strings if the record is actually written.
+
+start_logging installs a QueueHandler on the 'pydynds' logger and starts a single background thread that writes the
+records. Processes forked after start_logging inherit the handler, so all components share the one writer.
+A process started with the 'spawn' method should call configure_process_logging with the queue from start_logging.
+"""
+
+LOGGER_NAME = 'pydynds'
+DEFAULT_FORMAT = '%(asctime)s %(processName)s %(name)s %(levelname)s: %(message)s'
+
+_log_queue = None
+_listener = None
+_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Passes at most `rate` records per second for each message template, with bursts of up to `burst` records.
+    Records that are dropped are counted, and the count is appended to the next record that passes.
+    """
+
+    def __init__(self, rate=1.0, burst=1):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # message template -> [tokens, last refill time, dropped records]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.msg)
+            if bucket is None:
+                bucket = self._buckets[record.msg] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped = bucket[2]
+            bucket[2] = 0
+        if dropped:
+            record.msg = record.getMessage() + ' (' + str(dropped) + ' similar messages suppressed)'
+            record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes every `every`-th record for each message template.
+    """
+
+    def __init__(self, every=100):
+        super().__init__()
+        self.every = every
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        with self._lock:
+            count = self._counts.get(record.msg, 0)
+            self._counts[record.msg] = count + 1
+        return count % self.every == 0
+
+
+def get_logger(component):
+    """
+    :param component: the name of the component, usually type(self).__name__.
+    :return: the logger for `component`.
+    """
+    return logging.getLogger(LOGGER_NAME + '.' + component)
+
+
+def get_cycle_logger(component, rate=1.0, burst=5, sample_every=None):
+    """
+    Returns the logger for events that happen on every cycle of `component`.
+    The first call for a component installs a RateLimitFilter with `rate` and `burst`,
+    preceded by a SamplingFilter if `sample_every` is not None.
+    :param component: the name of the component, usually type(self).__name__.
+    :return: the per-cycle logger for `component`.
+    """
+    logger = logging.getLogger(LOGGER_NAME + '.' + component + '.cycle')
+    if not logger.filters:
+        if sample_every is not None:
+            logger.addFilter(SamplingFilter(sample_every))
+        logger.addFilter(RateLimitFilter(rate, burst))
+    return logger
+
+
+def configure_process_logging(log_queue, level=logging.INFO):
+    """
+    Sends all PyDynDS log records of the current process to `log_queue`. Safe to call more than once.
+    :param log_queue: the queue returned by start_logging.
+    :param level: the level of the 'pydynds' logger.
+    :return:
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.propagate = False
+    for handler in logger.handlers:
+        if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is log_queue:
+            return
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+def start_logging(level=logging.INFO, handler=None):
+    """
+    Starts the background writer for PyDynDS logs, if it is not already running, and configures the current process
+    to log to it.
+    :param level: the level of the 'pydynds' logger.
+    :param handler: the logging.Handler that writes records. Defaults to a StreamHandler on stderr.
+    :return log_queue: the queue the writer reads from.
+    """
+    global _log_queue, _listener
+    with _lock:
+        if _listener is None:
+            if handler is None:
+                handler = logging.StreamHandler()
+                handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+            _log_queue = Queue()
+            _listener = logging.handlers.QueueListener(_log_queue, handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+        configure_process_logging(_log_queue, level)
+        return _log_queue
+
+
+def stop_logging():
+    """
+    Writes any pending records and stops the background writer.
+    :return:
+    """
+    global _log_queue, _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            logger = logging.getLogger(LOGGER_NAME)
+            for handler in list(logger.handlers):
+                if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is _log_queue:
+                    logger.removeHandler(handler)
+            _listener = None
+            _log_queue = None
@@ -1,25 +1,35 @@
+from common.Link import estimate_size
+
 __author__ = 'Victor Szczepanski'
 
 class Message(object):
     """
     Represents a message with arbitrary data. Usually contains a hypercube or the like.
     TODO: Decide if we need this class as a separate entity, or if we should use a namedtuple.
+
+    id, startCycle, and deliveryCycle are assigned by the Model when it reads the message from the Algorithm.
+    size is the estimated size of data in bytes, used by the Model's LinkModel.
     """
-    def __init__(self, source, destination, data=None):
+    def __init__(self, source, destination, data=None, size=None):
         """
         This function will not modify source or destination nodes.
         :param source:
         :param destination:
         :param data:
+        :param size: the size of data in bytes. If None, it is estimated with common.Link.estimate_size.
         :return:
         """
         self.source = source
         self.destination = destination
         self.data = data
+        self.size = estimate_size(data) if size is None else size
+
+        self.id = None
+        self.startCycle = None
+        self.deliveryCycle = None
 
     def __str__(self):
         return ''.join(['(', str(self.source), ', ', str(self.destination), ', ', str(self.data), ')'])
 
     def __repr__(self):
         return self.__str__()
-
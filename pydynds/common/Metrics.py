@@ -0,0 +1,52 @@
+from multiprocessing import Array, Lock
+import time
+
+__author__ = 'Victor Szczepanski'
+
+"""
+A small block of shared memory holding live metrics of a simulation.
+
+Components update their fields in place as they run, and readers (such as common.Dashboard) read a snapshot without
+sending any request to the components. Fields that are set have a single writer, so setting them is not locked. The
+Algorithms of a portfolio all add to the same fields, so adding is locked. Readers are never locked, and may see
+fields from slightly different moments, which is fine for display.
+"""
+
+FIELDS = ('cycle', 'model_updates', 'messages', 'bytes', 'computations', 'current_cost', 'dcop_step',
+          'stats_queue_depth', 'algorithm_messages', 'algorithm_computations', 'last_update_time')
+
+_INDEX = dict((field, index) for index, field in enumerate(FIELDS))
+
+
+class SharedMetrics(object):
+    """
+    Fields written by the Model: cycle, model_updates, messages, bytes, computations, current_cost, dcop_step,
+    stats_queue_depth, and last_update_time (wall clock time of the last update).
+    Fields written by the Algorithms: algorithm_messages and algorithm_computations, as they are sent and done, summed
+    over every Algorithm of a portfolio.
+    current_cost is NaN until the Algorithm reports a cost.
+    """
+
+    def __init__(self):
+        self._values = Array('d', len(FIELDS), lock=False)
+        self._add_lock = Lock() #Adding reads and writes a field, so concurrent adds would lose updates.
+        self._values[_INDEX['current_cost']] = float('nan')
+
+    def set(self, field, value):
+        self._values[_INDEX[field]] = value
+
+    def add(self, field, value=1):
+        with self._add_lock:
+            self._values[_INDEX[field]] += value
+
+    def get(self, field):
+        return self._values[_INDEX[field]]
+
+    def snapshot(self):
+        """
+        :return: a dict of every field to its current value, and 'time' to the time of the snapshot.
+        """
+        values = self._values[:]
+        snapshot = dict(zip(FIELDS, values))
+        snapshot['time'] = time.time()
+        return snapshot
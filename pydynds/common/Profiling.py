@@ -0,0 +1,104 @@
+import cProfile
+import glob
+import io
+import os
+import pstats
+import threading
+
+__author__ = 'Victor Szczepanski'
+
+"""
+CPU profiling of PyDynDS components.
+
+Each profiled thread runs under its own cProfile.Profile and writes '<component>-<thread>-<pid>.prof' to the profile
+directory when it exits. merge_profiles combines the files of all components and threads into a single report.
+"""
+
+PROFILE_SUFFIX = '.prof'
+
+#Functions reported on their own in the merged report, by name.
+REPORTED_FUNCTIONS = ('run', '_update', 'ready', 'get_stats')
+
+#Modules that make up the IPC layer. Time is attributed to the IPC layer when it is spent in these modules.
+IPC_MODULES = (os.path.join('multiprocessing', 'queues.py'), os.path.join('multiprocessing', 'synchronize.py'),
+               os.path.join('multiprocessing', 'connection.py'))
+
+
+def profiled(target, profile_dir, component):
+    """
+    Wraps `target` so that it runs under cProfile, and writes its profile to `profile_dir` when it returns.
+    :param target: the function to profile, usually the target of a Thread.
+    :param profile_dir: the directory to write the profile file to. Created if it does not exist.
+    :param component: the name of the component running `target`, used in the profile file name.
+    :return: the wrapped function.
+    """
+    def run_profiled(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(target, *args, **kwargs)
+        finally:
+            os.makedirs(profile_dir, exist_ok=True)
+            file_name = '-'.join([component, getattr(target, '__name__', 'thread'), str(threading.get_ident()),
+                                  str(os.getpid())]) + PROFILE_SUFFIX
+            profiler.dump_stats(os.path.join(profile_dir, file_name))
+    return run_profiled
+
+
+def _is_ipc(filename):
+    return filename.endswith(IPC_MODULES)
+
+
+def summarize(stats):
+    """
+    Attributes the time in `stats` to the reported functions and the IPC layer.
+    Time in the IPC layer is the cumulative time of calls into the IPC modules from outside of them,
+    and so includes time spent blocked waiting for a response.
+    :param stats: a pstats.Stats.
+    :return: a dict of category to cumulative seconds.
+    """
+    summary = dict((name, 0.0) for name in REPORTED_FUNCTIONS)
+    summary['ipc'] = 0.0
+    for (filename, _, function_name), (_, _, _, cumulative_time, callers) in stats.stats.items():
+        if function_name in summary and not _is_ipc(filename):
+            summary[function_name] += cumulative_time
+        if _is_ipc(filename):
+            for (caller_filename, _, _), caller_stats in callers.items():
+                if not _is_ipc(caller_filename):
+                    summary['ipc'] += caller_stats[3]
+    return summary
+
+
+def merge_profiles(profile_dir, report_path=None, top=30):
+    """
+    Merges every profile file in `profile_dir` into one report.
+    :param profile_dir: the directory the components wrote their profiles to.
+    :param report_path: the text report to write. Defaults to 'report.txt' in `profile_dir`.
+    The merged binary profile is written next to it as 'merged.prof', for use with other pstats tools.
+    :param top: the number of functions to list, sorted by cumulative time.
+    :return report_path: the path of the written report, or None if there were no profiles.
+    """
+    files = sorted(f for f in glob.glob(os.path.join(profile_dir, '*' + PROFILE_SUFFIX))
+                   if os.path.basename(f) != 'merged' + PROFILE_SUFFIX)
+    if not files:
+        return None
+    if report_path is None:
+        report_path = os.path.join(profile_dir, 'report.txt')
+
+    stream = io.StringIO()
+    stats = pstats.Stats(files[0], stream=stream)
+    for f in files[1:]:
+        stats.add(f)
+    stats.dump_stats(os.path.join(profile_dir, 'merged' + PROFILE_SUFFIX))
+
+    stream.write('PyDynDS profile of ' + str(len(files)) + ' threads:\n')
+    for f in files:
+        stream.write('    ' + os.path.basename(f) + '\n')
+    stream.write('\nCumulative time (s):\n')
+    for category, seconds in sorted(summarize(stats).items()):
+        stream.write('    {0:<12}{1:>12.6f}\n'.format(category, seconds))
+    stream.write('\n')
+    stats.sort_stats('cumulative').print_stats(top)
+
+    with open(report_path, 'w') as report:
+        report.write(stream.getvalue())
+    return report_path
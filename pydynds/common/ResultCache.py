@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+__author__ = 'Victor Szczepanski'
+
+"""
+An on-disk cache of the results of solved DCOP snapshots, shared by every run that uses the same directory.
+
+Results are content-addressed: the key of a result is a hash of the canonical form of the snapshot, the algorithm's
+name and version, and the algorithm's parameters. The canonical form does not depend on the snapshot's start cycle, or
+on the order of its variables and constraints, so a DynDCOP that returns to an earlier state, or the same DCOP run with
+a different message delay, finds the earlier result. Each cost table is hashed in its own representation: a sparse
+table by its default cost and exceptions, a functional table by its function and the function's parameters, and other
+tables by their costs.
+
+Each result is stored in its own file, named by its key. Reading a result marks it as recently used, and the least
+recently used results are evicted when the cache grows past its size limit.
+"""
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SUFFIX = '.result'
+
+
+def _flatten(costs):
+    if hasattr(costs, 'costs'): #A DCOP.Tables.ConstraintTable.
+        for _, cost in costs.costs():
+            yield cost
+    elif hasattr(costs, 'tolist'): #A NumPy array.
+        for cost in _flatten(costs.tolist()):
+            yield cost
+    elif isinstance(costs, (list, tuple)):
+        for nested in costs:
+            for cost in _flatten(nested):
+                yield cost
+    else:
+        yield costs
+
+
+def _cost_bytes(cost):
+    return repr(float(cost)).encode('ascii') + b','
+
+
+def _function_identity(function):
+    """
+    :return: the pickle of `function`, which names a module level function and holds the arguments of a
+    functools.partial or the state of a callable object, or None if it cannot be pickled (e.g. a lambda).
+    """
+    try:
+        return pickle.dumps(function, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return None
+
+
+def _update_sparse(digest, default, exceptions):
+    digest.update(b'sparse:' + _cost_bytes(default))
+    for assignment, cost in sorted((tuple(int(value) for value in assignment), cost)
+                                   for assignment, cost in exceptions.items()):
+        digest.update(repr(assignment).encode('ascii') + b'=' + _cost_bytes(cost))
+
+
+def _table_digest(table):
+    """
+    :return: the digest of a cost table, computed from its own representation, so sparse and functional tables are
+    not expanded into a cost per assignment.
+    """
+    digest = hashlib.sha256()
+    if hasattr(table, 'exceptions'): #A DCOP.Tables.SparseTable.
+        _update_sparse(digest, table.default, table.exceptions)
+        return digest.digest()
+    if isinstance(table, dict): #Assignments to costs, where missing assignments cost 0. See DCOP.Tables.make_table.
+        _update_sparse(digest, 0, dict((assignment, cost) for assignment, cost in table.items() if cost != 0))
+        return digest.digest()
+    if hasattr(table, 'function'): #A DCOP.Tables.FunctionalTable.
+        identity = _function_identity(table.function)
+        if identity is not None:
+            digest.update(b'function:' + identity)
+            return digest.digest()
+        #Only the costs identify a function that cannot be pickled.
+    digest.update(b'dense:')
+    for cost in _flatten(table):
+        digest.update(_cost_bytes(cost))
+    return digest.digest()
+
+
+def snapshot_digest(snapshot):
+    """
+    :param snapshot: a snapshot dict, as made by Benchmarks.Generators, or a DCOP.DCOP.
+    :return: the hex SHA-256 digest of the canonical form of the snapshot.
+    """
+    if hasattr(snapshot, 'to_snapshot'):
+        snapshot = snapshot.to_snapshot()
+    tables = {} #Digests by id, since consecutive snapshots often share tables.
+    constraints = []
+    for scope, table in snapshot['constraints']:
+        if id(table) not in tables:
+            tables[id(table)] = _table_digest(table)
+        constraints.append(json.dumps([str(name) for name in scope]).encode('utf-8') + tables[id(table)])
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted([str(name), snapshot['domains'][name]] for name in snapshot['variables']))
+                  .encode('utf-8'))
+    for constraint in sorted(constraints):
+        digest.update(constraint)
+    return digest.hexdigest()
+
+
+def result_key(snapshot, algorithm_name, version=None, parameters=None):
+    """
+    :param snapshot: the snapshot that was solved.
+    :param algorithm_name: the name of the algorithm that solved it.
+    :param version: the algorithm's version.
+    :param parameters: a dict of the algorithm's parameters that change its results.
+    :return: the key of the result in a ResultCache.
+    """
+    header = json.dumps([algorithm_name, version, parameters or {}], sort_keys=True, default=repr)
+    return hashlib.sha256((header + snapshot_digest(snapshot)).encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """
+    A directory of results, by key, with least recently used eviction. Several processes may share a directory.
+
+    A result is a dict, usually with the solution, its cost, and the messages, computations, and operations the
+    algorithm spent to find it. See Algorithms.Algorithm.solved.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: the directory to store results in. Made if it does not exist.
+        :param max_bytes: the size, in bytes, past which the least recently used results are evicted.
+        :return:
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None #Estimated from this process' writes, and measured again before evicting.
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """
+        :return: the result stored under `key`, or None if there is none.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(path) #Marks the result as recently used.
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """
+        Stores `result` under `key`, replacing any result already stored there, and evicts results if the cache is
+        full.
+        :return:
+        """
+        path = self._path(key)
+        #A unique temporary file, since threads of one process, e.g. the Algorithms of a portfolio, may store the same
+        #key at once.
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced_size = os.path.getsize(path)
+            except OSError: #A new key.
+                replaced_size = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self._size is None:
+            self._size = self.size
+        else:
+            self._size += size - replaced_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        """
+        :return: a list of (last used time, size, path) of every result.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError: #Evicted by another process.
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    @property
+    def size(self):
+        """
+        :return: the total size of the results, in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def evict(self, max_bytes=None):
+        """
+        Removes the least recently used results until the cache is no larger than `max_bytes`.
+        :param max_bytes: defaults to the cache's max_bytes.
+        :return:
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        self.evict(0)
@@ -0,0 +1,159 @@
+import csv
+import glob
+import os
+import queue
+import time
+from threading import Thread
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Streaming export of simulation results, in chunked columnar form.
+
+There is one row per Model update, not per cycle: an update may advance the Model by many cycles, and `cycle` is the
+Model's cycle at the end of the update. The other columns count what happened during the update.
+
+Rows are buffered in memory as columns, and every `chunk_size` rows, or every `flush_interval` seconds, the chunk is
+handed to a background thread that writes it, so writing does not slow down the simulation loop.
+
+Two formats are supported:
+    'csv': a single CSV file with a header row, appended to chunk by chunk.
+    'npz': a directory of chunk-<n>.npz files, one array per column. Requires NumPy.
+Results already at the path are replaced, unless the writer is made with append=True.
+           Columns are loaded lazily from each chunk, so a reader only pays for the columns it asks for.
+"""
+
+COLUMNS = ('cycle', 'messages_sent', 'messages_delivered', 'bytes', 'computations', 'current_cost', 'dcop_step')
+
+FORMATS = ('csv', 'npz')
+
+_STOP = None
+
+
+class ResultsWriter(object):
+    """
+    Writes one row per Model update to `path`.
+    """
+
+    def __init__(self, path, results_format='csv', chunk_size=1024, flush_interval=5.0, columns=COLUMNS,
+                 append=False):
+        """
+        :param path: the CSV file, or the directory of npz chunks.
+        :param results_format: 'csv' or 'npz'.
+        :param chunk_size: the number of rows buffered before they are written.
+        :param flush_interval: the maximum number of seconds a row is buffered before it is written.
+        :param columns: the names of the columns of each row.
+        :param append: if True, rows are added after the results already at `path`, which must have the same columns.
+        Else, those results are replaced.
+        :return:
+        """
+        if results_format not in FORMATS:
+            raise ValueError("Unknown results format " + str(results_format) + ". Expected one of " + str(FORMATS))
+        if results_format == 'npz' and numpy is None:
+            raise ImportError("The npz results format requires NumPy.")
+        self.path = path
+        self.results_format = results_format
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.columns = tuple(columns)
+
+        self._buffer = dict((column, []) for column in self.columns)
+        self._rows = 0
+        self._chunks = 0
+        self._last_flush = time.monotonic()
+
+        if results_format == 'npz':
+            os.makedirs(path, exist_ok=True)
+            chunk_paths = glob.glob(os.path.join(path, 'chunk-*.npz'))
+            if append:
+                self._chunks = len(chunk_paths)
+            else:
+                for chunk_path in chunk_paths:
+                    os.remove(chunk_path)
+        elif not append or not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'w', newline='') as f:
+                csv.writer(f).writerow(self.columns)
+
+        self._chunk_queue = queue.Queue()
+        self._writer_thread = Thread(target=self._write_chunks, daemon=True)
+        self._writer_thread.start()
+
+    def write_row(self, *values):
+        """
+        Buffers a row. The values are in the order of `columns`.
+        :return:
+        """
+        for column, value in zip(self.columns, values):
+            self._buffer[column].append(value)
+        self._rows += 1
+        if self._rows >= self.chunk_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands the buffered rows to the writer thread.
+        :return:
+        """
+        self._last_flush = time.monotonic()
+        if self._rows == 0:
+            return
+        self._chunk_queue.put(self._buffer)
+        self._buffer = dict((column, []) for column in self.columns)
+        self._rows = 0
+
+    def close(self):
+        """
+        Writes any buffered rows and waits for the writer thread to finish.
+        :return:
+        """
+        self.flush()
+        self._chunk_queue.put(_STOP)
+        self._writer_thread.join()
+
+    def _write_chunks(self):
+        while True:
+            chunk = self._chunk_queue.get()
+            if chunk is _STOP:
+                return
+            if self.results_format == 'csv':
+                with open(self.path, 'a', newline='') as f:
+                    csv.writer(f).writerows(zip(*(chunk[column] for column in self.columns)))
+            else:
+                arrays = dict((column, numpy.array([numpy.nan if v is None else v for v in chunk[column]]))
+                              for column in self.columns)
+                numpy.savez(os.path.join(self.path, 'chunk-{0:06d}.npz'.format(self._chunks)), **arrays)
+                self._chunks += 1
+
+
+def read_results(path, columns=None):
+    """
+    Reads results written by ResultsWriter. The format is inferred from `path`: a directory is read as npz chunks.
+    :param path: the CSV file, or the directory of npz chunks.
+    :param columns: the names of the columns to load. None to load all of them.
+    :return: a dict of column name to its values. For npz, the values are NumPy arrays. For CSV, they are lists of
+    floats, with None for empty values.
+    """
+    if os.path.isdir(path):
+        if numpy is None:
+            raise ImportError("Reading npz results requires NumPy.")
+        results = {}
+        for chunk_path in sorted(glob.glob(os.path.join(path, 'chunk-*.npz'))):
+            with numpy.load(chunk_path) as chunk:
+                for column in (chunk.files if columns is None else columns):
+                    results.setdefault(column, []).append(chunk[column])
+        return dict((column, numpy.concatenate(parts)) for column, parts in results.items())
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        selected = [(i, name) for i, name in enumerate(header) if columns is None or name in columns]
+        results = dict((name, []) for _, name in selected)
+        for row in reader:
+            for i, name in selected:
+                results[name].append(float(row[i]) if row[i] != '' else None)
+    return results
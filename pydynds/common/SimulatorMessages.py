@@ -8,10 +8,29 @@ Collection of classes that represent messages that are passed between the subpro
 class ViewUpdateRequest(object):
     """
     A simple class that represents a request from an algorithm for an update to its view of the DCOP from the simulator.
+    If wait_for_change is True, the simulator answers once its view differs from the last one it sent the algorithm.
     """
-    def __init__(self, timestamp=0):
+    def __init__(self, timestamp=0, wait_for_change=False):
         self.timestamp = timestamp
+        self.wait_for_change = wait_for_change
 
 
-request_messages = {'STOP': 0, 'START': 1, 'PAUSE': 2, 'RESUME': 3, 'CURRENT_STATE': 4, 'SUCCESS': 5, 'STATS':6} # Enum('RequestMessages', 'STOP START PAUSE RESUME CURRENT_STATE')
+class StepRequest(object):
+    """
+    A request from the controller for a process in lockstep mode to advance `cycles` cycles.
+    The process responds with request_messages['SUCCESS'] once it has completed all of them.
+    """
+    def __init__(self, cycles=1):
+        self.cycles = cycles
+
+
+class RestoreRequest(object):
+    """
+    A request from the controller for a process to replace its internal state with a previously checkpointed state.
+    """
+    def __init__(self, state=None):
+        self.state = state
+
 
+request_messages = {'STOP': 0, 'START': 1, 'PAUSE': 2, 'RESUME': 3, 'CURRENT_STATE': 4, 'SUCCESS': 5, 'STATS':6,
+                    'CHECKPOINT': 7, 'INSTRUMENTATION': 8, 'PORTFOLIO_STATS': 9} # Enum('RequestMessages', 'STOP START PAUSE RESUME CURRENT_STATE')
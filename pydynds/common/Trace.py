@@ -0,0 +1,180 @@
+import os
+import struct
+
+from common.Link import estimate_size
+
+__author__ = 'Victor Szczepanski'
+
+"""
+Recording and reading of append-only binary message traces.
+
+A trace file begins with a header and is followed by fixed-layout records, each beginning with a one byte record type:
+
+    MESSAGE:     id, start cycle, delivery cycle, payload size (uint64 each), source, destination
+    COMPUTATION: id, start cycle, end cycle, operations (uint64 each), cpu time (double), agent
+    CYCLE:       the Model's cycle after an update (uint64). Marks the end of the batch of records read in that update.
+
+Strings (source, destination, agent) are stored as a uint16 length followed by utf-8 bytes.
+"""
+
+TRACE_MAGIC = b'PDDSTRC\x00'
+TRACE_VERSION = 2
+
+RECORD_MESSAGE = 1
+RECORD_COMPUTATION = 2
+RECORD_CYCLE = 3
+
+_HEADER = struct.Struct('<8sH')
+_RECORD_TYPE = struct.Struct('<B')
+_MESSAGE = struct.Struct('<QQQQ')
+_COMPUTATION = struct.Struct('<QQQQd')
+_CYCLE = struct.Struct('<Q')
+_STRING_LENGTH = struct.Struct('<H')
+
+_BUFFER_SIZE = 1 << 16
+
+
+class InvalidTrace(ValueError):
+    pass
+
+
+def _pack_string(value):
+    encoded = str(value).encode('utf-8')
+    return _STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+class TraceWriter(object):
+    """
+    Writes the records of one run to a trace file. A trace already at the path is replaced, so a reader never sees
+    the records of two runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb', buffering=_BUFFER_SIZE)
+        self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+
+    def write_message(self, message, size=None):
+        """
+        Records a message. The message must already have been assigned an id, start cycle, and delivery cycle.
+        :param message: the Message to record.
+        :param size: the payload size of the message. If None, the message's size is used, or it is estimated with
+        common.Link.estimate_size if the message has none.
+        :return:
+        """
+        if size is None:
+            size = getattr(message, 'size', None)
+        if size is None:
+            size = estimate_size(message.data)
+        self._file.write(_RECORD_TYPE.pack(RECORD_MESSAGE) +
+                         _MESSAGE.pack(message.id, message.startCycle, message.deliveryCycle, size) +
+                         _pack_string(message.source) + _pack_string(message.destination))
+
+    def write_computation(self, computation):
+        """
+        Records a computation. The computation must already have been assigned an id, start cycle, and end cycle.
+        :param computation: the Computation to record.
+        :return:
+        """
+        self._file.write(_RECORD_TYPE.pack(RECORD_COMPUTATION) +
+                         _COMPUTATION.pack(computation.id, computation.startCycle, computation.endCycle,
+                                           computation.operations, computation.cpu_time) +
+                         _pack_string(computation.agent))
+
+    def write_cycle(self, cycle):
+        """
+        Records the end of an update of the Model.
+        :param cycle: the Model's cycle after the update.
+        :return:
+        """
+        self._file.write(_RECORD_TYPE.pack(RECORD_CYCLE) + _CYCLE.pack(cycle))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class TraceReader(object):
+    """
+    Reads a trace file written by TraceWriter.
+    Records are returned as tuples whose first element is the record type:
+
+        (RECORD_MESSAGE, id, start cycle, delivery cycle, payload size, source, destination)
+        (RECORD_COMPUTATION, id, start cycle, end cycle, operations, cpu time, agent)
+        (RECORD_CYCLE, cycle)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = f.read()
+        if len(self._data) < _HEADER.size:
+            raise InvalidTrace("File too short to be a trace: " + str(path))
+        magic, version = _HEADER.unpack_from(self._data, 0)
+        if magic != TRACE_MAGIC:
+            raise InvalidTrace("Not a PyDynDS trace: " + str(path))
+        if version != TRACE_VERSION:
+            raise InvalidTrace("Unsupported trace version " + str(version) + " in " + str(path))
+
+    def _read_string(self, offset):
+        length, = _STRING_LENGTH.unpack_from(self._data, offset)
+        offset += _STRING_LENGTH.size
+        if offset + length > len(self._data):
+            raise struct.error("truncated string")
+        return self._data[offset:offset + length].decode('utf-8'), offset + length
+
+    def records(self):
+        """
+        Generates the records in the trace, in the order they were written.
+        A truncated final record (e.g. from a crash during a write) is ignored.
+        :return:
+        """
+        data = self._data
+        offset = _HEADER.size
+        end = len(data)
+        try:
+            while offset < end:
+                record_type, = _RECORD_TYPE.unpack_from(data, offset)
+                offset += _RECORD_TYPE.size
+                if record_type == RECORD_MESSAGE:
+                    fields = _MESSAGE.unpack_from(data, offset)
+                    offset += _MESSAGE.size
+                    source, offset = self._read_string(offset)
+                    destination, offset = self._read_string(offset)
+                    yield (RECORD_MESSAGE,) + fields + (source, destination)
+                elif record_type == RECORD_COMPUTATION:
+                    fields = _COMPUTATION.unpack_from(data, offset)
+                    offset += _COMPUTATION.size
+                    agent, offset = self._read_string(offset)
+                    yield (RECORD_COMPUTATION,) + fields + (agent,)
+                elif record_type == RECORD_CYCLE:
+                    cycle, = _CYCLE.unpack_from(data, offset)
+                    offset += _CYCLE.size
+                    yield (RECORD_CYCLE, cycle)
+                else:
+                    raise InvalidTrace("Unknown record type " + str(record_type) + " at offset " + str(offset - 1))
+        except struct.error:
+            return
+
+    def updates(self):
+        """
+        Groups the records into the batches the Model read in each update.
+        :return: generates (messages, computations, cycle) for each update, where messages and computations are lists
+        of records.
+        """
+        messages = []
+        computations = []
+        for record in self.records():
+            if record[0] == RECORD_MESSAGE:
+                messages.append(record)
+            elif record[0] == RECORD_COMPUTATION:
+                computations.append(record)
+            else:
+                yield messages, computations, record[1]
+                messages = []
+                computations = []
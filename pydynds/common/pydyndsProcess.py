@@ -1,53 +1,123 @@
 from multiprocessing import Process
-import queue
-from threading import Thread, RLock
+from threading import Thread, Condition, BrokenBarrierError
 
-from common.SimulatorMessages import request_messages
+from common.SimulatorMessages import request_messages, RestoreRequest, StepRequest
+from common.Instrumentation import Instrumentation
+from common.Logging import get_logger, get_cycle_logger
+from common.Profiling import profiled
 
 __author__ = 'Victor Szczepanski'
 
+
+class PauseGate(object):
+    """
+    Blocks threads at the points where a process may pause, while it is paused. Usable as a context manager:
+
+        with self.pause_lock:
+            ...
+
+    waits until the process is not paused, then runs the block. A pause takes effect the next time a thread reaches
+    the gate, so a block already entered runs to its end. Waiting threads sleep on a condition variable, and wake
+    as soon as the process is resumed or stopped.
+    """
+
+    def __init__(self):
+        self._condition = Condition()
+        self._paused = False
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        with self._condition:
+            self._paused = True
+
+    def resume(self):
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+
+    def wait(self):
+        """
+        Blocks until the process is not paused.
+        :return:
+        """
+        with self._condition:
+            while self._paused:
+                self._condition.wait()
+
+    def __enter__(self):
+        self.wait()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
 class pydyndsProcess(Process):
     """
     Abstracts the interprocess communication API for PyDynDS subprocesses Algorithm, Model, and Simulator.
 
     Implementing classes must initialize the field `simulation_thread`.
+
+    If `instrument` is True, the latency of control requests and of any round trips timed by implementing classes
+    through `instrumentation` is recorded, and can be read with request_messages['INSTRUMENTATION'].
+
+    If `profile_dir` is not None, every thread made with _make_thread runs under a profiler and writes its profile to
+    `profile_dir`. See common.Profiling.
+
+    If `barrier` is not None, the process runs in lockstep mode: its simulation thread runs one lockstep_cycle per
+    cycle requested with a StepRequest, and the Model, Algorithm, and Simulator synchronize on the shared `barrier`
+    within each cycle.
+
+    Every thread blocks on a queue, an event, or a condition variable while it has nothing to do, so an idle or paused
+    process uses no CPU. A paused process stops at its next cycle boundary, where it waits at `pause_lock`.
     """
-    def __init__(self, input_queue, output_queue, message_event):
+    def __init__(self, input_queue, output_queue, message_event, instrument=False, profile_dir=None, barrier=None):
         super().__init__(name=type(self).__name__)
         self._stop = False
+        self.instrumentation = Instrumentation(enabled=instrument)
+        self.profile_dir = profile_dir
+        self.log = get_logger(type(self).__name__)
+        self.cycle_log = get_cycle_logger(type(self).__name__) #For events that happen every cycle. Rate limited.
 
         self.simulation_thread = None
         self._input_queue = input_queue
         self._output_queue = output_queue
         self._message_event = message_event
 
-        #Set up communication thread
-        self.control_thread = Thread(target=self._control)
-        self.control_thread.start()
+        self.barrier = barrier
+        self._steps_remaining = 0
+        self._step_condition = Condition()
+
+        #Set up communication thread. Processes built without a control channel (e.g. a Model replaying a trace) have none.
+        self.control_thread = None
+        if message_event is not None:
+            self.control_thread = self._make_thread(self._control)
+            self.control_thread.start()
 
-        self.pause_lock = RLock() #pause_lock lets us hold a lock on the run function of inheriting classes.
+        self.pause_lock = PauseGate() #Inheriting classes wait at pause_lock at the points where they may pause.
 
     def _control(self):
         """
         This function is responsible for monitoring the request queue for start, stop, and pause requests.
         :return:
         """
-        print("Starting control thread for class " + type(self).__name__)
+        self.log.debug("Starting control thread for class %s", type(self).__name__)
+        if self._input_queue is None:
+            return
         while not self._stop:
-
-            try:
-                if not self._message_event.wait(1): #Wait for a message event so we don't do too much busy waiting
-                    continue
-                # print("Got message event in " + type(self).__name__ + "!")
-                request = self._input_queue.get(block=False)
-                print("Got request! " + str(request) + " To: " + type(self).__name__)
+            #Block on the queue itself: every request, including STOP, arrives on it.
+            request = self._input_queue.get()
+            self.log.debug("Got request %s", request)
+            with self.instrumentation.timed('control', self._input_queue):
                 if self._special_control(request):
                     continue
                 if request is request_messages['START']:
                     self._start_control()
                     self._output_queue.put(request_messages['SUCCESS'])
                 elif request is request_messages['STOP']:
-                    print("Got stop event in " + type(self).__name__ + "!")
+                    self.log.debug("Got stop event.")
                     self._stop_control()
                     self._output_queue.put(request_messages['SUCCESS'])
                     break
@@ -57,11 +127,27 @@ class pydyndsProcess(Process):
                 elif request is request_messages['RESUME']:
                     self._resume_control()
                     self._output_queue.put(request_messages['SUCCESS'])
-            except queue.Empty:
-                continue
-            except AttributeError: #in case the queue is None
-                continue
-        print("Done with control thread in class " + type(self).__name__)
+                elif request is request_messages['INSTRUMENTATION']:
+                    self._output_queue.put(self.instrumentation.snapshot())
+                elif request is request_messages['CHECKPOINT']:
+                    self._output_queue.put(self.get_checkpoint_state())
+                elif isinstance(request, StepRequest):
+                    self._step_control(request.cycles) #Responds when the cycles are done.
+                elif isinstance(request, RestoreRequest):
+                    self.restore_checkpoint_state(request.state)
+                    self._output_queue.put(request_messages['SUCCESS'])
+        self.log.debug("Done with control thread in class %s", type(self).__name__)
+
+    def _make_thread(self, target):
+        """
+        Makes a Thread for `target`, profiled if this process was made with a profile_dir.
+        Implementing classes should make their threads with this function.
+        :param target: the function the thread runs.
+        :return: the new, unstarted Thread.
+        """
+        if self.profile_dir is not None:
+            return Thread(target=profiled(target, self.profile_dir, type(self).__name__))
+        return Thread(target=target)
 
     def _special_control(self, request):
         """
@@ -71,6 +157,23 @@ class pydyndsProcess(Process):
         """
         return False
 
+    def get_checkpoint_state(self):
+        """
+        Virtual function to be implemented by implementing classes that have state worth saving in a checkpoint.
+        The returned object must be picklable.
+        :return state: the state of this process, or None if there is nothing to save.
+        """
+        return None
+
+    def restore_checkpoint_state(self, state):
+        """
+        Virtual function to be implemented by implementing classes. Replaces this process' state with `state`,
+        as returned by an earlier call to get_checkpoint_state.
+        :param state: the state to restore.
+        :return:
+        """
+        pass
+
     def pre_stop(self):
         """
         Virtual function to be implemented by implementing classes.
@@ -88,6 +191,11 @@ class pydyndsProcess(Process):
         """
         self.pre_stop()
         self._stop = True
+        self.pause_lock.resume() #Releases threads waiting at the gate, so they can see the stop.
+        if self.barrier is not None:
+            self.barrier.abort() #Releases the other processes if they are waiting for this one.
+        with self._step_condition:
+            self._step_condition.notify_all()
         self.post_stop()
 
     def pre_pause(self):
@@ -98,11 +206,11 @@ class pydyndsProcess(Process):
 
     def _pause_control(self):
         """
-        Pauses this process' main thread, but allows communication threads to continue.
+        Pauses this process' main thread at its next cycle boundary, but allows communication threads to continue.
         :return:
         """
         self.pre_pause()
-        self.pause_lock.acquire()
+        self.pause_lock.pause()
         self.post_pause()
 
     def pre_resume(self):
@@ -113,9 +221,55 @@ class pydyndsProcess(Process):
 
     def _resume_control(self):
         self.pre_resume()
-        self.pause_lock.release()
+        self.pause_lock.resume()
         self.post_resume()
 
+    def lockstep_cycle(self):
+        """
+        Virtual function to be implemented by implementing classes that support lockstep mode.
+        Runs one cycle, waiting on `barrier` at the points where the processes synchronize.
+        :return:
+        """
+        raise NotImplementedError(type(self).__name__ + " does not support lockstep mode.")
+
+    def _step_control(self, cycles):
+        with self._step_condition:
+            self._steps_remaining += cycles
+            self._step_condition.notify_all()
+
+    def _wait_for_step(self):
+        """
+        Blocks until a cycle is requested.
+        :return bool: True if a cycle should be run. False if this process is stopping.
+        """
+        with self._step_condition:
+            while self._steps_remaining == 0 and not self._stop:
+                self._step_condition.wait()
+            return not self._stop
+
+    def _step_done(self):
+        with self._step_condition:
+            self._steps_remaining -= 1
+            done = self._steps_remaining == 0
+        if done:
+            self._output_queue.put(request_messages['SUCCESS'])
+
+    def _lockstep_run(self):
+        """
+        The simulation loop in lockstep mode. Implementing classes should call this from their run function
+        when `barrier` is not None.
+        :return:
+        """
+        try:
+            while self._wait_for_step():
+                with self.pause_lock:
+                    if self._stop:
+                        break
+                    self.lockstep_cycle()
+                self._step_done()
+        except BrokenBarrierError: #Another process stopped.
+            pass
+
     def pre_start(self):
         pass
 
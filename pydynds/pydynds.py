@@ -8,67 +8,83 @@ The main function handles starting up the simulator.
 """
 
 import argparse
+import sys
 
+import SimulationController
+from common.Profiling import merge_profiles
+from common.Dashboard import run_dashboard
+from common.DynDCOPFile import load_dyndcop
 
 
 class PyDynDS(object):
 
     def __init__(self):
         self.sim_controller = None
+        self.setup_args = None
 
-    def main(self, algorithm_name, message_delay, computation_delay, dyndcop_filename):
+    def main(self, algorithm_name, message_delay, computation_delay, dyndcop_filename, profile_dir=None):
         """
         main handles initialization of the pydynds simulator and kicks off a simulation.
         :param algorithm_name:
         :param message_delay:
         :param computation_delay:
         :param dyndcop_filename:
+        :param profile_dir: if not None, profile every component and write a merged report to this directory.
         :return:
         """
 
-        #TODO: Read in dyndcop from file
-        dyndcop = None
+        dyndcop = load_dyndcop(dyndcop_filename)
 
-        self.initialize(algorithm_name, message_delay, computation_delay, dyndcop)
+        self.initialize(algorithm_name, message_delay, computation_delay, dyndcop, profile_dir)
+        self.start_simulation()
 
         self.make_CLI()
 
-    def initialize(self, algorithm_name, message_delay, computation_delay, dyndcop):
+        self.stop_simulation()
+        if profile_dir is not None:
+            print("Wrote profile report to " + str(merge_profiles(profile_dir)))
+
+    def initialize(self, algorithm_name, message_delay, computation_delay, dyndcop, profile_dir=None):
         """
         Initializes the simulator.
 
         :return:
         """
-        self.sim_controller = SimulationController.SimulationController(algorithm_name, message_delay, computation_delay, dyndcop)
+        self.sim_controller = SimulationController.SimulationController()
+        self.setup_args = {'algorithm_name': algorithm_name, 'dyndcop': dyndcop, 'message_delay': message_delay,
+                           'computation_cost': computation_delay, 'profile_dir': profile_dir}
 
     def make_CLI(self):
         """
-        Makes a command-line interface to interact with the simulator.
+        Makes a command-line interface to interact with the simulator: a live dashboard of the simulation,
+        where p pauses and r resumes the simulation. Returns when the user quits.
         :return:
         """
-        pass
+        self.display_DynDCOP(keys={'p': ('pause', self.pause_simulation), 'r': ('resume', self.resume_simulation)})
 
-    def display_DynDCOP(self):
+    def display_DynDCOP(self, refresh_rate=4.0, keys=None):
         """
-        Uses curses to display the current state of the DynDCOP.
+        Uses curses to display the current state of the DynDCOP, from the metrics the simulation shares in memory.
+        :param refresh_rate: the number of refreshes per second.
+        :param keys: a dict of keys to (name, function) tuples to call when the key is pressed.
         :return:
         """
-        pass
+        run_dashboard(self.sim_controller.metrics, refresh_rate, keys)
 
     def initialize_simulator(self):
         """
         Reinitalizes the simulator.
         :return:
         """
-        #TODO: include logic to destroy any simulator, algorithm, or model instances.
-        self.initialize()
+        self.sim_controller.stop()
+        self.initialize(**self.setup_args)
 
     def start_simulation(self):
         """
         Kicks off the actual simulation of the provided DynDCOP.
         :return:
         """
-        self.sim_controller.setup()
+        self.sim_controller.setup(**self.setup_args)
         self.sim_controller.start()
 
     def pause_simulation(self):
@@ -83,16 +99,40 @@ class PyDynDS(object):
         Signals the simulation to continue from paused state. Raises an exception if simulation is not paused.
         :return:
         """
-        pass
+        self.sim_controller.resume()
 
     def stop_simulation(self):
         """
         Signals the simulation to stop all behaviour and quit.
         :returns stats, dynDCOP:the stats of the Algorithm and current state of the model
         """
-        pass
+        stats = self.sim_controller.get_current_stats()
+        self.sim_controller.stop()
+        return stats, None
+
+def serve_main(argv):
+    """
+    Runs the simulation daemon. See Server.
+    """
+    import Server
+    parser = argparse.ArgumentParser(prog='pydynds serve', description='Run simulation jobs sent over a local socket.')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--socket', metavar='PATH', type=str, help='Listen on the Unix socket PATH.')
+    group.add_argument('--port', metavar='N', type=int, help='Listen on localhost TCP port N.')
+    parser.add_argument('--token-file', metavar='PATH', type=str, default=None,
+                        help='With --port, the file to write the token that clients must send to PATH.')
+    parser.add_argument('--max-jobs', metavar='N', type=int, default=None,
+                        help='The number of worker processes, and so of jobs that may run at once. '
+                             'Defaults to the number of CPUs.')
+    args = parser.parse_args(argv)
+    if args.port is not None and args.token_file is None:
+        parser.error('--port requires --token-file.')
+    Server.serve(socket_path=args.socket, port=args.port or 0, max_jobs=args.max_jobs, token_path=args.token_file)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(sys.argv[2:])
+        sys.exit(0)
     parser = argparse.ArgumentParser(description='The Python Dynamic DCOP Simulator (PyDynDS)')
     parser.add_argument('algorithm_name', metavar='A', type=str,
                        help='The name of the Algorithm class to use in this simulation.')
@@ -102,7 +142,9 @@ if __name__ == "__main__":
                        help='The delay, in cycyles, for each computation.')
     parser.add_argument('DynDCOP', metavar='D', type=str,
                        help='The path to a DynDCOP file.')
+    parser.add_argument('--profile', metavar='DIR', type=str, default=None,
+                       help='Profile every component, and write the profiles and a merged report to DIR.')
 
     args = parser.parse_args()
     pydynds = PyDynDS()
-    pydynds.main(args.algorithm_name, args.message_delay, args.computation_delay, args.DynDCOP)
+    pydynds.main(args.algorithm_name, args.message_delay, args.computation_delay, args.DynDCOP, args.profile)
@@ -1 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Queue, Event
+from threading import Thread
+
+from Algorithms.Algorithm import Algorithm, SampleAlgorithm
+from Benchmarks.Generators import graph_coloring
+from DCOP.DCOP import DCOP
+from common.IDGenerator import IDGenerator
+from common.ResultCache import ResultCache, result_key
+from common.SimulatorMessages import request_messages, ViewUpdateRequest
+
 __author__ = 'Victor Szczepanski'
+
+
+class _Simulator(object):
+    """
+    Answers an Algorithm's ViewUpdateRequests with `view`, in place of a Simulator.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.input_queue = Queue()
+        self.output_queue = Queue()
+        self._thread = Thread(target=self._serve)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            request = self.input_queue.get()
+            if not isinstance(request, ViewUpdateRequest):
+                return
+            self.output_queue.put(self.view)
+
+    def stop(self):
+        self.input_queue.put(None)
+        self._thread.join()
+
+
+class AlgorithmTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dyndcop = graph_coloring(5, num_steps=2, seed=1)
+        self.simulator = _Simulator(DCOP.from_snapshot(self.dyndcop[0]))
+        self.algorithms = []
+
+    def tearDown(self):
+        for algorithm in self.algorithms:
+            algorithm.done = True
+            algorithm._input_queue.put(request_messages['STOP'])
+            algorithm._message_event.set()
+            algorithm.control_thread.join()
+            algorithm.model_request_thread.join()
+        self.simulator.stop()
+        shutil.rmtree(self.directory)
+
+    def _algorithm(self, **kwargs):
+        algorithm = Algorithm.factory(SampleAlgorithm.__name__, algorithm_input_queue=Queue(),
+                                      algorithm_output_queue=Queue(), controller_message_event=Event(),
+                                      simulator_input_queue=self.simulator.input_queue,
+                                      simulator_output_queue=self.simulator.output_queue,
+                                      simulator_message_event=Event(), model_input_queue=Queue(),
+                                      model_output_queue=Queue(), model_message_event=Event(),
+                                      initialDCOP=self.simulator.view, **kwargs)
+        self.algorithms.append(algorithm)
+        return algorithm
+
+    def test_factory(self):
+        self.assertIsInstance(self._algorithm(), SampleAlgorithm)
+        with self.assertRaises(NotImplementedError):
+            Algorithm.factory('NotAnAlgorithm')
+
+    def test_stats_are_read_once(self):
+        algorithm = self._algorithm()
+        algorithm._run_once()
+        algorithm._run_once()
+        algorithm._model_input_queue.put(request_messages['STATS'])
+        stats = algorithm._model_output_queue.get(timeout=5)
+        self.assertEqual((stats['total_messages'], stats['total_computations']), (2, 2))
+        self.assertEqual(len(stats['unread_messages']), 2)
+        self.assertEqual(algorithm.get_stats()['unread_messages'], [])
+
+    def test_stats_copy(self):
+        algorithm = self._algorithm(message_id_counter=IDGenerator.make_counter())
+        message = algorithm.send_message('v1', 'v2', data=b'payload')
+        stats = algorithm.get_stats()
+        self.assertEqual(stats['last_message'], {'id': message.id, 'size': message.size})
+        algorithm.send_message('v2', 'v1')
+        self.assertEqual(stats['total_messages'], 1) #A copy, not a view of the Algorithm's stats.
+        self.assertEqual(stats['unread_messages'], [message])
+        self.assertEqual(len(algorithm.get_stats(clear_unread=True)['unread_messages']), 2)
+        self.assertEqual(stats['unread_messages'], [message])
+
+    def test_ids_from_shared_counters(self):
+        counter = IDGenerator.make_counter()
+        first = self._algorithm(message_id_counter=counter)
+        second = self._algorithm(message_id_counter=counter)
+        for algorithm in (first, second, first):
+            algorithm.send_message('v1', 'v2')
+        ids = [message.id for algorithm in (first, second) for message in algorithm.get_stats()['unread_messages']]
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_result_cache_keys_each_view_once(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        algorithm = self._algorithm(result_cache=cache)
+        keyed = []
+        key_view = algorithm._key_view
+        algorithm._key_view = lambda: keyed.append(key_view())
+        for _ in range(3):
+            algorithm._run_once()
+        self.assertEqual(len(keyed), 1)
+
+        result = cache.get(result_key(self.simulator.view, SampleAlgorithm.__name__, SampleAlgorithm.version))
+        self.assertEqual((result['messages'], result['computations']), (3, 3))
+
+    def test_reuse_result(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        self._algorithm(result_cache=cache)._run_once()
+        algorithm = self._algorithm(result_cache=cache, reuse_results=True)
+        algorithm._run_once()
+        stats = algorithm.get_stats()
+        self.assertEqual((stats['total_messages'], stats['reused_results'], stats['view_reused']), (0, 1, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from AsyncSimulationController import AsyncSimulationController
+from SimulationController import SimulationController, ResponseTimeout
+from Benchmarks.Generators import graph_coloring
+from common.Checkpoint import read_checkpoint
+
+__author__ = 'Victor Szczepanski'
+
+
+class AsyncSimulationControllerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dyndcop = graph_coloring(6, num_steps=3, change_rate=0.5, step_cycles=20, seed=3)
+        self.controllers = []
+
+    def tearDown(self):
+        for controller in self.controllers:
+            asyncio.run(controller.stop(timeout=30))
+        shutil.rmtree(self.directory)
+
+    def _controller(self):
+        controller = AsyncSimulationController(log_level=logging.WARNING, default_timeout=30)
+        self.controllers.append(controller)
+        return controller
+
+    async def _setup(self, synchronous=True):
+        controller = self._controller()
+        await controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1,
+                               synchronous=synchronous)
+        await controller.start()
+        return controller
+
+    async def _wait_for_cycle(self, controller, cycle):
+        """
+        Waits until the Model of `controller` reaches `cycle`, and for the step's acknowledgement to be sent.
+        """
+        deadline = time.monotonic() + 30
+        while controller.controller.model.currentCycle < cycle and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+
+    def test_matches_blocking_controller(self):
+        blocking = SimulationController(log_level=logging.WARNING)
+        try:
+            blocking.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1, synchronous=True)
+            blocking.start()
+            blocking.step(10)
+            stats = blocking.get_current_stats()
+            expected = (blocking.model.currentCycle, stats['total_messages'], stats['total_computations'])
+        finally:
+            blocking.stop()
+
+        async def run():
+            controller = await self._setup()
+            await controller.step(4)
+            await controller.step(6)
+            stats = await controller.get_current_stats()
+            return controller.controller.model.currentCycle, stats['total_messages'], stats['total_computations']
+        self.assertEqual(asyncio.run(run()), expected)
+
+    def test_simulations_share_one_event_loop(self):
+        async def run():
+            controllers = await asyncio.gather(self._setup(), self._setup())
+            await asyncio.gather(*(controller.step(10) for controller in controllers))
+            return [controller.controller.model.currentCycle for controller in controllers]
+        self.assertEqual(asyncio.run(run()), [10, 10])
+
+    def test_late_response_after_timeout_is_discarded(self):
+        async def run():
+            controller = await self._setup()
+            with self.assertRaises(ResponseTimeout):
+                await controller.step(200, timeout=0.001)
+            await self._wait_for_cycle(controller, 200)
+            stats = await controller.get_current_stats() #Not the step's acknowledgement.
+            self.assertIsInstance(stats, dict)
+            await controller.step(1)
+            self.assertEqual(controller.controller.model.currentCycle, 201)
+        asyncio.run(run())
+
+    def test_late_response_after_cancellation_is_discarded(self):
+        async def run():
+            controller = await self._setup()
+            step = asyncio.ensure_future(controller.step(200))
+            await asyncio.sleep(0.001)
+            step.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await step
+            await self._wait_for_cycle(controller, 200)
+            await controller.step(1)
+            self.assertEqual(controller.controller.model.currentCycle, 201)
+        asyncio.run(run())
+
+    def test_pause_checkpoint_and_restore(self):
+        path = os.path.join(self.directory, 'checkpoint.bin')
+
+        async def run():
+            controller = await self._setup(synchronous=False)
+            await controller.pause()
+            self.assertIs(controller.current_state, SimulationController.states.PAUSED)
+            await controller.resume()
+            await controller.checkpoint(path)
+            self.assertIs(controller.current_state, SimulationController.states.RUNNING)
+            await controller.stop()
+            sections = read_checkpoint(path)
+
+            restored = self._controller()
+            await restored.restore(path)
+            self.assertIs(restored.current_state, SimulationController.states.SETUP)
+            self.assertEqual(restored.controller.model.currentCycle, sections['model']['current_cycle'])
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from threading import Thread
+
+from Benchmarks.Benchmark import run_benchmarks, _ViewServer, _make_algorithm, _stop_algorithm
+from Benchmarks.Generators import generators
+
+__author__ = 'Victor Szczepanski'
+
+_TIMEOUT = 60
+
+
+def _run_with_timeout(test, function, *args):
+    """
+    Runs `function` in a daemon thread, and fails `test` if it does not return within _TIMEOUT seconds.
+    :return: the return value of `function`.
+    """
+    returned = []
+    thread = Thread(target=lambda: returned.append(function(*args)), daemon=True)
+    thread.start()
+    thread.join(_TIMEOUT)
+    test.assertFalse(thread.is_alive(), function.__name__ + " did not return.")
+    return returned[0]
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_stop_algorithm(self):
+        dyndcop = generators['graph_coloring'](5, num_steps=2, seed=0)
+        for start in (False, True):
+            view_server = _ViewServer(dyndcop[0])
+            algorithm = _make_algorithm(dyndcop[0], view_server)
+            if start:
+                algorithm.simulation_thread.start()
+            _run_with_timeout(self, _stop_algorithm, algorithm)
+            view_server.stop()
+            self.assertFalse(algorithm.control_thread.is_alive())
+            self.assertFalse(algorithm.simulation_thread.is_alive())
+
+    def test_run_benchmarks(self):
+        report = _run_with_timeout(self, run_benchmarks, (5,), ['graph_coloring'], 0, 2, 0.1, 5, 0.1)
+        self.assertEqual([result['benchmark'] for result in report['results']],
+                         ['generate', 'ipc_round_trip', 'stats_collection', 'view_update', 'algorithm_run',
+                          'end_to_end'])
+        for result in report['results']:
+            self.assertEqual(result['params']['variables'], 5)
+            self.assertGreater(result['measurements']['seconds'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
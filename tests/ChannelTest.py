@@ -0,0 +1,121 @@
+import multiprocessing
+import queue
+import threading
+import unittest
+
+from common.Channel import BoundedChannel, get_request
+from common.SimulatorMessages import request_messages, ViewUpdateRequest
+
+__author__ = 'Victor Szczepanski'
+
+
+def _drain(channel):
+    items = []
+    while len(items) < channel.capacity:
+        items.append(channel.get(timeout=1))
+    return items
+
+
+class BoundedChannelTest(unittest.TestCase):
+
+    def test_block(self):
+        channel = BoundedChannel(2, BoundedChannel.policies.BLOCK)
+        channel.put('a')
+        channel.put('b')
+        with self.assertRaises(queue.Full):
+            channel.put('c', timeout=0.01)
+        self.assertEqual(_drain(channel), ['a', 'b'])
+        self.assertEqual(channel.dropped, 0)
+
+    def test_drop_oldest(self):
+        channel = BoundedChannel(2, BoundedChannel.policies.DROP_OLDEST)
+        for item in ('a', 'b', 'c'):
+            channel.put(item)
+        self.assertEqual(_drain(channel), ['b', 'c'])
+        self.assertEqual(channel.dropped, 1)
+
+    def test_drop_oldest_never_drops_requests(self):
+        channel = BoundedChannel(2, BoundedChannel.policies.DROP_OLDEST)
+        channel.put(request_messages['STATS'])
+        channel.put('a')
+        channel.put('b')
+        self.assertEqual(_drain(channel), [request_messages['STATS'], 'b'])
+
+        channel.put(request_messages['STATS'])
+        channel.put(ViewUpdateRequest())
+        channel.put('c')
+        items = _drain(channel)
+        self.assertIs(items[0], request_messages['STATS'])
+        self.assertIsInstance(items[1], ViewUpdateRequest)
+        self.assertEqual(channel.dropped, 2)
+        channel.put(request_messages['STATS'])
+        channel.put(ViewUpdateRequest())
+        with self.assertRaises(queue.Full): #Requests block instead.
+            channel.put(request_messages['STATS'], timeout=0.01)
+
+    def test_coalesce(self):
+        channel = BoundedChannel(4, BoundedChannel.policies.COALESCE)
+        channel.put(request_messages['STATS'])
+        channel.put(request_messages['STATS'])
+        channel.put(ViewUpdateRequest(timestamp=1, wait_for_change=True))
+        channel.put(ViewUpdateRequest(timestamp=2))
+        channel.put(ViewUpdateRequest(timestamp=3, wait_for_change=True))
+        self.assertEqual(channel.coalesced, 3)
+        self.assertEqual(channel.get_request(timeout=1), (request_messages['STATS'], 2))
+        view_request, waiters = channel.get_request(timeout=1)
+        self.assertEqual((view_request.timestamp, view_request.wait_for_change, waiters), (1, False, 3))
+        self.assertTrue(channel.empty())
+
+        channel.put(ViewUpdateRequest(timestamp=4, wait_for_change=True)) #Nothing is pending any more.
+        channel.put(ViewUpdateRequest(timestamp=5, wait_for_change=True))
+        view_request, waiters = channel.get_request(timeout=1)
+        self.assertEqual((view_request.timestamp, view_request.wait_for_change, waiters), (4, True, 2))
+        self.assertEqual(channel.coalesced, 4)
+
+    def test_coalesce_answers_every_waiter_of_a_saturated_receiver(self):
+        channel = BoundedChannel(2, BoundedChannel.policies.COALESCE)
+        replies = [queue.Queue() for _ in range(8)]
+        pending = queue.Queue() #The reply queue of each request, in the order the requests were sent.
+        received = []
+        receiver_busy = threading.Event()
+
+        def receive():
+            receiver_busy.wait(5)
+            while sum(received) < len(replies):
+                request, waiters = get_request(channel, timeout=1)
+                received.append(waiters)
+                for _ in range(waiters):
+                    reply_queue, index = pending.get(timeout=1)
+                    reply_queue.put(('view', request.timestamp, index))
+
+        def send(index):
+            pending.put((replies[index], index))
+            channel.put(ViewUpdateRequest(timestamp=index))
+
+        receiver = threading.Thread(target=receive)
+        receiver.start()
+        for index in range(len(replies)):
+            send(index)
+        receiver_busy.set() #Every request arrived while the receiver was busy.
+        receiver.join(10)
+        self.assertFalse(receiver.is_alive())
+        self.assertEqual(received, [len(replies)])
+        self.assertEqual(channel.coalesced, len(replies) - 1)
+        for index, reply_queue in enumerate(replies):
+            self.assertEqual(reply_queue.get(timeout=1), ('view', 0, index))
+
+    def test_get_request_from_queue(self):
+        channel = multiprocessing.Queue()
+        channel.put(request_messages['STATS'])
+        self.assertEqual(get_request(channel, timeout=1), (request_messages['STATS'], 1))
+
+    def test_stats(self):
+        channel = BoundedChannel(3, BoundedChannel.policies.COALESCE)
+        channel.put(request_messages['STATS'])
+        stats = channel.stats()
+        self.assertEqual((stats['capacity'], stats['policy'], stats['dropped'], stats['coalesced']),
+                         (3, 'COALESCE', 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from SimulationController import SimulationController
+from Model.Model import Model
+from Benchmarks.Generators import graph_coloring
+from common.Checkpoint import write_checkpoint, read_checkpoint, InvalidCheckpoint
+from common.Computation import Computation, ComputationCostModel
+from common.Link import LinkModel
+from common.Message import Message
+
+__author__ = 'Victor Szczepanski'
+
+
+class CheckpointFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        sections = {'model': {'current_cycle': 3}, 'algorithm': [1, 2, 3]}
+        write_checkpoint(self.path, sections)
+        self.assertEqual(read_checkpoint(self.path), sections)
+        self.assertEqual(read_checkpoint(self.path, names=['model']), {'model': {'current_cycle': 3}})
+
+    def test_not_a_checkpoint(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a checkpoint file')
+        with self.assertRaises(InvalidCheckpoint):
+            read_checkpoint(self.path)
+
+
+class ModelCheckpointTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        dyndcop = graph_coloring(5, num_steps=4, seed=1)
+        model = Model(dyn_dcop=dyndcop)
+        model._currentCycle = 250
+        model._dcopIndex = 2
+        model.currentDCOP = dyndcop[2]
+        model._pending_deliveries = [251, 253, 260]
+        model._messageIDs.skip_to(7)
+
+        restored = Model(dyn_dcop=dyndcop)
+        restored.restore_checkpoint_state(model.get_checkpoint_state())
+        self.assertEqual(restored.currentCycle, 250)
+        self.assertEqual(restored.currentDCOP, dyndcop[2])
+        self.assertEqual(restored._pending_deliveries, [251, 253, 260])
+        self.assertEqual(restored.lastMessageID, 7)
+
+    def test_messages_in_flight_without_results(self):
+        model = Model(link_model=LinkModel(2), computation_cost_model=ComputationCostModel(4))
+        self.assertIsNone(model.resultsPath)
+        model._advance([Message('v1', 'v2', size=8), Message('v2', 'v1', size=8)], [])
+        state = model.get_checkpoint_state()
+        self.assertEqual((state['current_cycle'], state['pending_deliveries'], state['messages_delivered']),
+                         (2, [], 2))
+
+        #A checkpoint taken with messages still in flight.
+        state = dict(state, current_cycle=3, pending_deliveries=[5, 9])
+        restored = Model(link_model=LinkModel(2), computation_cost_model=ComputationCostModel(4))
+        restored.restore_checkpoint_state(state)
+        self.assertEqual(restored.get_checkpoint_state()['pending_deliveries'], [5, 9])
+        restored._advance([], [Computation('v1')])
+        state = restored.get_checkpoint_state()
+        self.assertEqual((state['current_cycle'], state['pending_deliveries'], state['messages_delivered']),
+                         (7, [9], 3))
+        self.assertEqual(restored.messagesDelivered, 3)
+
+
+class ControllerCheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint.bin')
+        self.dyndcop = graph_coloring(5, num_steps=5, step_cycles=50, seed=1)
+        self.controllers = []
+
+    def tearDown(self):
+        for controller in self.controllers:
+            controller.stop()
+        shutil.rmtree(self.directory)
+
+    def _controller(self):
+        controller = SimulationController(log_level=logging.WARNING, response_timeout=30)
+        self.controllers.append(controller)
+        return controller
+
+    def test_restore_includes_simulator_view(self):
+        controller = self._controller()
+        controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1, synchronous=True)
+        controller.start()
+        controller.step(160)
+        self.assertEqual(controller.model.currentDCOP['start_cycle'], 150)
+        controller.checkpoint(self.path)
+        self.assertIs(controller.current_state, SimulationController.states.RUNNING)
+        controller.stop()
+
+        restored = self._controller()
+        restored.restore(self.path)
+        self.assertEqual(restored.model.currentDCOP['start_cycle'], 150)
+        self.assertEqual(restored.simulator.view['start_cycle'], 150)
+        restored.start()
+        restored.step(1)
+        self.assertEqual(restored.algorithm._DCOP_view['start_cycle'], 150)
+
+    def test_checkpoint_of_running_simulation(self):
+        controller = self._controller()
+        controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1)
+        controller.start()
+        controller.checkpoint(self.path)
+        self.assertIs(controller.current_state, SimulationController.states.RUNNING)
+        sections = read_checkpoint(self.path)
+        self.assertEqual(set(sections), {'controller', 'model', 'simulator', 'algorithm'})
+        self.assertEqual(sections['simulator']['view'], sections['model']['current_dcop'])
+
+    def _assert_messages_conserved(self, model_state, algorithm_stats):
+        #Every message the Algorithm sent is either delivered, in flight, or not yet read by the Model.
+        self.assertEqual(algorithm_stats['total_messages'],
+                         model_state['messages_delivered'] + len(model_state['pending_deliveries']) +
+                         len(algorithm_stats['unread_messages']))
+
+    def test_repeated_checkpoints_conserve_messages(self):
+        controller = self._controller()
+        controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1)
+        controller.start()
+        for _ in range(100):
+            controller.checkpoint(self.path)
+            sections = read_checkpoint(self.path)
+            self._assert_messages_conserved(sections['model'], sections['algorithm']['stats'])
+        self.assertGreater(sections['algorithm']['stats']['total_messages'], 0)
+        controller.stop()
+
+        restored = self._controller()
+        restored.restore(self.path)
+        self._assert_messages_conserved(restored.model.get_checkpoint_state(), restored.algorithm.get_stats())
+        self.assertEqual(restored.algorithm.get_stats()['total_messages'],
+                         sections['algorithm']['stats']['total_messages'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import pickle
+import unittest
+
+from DCOP.DCOP import DCOP
+
+__author__ = 'Victor Szczepanski'
+
+
+def _triangle_and_tail():
+    #v0 - v1 - v2 - v0 form a triangle, v3 hangs off v2, and v4 has no constraints.
+    snapshot = {'start_cycle': 7, 'variables': ['v0', 'v1', 'v2', 'v3', 'v4'],
+                'domains': {'v0': 2, 'v1': 2, 'v2': 3, 'v3': 2, 'v4': 4},
+                'constraints': [(('v0', 'v1'), [[0, 1], [1, 0]]), (('v1', 'v2'), [[0, 1, 2], [2, 1, 0]]),
+                                (('v2', 'v0'), [[0, 1], [1, 0], [2, 2]]), (('v2', 'v3'), [[0, 0], [1, 1], [2, 2]])]}
+    return snapshot, DCOP.from_snapshot(snapshot)
+
+
+class DCOPTest(unittest.TestCase):
+
+    def assertGraph(self, dcop):
+        self.assertEqual(dcop.num_variables, 5)
+        self.assertEqual(dcop.num_constraints, 4)
+        self.assertEqual(list(dcop.domain_sizes), [2, 2, 3, 2, 4])
+        self.assertEqual([list(dcop.neighbors(v)) for v in range(5)], [[1, 2], [0, 2], [0, 1, 3], [2], []])
+        self.assertEqual([dcop.degree(v) for v in range(5)], [2, 2, 3, 1, 0])
+        self.assertEqual([list(dcop.constraints_of(v)) for v in range(5)], [[0, 2], [0, 1], [1, 2, 3], [3], []])
+        self.assertEqual([list(dcop.scope(c)) for c in range(4)], [[0, 1], [1, 2], [2, 0], [2, 3]])
+
+    def test_csr_graph(self):
+        _, dcop = _triangle_and_tail()
+        self.assertGraph(dcop)
+        self.assertEqual(list(dcop.adjacency_offsets), [0, 2, 4, 7, 8, 8])
+        self.assertIsInstance(dcop.neighbors(0), memoryview)
+
+    def test_handles(self):
+        _, dcop = _triangle_and_tail()
+        v2 = dcop.variable('v2')
+        self.assertEqual((v2.index, v2.name, v2.domain_size), (2, 'v2', 3))
+        self.assertEqual([neighbor.name for neighbor in v2.neighbors()], ['v0', 'v1', 'v3'])
+        self.assertEqual([[variable.name for variable in constraint.scope] for constraint in v2.constraints()],
+                         [['v1', 'v2'], ['v2', 'v0'], ['v2', 'v3']])
+        self.assertEqual(v2, dcop.variable('v2'))
+
+    def test_snapshot_round_trip(self):
+        snapshot, dcop = _triangle_and_tail()
+        self.assertEqual(dcop.to_snapshot(), dict(snapshot, constraints=[(tuple(scope), table)
+                                                                         for scope, table in snapshot['constraints']]))
+
+    def test_compressed_tables_are_shared(self):
+        table = [[0, 1], [1, 0]]
+        snapshot = {'variables': ['a', 'b', 'c'], 'domains': {'a': 2, 'b': 2, 'c': 2},
+                    'constraints': [(('a', 'b'), table), (('b', 'c'), table)]}
+        dcop = DCOP.from_snapshot(snapshot, compress_tables=True)
+        self.assertIs(dcop.tables[0], dcop.tables[1])
+        self.assertEqual(dcop.tables[0].cost((0, 1)), 1)
+
+    def test_pickle_drops_derived_arrays(self):
+        _, dcop = _triangle_and_tail()
+        dcop.adjacency
+        copy = pickle.loads(pickle.dumps(dcop))
+        self.assertIsNone(copy._adjacency)
+        self.assertEqual(copy.start_cycle, 7)
+        self.assertGraph(copy)
+
+    def test_shared_memory(self):
+        _, dcop = _triangle_and_tail()
+        block = dcop.publish()
+        try:
+            attached = DCOP.attach(block.name)
+            try:
+                self.assertGraph(attached)
+                self.assertEqual(attached.start_cycle, 7)
+                self.assertEqual(attached.variable_names, dcop.variable_names)
+                self.assertEqual(attached.tables, dcop.tables)
+                with self.assertRaises(TypeError):
+                    attached.domain_sizes[0] = 9
+            finally:
+                attached.close()
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_attach_rejects_other_blocks(self):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=128)
+        try:
+            with self.assertRaises(ValueError):
+                DCOP.attach(block.name)
+        finally:
+            block.close()
+            block.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from threading import Thread
+
+from common.Computation import Computation
+from common.History import EventHistory, read_history, KIND_MESSAGE, KIND_COMPUTATION
+from common.Message import Message
+
+__author__ = 'Victor Szczepanski'
+
+
+class EventHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_bounded_in_memory(self):
+        history = EventHistory(size=3)
+        for i in range(10):
+            history.append_message(Message('v1', 'v2', i))
+        self.assertEqual(len(history), 10)
+        self.assertEqual([event[1] for event in history.recent()], [7, 8, 9])
+        self.assertEqual(history.spilled, 0)
+
+    def test_spill_and_read(self):
+        history = EventHistory(size=2, spill_path=self.path)
+        history.append_message(Message('v1', 'v2', [1, 2]))
+        history.append_computation(Computation('v1', 'data'))
+        history.append_message(Message('v2', 'v1'))
+        history.append_message(Message('v3', 'v1'))
+        self.assertEqual(history.spilled, 2)
+        self.assertEqual([event[1] for event in history.events()], [0, 1, 2, 3])
+        history.close()
+
+        self.assertEqual(list(read_history(self.path)), [(KIND_MESSAGE, 0, 'v1', 'v2', [1, 2]),
+                                                         (KIND_COMPUTATION, 1, 'v1', None, 'data')])
+        self.assertEqual([event[1] for event in read_history(self.path, KIND_COMPUTATION)], [1])
+
+    def test_new_history_replaces_old_spill_file(self):
+        for run in range(2):
+            history = EventHistory(size=0, spill_path=self.path)
+            history.append_message(Message('v1', 'v2', run))
+            history.close()
+        self.assertEqual([(event[1], event[4]) for event in read_history(self.path)], [(0, 1)])
+
+    def test_spill_after_close_is_counted(self):
+        history = EventHistory(size=0, spill_path=self.path)
+        history.append_message(Message('v1', 'v2'))
+        history.close()
+        history.append_message(Message('v1', 'v2'))
+        self.assertEqual((history.spilled, history.lost), (1, 1))
+
+    def test_concurrent_appends_spill_in_order(self):
+        history = EventHistory(size=10, spill_path=self.path)
+
+        def append():
+            for i in range(500):
+                history.append_message(Message('v1', 'v2', i))
+
+        threads = [Thread(target=append) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        history.close()
+        self.assertEqual([event[1] for event in read_history(self.path)], list(range(1990)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from threading import Thread
+
+from common.IDGenerator import IDGenerator
+
+__author__ = 'Victor Szczepanski'
+
+
+class IDGeneratorTest(unittest.TestCase):
+
+    def test_own_counter(self):
+        generator = IDGenerator()
+        self.assertEqual([generator.nextID() for _ in range(5)], [0, 1, 2, 3, 4])
+        self.assertEqual(generator.currentID, 5)
+
+    def test_blocks_from_shared_counter(self):
+        counter = IDGenerator.make_counter()
+        first = IDGenerator(counter, block_size=4)
+        second = IDGenerator(counter, block_size=4)
+        self.assertEqual([first.nextID() for _ in range(2)], [0, 1])
+        self.assertEqual([second.nextID() for _ in range(5)], [4, 5, 6, 7, 8])
+        self.assertEqual([first.nextID() for _ in range(3)], [2, 3, 12])
+        self.assertEqual(first.nextUnreservedID, 16)
+
+    def test_unique_across_threads(self):
+        counter = IDGenerator.make_counter()
+        ids = []
+
+        def generate():
+            generator = IDGenerator(counter, block_size=16)
+            ids.extend(generator.nextID() for _ in range(1000))
+
+        threads = [Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(ids)), 4000)
+
+    def test_restore_does_not_repeat_ids(self):
+        counter = IDGenerator.make_counter()
+        saved = IDGenerator(counter, block_size=8)
+        other = IDGenerator(counter, block_size=8)
+        used = [saved.nextID() for _ in range(3)] + [other.nextID() for _ in range(3)]
+        checkpoint = saved.nextUnreservedID
+
+        restored_counter = IDGenerator.make_counter()
+        restored = IDGenerator(restored_counter, block_size=8)
+        restored.skip_to(checkpoint)
+        restored_other = IDGenerator(restored_counter, block_size=8)
+        new = [restored.nextID() for _ in range(10)] + [restored_other.nextID() for _ in range(10)]
+        self.assertFalse(set(used) & set(new))
+        self.assertEqual(len(set(new)), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import queue
+import unittest
+
+from common.Instrumentation import Instrumentation, LatencyHistogram, Gauge
+
+__author__ = 'Victor Szczepanski'
+
+
+def _bucket(histogram, value):
+    """
+    :return: the lower bound of the bucket `value` is recorded in.
+    """
+    return histogram._value(histogram._index(value))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram(sub_bucket_bits=5)
+        for value in range(32):
+            self.assertEqual(_bucket(histogram, value), value)
+
+    def test_bucket_relative_error(self):
+        histogram = LatencyHistogram(sub_bucket_bits=5)
+        for value in list(range(32, 5000)) + [10 ** 6, 10 ** 9 + 7, 2 ** 40 - 1]:
+            lower = _bucket(histogram, value)
+            self.assertLessEqual(lower, value)
+            self.assertLessEqual(value - lower, lower / 16.0)
+        self.assertEqual([_bucket(histogram, value) for value in (32, 33, 34, 63, 64, 67, 68)],
+                         [32, 32, 34, 62, 64, 64, 68])
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual([histogram.percentile(percent) for percent in (0, 10, 50, 90, 99, 100)],
+                         [1, 10, 50, 88, 96, 100])
+
+        snapshot = histogram.snapshot()
+        self.assertEqual((snapshot['count'], snapshot['min'], snapshot['max'], snapshot['mean']), (100, 1, 100, 50.5))
+        self.assertEqual((snapshot['p50'], snapshot['p99.9']), (50, 100))
+
+    def test_percentile_of_outlier(self):
+        histogram = LatencyHistogram()
+        for _ in range(999):
+            histogram.record(1000)
+        histogram.record(10 ** 9)
+        self.assertEqual(histogram.percentile(99), _bucket(histogram, 1000))
+        self.assertEqual(histogram.percentile(100), _bucket(histogram, 10 ** 9))
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_disabled(self):
+        instrumentation = Instrumentation()
+        with instrumentation.timed('stats', queue.Queue()):
+            pass
+        self.assertIs(instrumentation.timed('stats'), instrumentation.timed('view_update'))
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_enabled(self):
+        instrumentation = Instrumentation(enabled=True)
+        requests = queue.Queue()
+        for depth in (2, 0):
+            for _ in range(depth):
+                requests.put(None)
+            with instrumentation.timed('stats', requests):
+                pass
+            while not requests.empty():
+                requests.get()
+        with instrumentation.timed('control'):
+            pass
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(set(snapshot), {'stats', 'control'})
+        self.assertEqual(snapshot['stats']['latency_ns']['count'], 2)
+        self.assertEqual(snapshot['stats']['queue_depth'], {'last': 0, 'max': 2})
+        self.assertNotIn('queue_depth', snapshot['control'])
+
+    def test_gauge(self):
+        gauge = Gauge()
+        for value in (3, 7, 1):
+            gauge.record(value)
+        self.assertEqual(gauge.snapshot(), {'last': 1, 'max': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
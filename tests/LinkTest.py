@@ -0,0 +1,67 @@
+import sys
+import unittest
+
+from common.Link import LinkModel, estimate_size, register_size_estimator
+from common.Message import Message
+
+__author__ = 'Victor Szczepanski'
+
+
+class _Payload(object):
+    pass
+
+
+class _Buffer(object):
+    nbytes = 32
+
+
+class _Hypercube(object):
+    def __init__(self, cells):
+        self.cells = cells
+
+
+class EstimateSizeTest(unittest.TestCase):
+
+    def test_builtin_types(self):
+        self.assertEqual(estimate_size(None), 0)
+        self.assertEqual(estimate_size(3), 8)
+        self.assertEqual(estimate_size(2.5), 8)
+        self.assertEqual(estimate_size('abcd'), 4)
+        self.assertEqual(estimate_size(b'abc'), 3)
+        self.assertEqual(estimate_size([1, 2.0, 'ab']), 18)
+        self.assertEqual(estimate_size({'ab': (1, 2)}), 18)
+
+    def test_arrays_report_their_buffer(self):
+        self.assertEqual(estimate_size(_Buffer()), 32)
+        self.assertEqual(estimate_size(memoryview(b'12345')), 5)
+
+    def test_unknown_types(self):
+        payload = _Payload()
+        self.assertEqual(estimate_size(payload), sys.getsizeof(payload))
+
+        register_size_estimator(_Hypercube, lambda data: 8 * data.cells)
+        self.assertEqual(estimate_size(_Hypercube(10)), 80)
+        self.assertEqual(Message('a', 'b', _Hypercube(3)).size, 24)
+
+
+class LinkModelTest(unittest.TestCase):
+
+    def test_latency_only(self):
+        self.assertEqual(LinkModel(3).delivery_cycles(Message('a', 'b', 'x' * 1000)), 3)
+
+    def test_bandwidth(self):
+        link = LinkModel(1, bandwidth=100)
+        self.assertEqual(link.delivery_cycles(Message('a', 'b', size=0)), 1)
+        self.assertEqual(link.delivery_cycles(Message('a', 'b', size=100)), 2)
+        self.assertEqual(link.delivery_cycles(Message('a', 'b', size=101)), 3)
+
+    def test_edges(self):
+        link = LinkModel(1, bandwidth=100, edges={('a', 'b'): (5, None), ('b', 'a'): (0, 10)})
+        message = Message('a', 'b', size=1000)
+        self.assertEqual(link.delivery_cycles(message), 5)
+        self.assertEqual(link.delivery_cycles(Message('b', 'a', size=25)), 3)
+        self.assertEqual(link.delivery_cycles(Message('a', 'c', size=150)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import logging
+import unittest
+
+from SimulationController import SimulationController, InvalidState
+from Benchmarks.Generators import graph_coloring
+
+__author__ = 'Victor Szczepanski'
+
+
+class LockstepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dyndcop = graph_coloring(6, num_steps=3, change_rate=0.5, step_cycles=20, seed=3)
+        self.controllers = []
+
+    def tearDown(self):
+        for controller in self.controllers:
+            controller.stop()
+
+    def _controller(self, synchronous=True):
+        controller = SimulationController(log_level=logging.WARNING)
+        self.controllers.append(controller)
+        controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1, synchronous=synchronous)
+        return controller
+
+    def _run(self, *steps):
+        """
+        :return: the Model's cycle and the Algorithm's totals after stepping a new simulation by each of `steps`.
+        """
+        controller = self._controller()
+        controller.start()
+        for cycles in steps:
+            controller.step(cycles)
+        stats = controller.get_current_stats()
+        return controller.model.currentCycle, stats['total_messages'], stats['total_computations']
+
+    def test_step_is_deterministic(self):
+        cycle, messages, computations = self._run(10)
+        self.assertEqual(cycle, 10)
+        self.assertGreater(messages + computations, 0)
+        self.assertEqual(self._run(10), (cycle, messages, computations))
+        self.assertEqual(self._run(4, 0, 6), (cycle, messages, computations))
+
+    def test_step_advances(self):
+        controller = self._controller()
+        controller.start()
+        controller.step(2)
+        cycle = controller.model.currentCycle
+        controller.step(2)
+        self.assertGreater(controller.model.currentCycle, cycle)
+
+    def test_step_requires_running_synchronous_simulation(self):
+        controller = self._controller()
+        with self.assertRaises(InvalidState):
+            controller.step()
+        controller = self._controller(synchronous=False)
+        controller.start()
+        with self.assertRaises(InvalidState):
+            controller.step()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import logging
+import unittest
+from unittest import mock
+
+from common.Logging import RateLimitFilter, SamplingFilter, get_cycle_logger
+
+__author__ = 'Victor Szczepanski'
+
+
+def _record(msg, *args):
+    return logging.LogRecord('pydynds.Test.cycle', logging.DEBUG, __file__, 1, msg, args, None)
+
+
+class _Clock(object):
+    """
+    A monotonic clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch('common.Logging.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        log_filter = RateLimitFilter(rate=2.0, burst=3)
+        self.assertEqual([log_filter.filter(_record("Update %d", i)) for i in range(5)],
+                         [True, True, True, False, False])
+        self.clock.now += 0.5 #One token.
+        self.assertEqual([log_filter.filter(_record("Update %d", i)) for i in range(2)], [True, False])
+        self.clock.now += 60 #Refills to the burst, no more.
+        self.assertEqual(sum(log_filter.filter(_record("Update %d", i)) for i in range(10)), 3)
+
+    def test_counts_suppressed_records(self):
+        log_filter = RateLimitFilter(rate=1.0, burst=1)
+        self.assertTrue(log_filter.filter(_record("Update %d", 0)))
+        for i in range(4):
+            self.assertFalse(log_filter.filter(_record("Update %d", i)))
+        self.clock.now += 1
+        record = _record("Update %d", 9)
+        self.assertTrue(log_filter.filter(record))
+        self.assertEqual(record.getMessage(), "Update 9 (4 similar messages suppressed)")
+
+        record = _record("Update %d", 10)
+        self.clock.now += 1
+        self.assertTrue(log_filter.filter(record))
+        self.assertEqual(record.getMessage(), "Update 10")
+
+    def test_templates_are_limited_separately(self):
+        log_filter = RateLimitFilter(rate=1.0, burst=1)
+        self.assertTrue(log_filter.filter(_record("Update %d", 0)))
+        self.assertFalse(log_filter.filter(_record("Update %d", 1)))
+        self.assertTrue(log_filter.filter(_record("Got response: %s", 'stats')))
+
+
+class SamplingFilterTest(unittest.TestCase):
+
+    def test_every(self):
+        log_filter = SamplingFilter(every=3)
+        self.assertEqual([log_filter.filter(_record("Update %d", i)) for i in range(7)],
+                         [True, False, False, True, False, False, True])
+
+    def test_templates_are_sampled_separately(self):
+        log_filter = SamplingFilter(every=2)
+        self.assertTrue(log_filter.filter(_record("Update %d", 0)))
+        self.assertTrue(log_filter.filter(_record("Got response: %s", 'stats')))
+        self.assertFalse(log_filter.filter(_record("Update %d", 1)))
+
+
+class CycleLoggerTest(unittest.TestCase):
+
+    def test_filters_installed_once(self):
+        logger = get_cycle_logger('LoggingTest', sample_every=10)
+        self.assertEqual([type(log_filter) for log_filter in logger.filters], [SamplingFilter, RateLimitFilter])
+        self.assertIs(get_cycle_logger('LoggingTest', sample_every=5), logger)
+        self.assertEqual(len(logger.filters), 2)
+        self.assertEqual(logger.name, 'pydynds.LoggingTest.cycle')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,92 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from SimulationController import SimulationController
+from Model.Model import Model
+from Benchmarks.Generators import graph_coloring
+from common.Computation import Computation, ComputationCostModel
+from common.Link import LinkModel
+from common.Message import Message
+from common.ResultCache import ResultCache
+from common.Trace import TraceWriter
+
 __author__ = 'Victor Szczepanski'
 
 
+class ModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dyndcop = graph_coloring(5, num_steps=4, change_rate=0, step_cycles=50, seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_advance_by_slowest_message_or_computation(self):
+        model = Model(link_model=LinkModel(2), computation_cost_model=ComputationCostModel(5))
+        messages = [Message('v1', 'v2', size=8), Message('v2', 'v1', size=8)]
+        model._advance(messages, [Computation('v1')])
+        self.assertEqual(model.currentCycle, 5)
+        self.assertEqual([message.deliveryCycle for message in messages], [2, 2])
+        self.assertEqual([message.id for message in messages], [0, 1])
+
+        model._advance([Message('v1', 'v2', size=8)], [])
+        self.assertEqual(model.currentCycle, 7)
+
+    def test_update_current_dcop(self):
+        model = Model(dyn_dcop=self.dyndcop)
+        self.assertIsNone(model._update_current_dcop())
+        model._currentCycle = 120
+        self.assertIs(model._update_current_dcop(), self.dyndcop[2])
+        self.assertIs(model.currentDCOP, self.dyndcop[2])
+
+    def test_replay_of_update_that_only_moves_the_cycle(self):
+        trace_path = os.path.join(self.directory, 'trace.bin')
+        writer = TraceWriter(trace_path)
+        live = Model(message_delay=1)
+        live._trace_writer = writer
+        live._advance([Message('v1', 'v2', size=8)], [])
+        live._currentCycle = 50
+        writer.write_cycle(live.currentCycle)
+        live._advance([Message('v1', 'v2', size=8)], [])
+        writer.close()
+
+        replayed = Model(message_delay=1).replay(trace_path)
+        self.assertEqual(replayed, {'cycle': 51, 'total_messages': 2, 'total_computations': 0})
+
+    def test_replay_after_skip(self):
+        trace_path = os.path.join(self.directory, 'trace.bin')
+        live = Model(dyn_dcop=self.dyndcop, message_delay=1)
+        live._trace_writer = TraceWriter(trace_path)
+        live._advance([Message('v1', 'v2', size=8)], [])
+        live._skip_to_next_dcop()
+        live._update_current_dcop()
+        live._advance([Message('v1', 'v2', size=8)], [])
+        live._trace_writer.close()
+        self.assertEqual(live.currentCycle, 51)
+
+        replayed = Model(message_delay=1).replay(trace_path)
+        self.assertEqual(replayed, {'cycle': 51, 'total_messages': 2, 'total_computations': 0})
+
+    def test_replay_of_run_with_reused_results(self):
+        trace_path = os.path.join(self.directory, 'trace.bin')
+        controller = SimulationController(log_level=logging.WARNING, response_timeout=30)
+        controller.setup('SampleAlgorithm', self.dyndcop, message_delay=1, computation_cost=1, synchronous=True,
+                         trace_path=trace_path, result_cache=ResultCache(os.path.join(self.directory, 'cache')),
+                         reuse_results=True)
+        try:
+            controller.start()
+            controller.step(60)
+            cycle = controller.model.currentCycle
+            #The later DCOPs equal the first, so their cached results are reused, and the Model skips to the last.
+            self.assertEqual(cycle, 150)
+        finally:
+            controller.stop()
+        self.assertEqual(Model(message_delay=1, computation_cost=1).replay(trace_path)['cycle'], cycle)
+
+
+if __name__ == '__main__':
+    unittest.main()
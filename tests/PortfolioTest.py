@@ -0,0 +1,93 @@
+import logging
+import unittest
+
+from SimulationController import SimulationController
+from Algorithms.Algorithm import SampleAlgorithm
+from Benchmarks.Generators import graph_coloring
+
+__author__ = 'Victor Szczepanski'
+
+
+class PortfolioTestChatty(SampleAlgorithm):
+    """
+    Sends two messages in every run, and reports a cost that falls by one with every run until it reaches 0.
+    """
+
+    def Run(self):
+        super().Run()
+        self.send_message('v2', 'v1', b'ack')
+        cost = self.stats['current_cost']
+        self.report_cost(5 if cost is None else max(0, cost - 1))
+
+
+class PortfolioTestQuiet(SampleAlgorithm):
+    pass
+
+
+class PortfolioTest(unittest.TestCase):
+
+    names = ['PortfolioTestChatty', 'PortfolioTestQuiet']
+
+    def setUp(self):
+        self.dyndcop = graph_coloring(6, num_steps=3, change_rate=0.5, step_cycles=10, seed=3)
+        self.controller = SimulationController(log_level=logging.WARNING, response_timeout=30)
+
+    def tearDown(self):
+        self.controller.stop()
+
+    def _run(self, cycles=30, **kwargs):
+        self.controller.setup(self.names, self.dyndcop, message_delay=1, computation_cost=1, synchronous=True,
+                              **kwargs)
+        self.controller.start()
+        self.controller.step(cycles)
+        return self.controller.get_current_stats()
+
+    def test_stats_by_algorithm(self):
+        stats = self._run()
+        self.assertEqual(set(stats), {'portfolio'})
+        portfolio = stats['portfolio']
+        self.assertEqual(set(portfolio), set(self.names))
+        for name, algorithm_stats in portfolio.items():
+            #Every message the Algorithm sent was either read by the Model or is still unread.
+            self.assertEqual(algorithm_stats['messages'] + len(algorithm_stats['unread_messages']),
+                             algorithm_stats['total_messages'], name)
+            self.assertGreater(algorithm_stats['active_cycles'], 0, name)
+            self.assertLessEqual(algorithm_stats['active_cycles'], self.controller.model.currentCycle, name)
+            self.assertEqual(set(algorithm_stats['channels']), {'algorithm_model', 'algorithm_simulator'})
+
+        chatty, quiet = portfolio['PortfolioTestChatty'], portfolio['PortfolioTestQuiet']
+        self.assertEqual(chatty['total_messages'], 2 * chatty['total_computations'])
+        self.assertEqual(quiet['total_messages'], quiet['total_computations'])
+        self.assertGreater(chatty['bytes'], quiet['bytes'])
+        self.assertEqual(self.controller.metrics.get('algorithm_messages'),
+                         chatty['total_messages'] + quiet['total_messages'])
+
+    def test_cost_curve(self):
+        portfolio = self._run()['portfolio']
+        self.assertEqual(portfolio['PortfolioTestQuiet']['cost_curve'], [])
+        curve = portfolio['PortfolioTestChatty']['cost_curve']
+        cycles = [cycle for cycle, _ in curve]
+        costs = [cost for _, cost in curve]
+        self.assertEqual(cycles, sorted(set(cycles)))
+        self.assertEqual(costs, list(range(5, 5 - len(costs), -1)))
+        self.assertEqual(costs[-1], 0) #Recorded only when the cost changes.
+
+    def test_algorithms_see_the_same_dcops(self):
+        self._run(cycles=25)
+        views = [algorithm._DCOP_view['start_cycle'] for algorithm in self.controller.algorithms]
+        self.assertEqual(views, [self.controller.model.currentDCOP['start_cycle']] * 2)
+
+    def test_instrumentation_by_algorithm(self):
+        stats = self._run(cycles=5, instrument=True)
+        self.assertIn('Model', stats['ipc'])
+        for name in self.names:
+            self.assertIn('ipc', stats['portfolio'][name])
+
+    def test_names_must_be_distinct(self):
+        with self.assertRaises(ValueError):
+            self.controller.setup(['PortfolioTestQuiet'] * 2, self.dyndcop)
+        self.assertIs(self.controller.current_state, SimulationController.states.STOPPED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Queue
+from threading import Thread
+
+from common.Profiling import profiled, merge_profiles, summarize, PROFILE_SUFFIX
+
+__author__ = 'Victor Szczepanski'
+
+
+def run(requests, responses):
+    """
+    Answers one request, like the loop of a component.
+    """
+    responses.put(get_stats(requests.get()))
+
+
+def get_stats(request):
+    return sum(range(request))
+
+
+def _profiled_functions(path):
+    return set(function_name for _, _, function_name in pstats.Stats(path).stats)
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _profile_files(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(PROFILE_SUFFIX))
+
+    def test_each_thread_writes_its_own_profile(self):
+        requests = Queue()
+        responses = Queue()
+        threads = [Thread(target=profiled(run, self.directory, 'Model'), args=(requests, responses)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            requests.put(100)
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual([responses.get(timeout=1) for _ in threads], [4950, 4950])
+
+        files = self._profile_files()
+        self.assertEqual(len(files), 2)
+        for f in files:
+            component, function_name = f.split('-')[:2]
+            self.assertEqual((component, function_name), ('Model', 'run'))
+            self.assertTrue({'run', 'get_stats'} <= _profiled_functions(os.path.join(self.directory, f)))
+
+    def test_profile_written_when_target_raises(self):
+        def fail():
+            raise ValueError("Failed")
+        with self.assertRaises(ValueError):
+            profiled(fail, os.path.join(self.directory, 'new'), 'Algorithm')()
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, 'new'))), 1)
+
+    def test_merge_profiles(self):
+        self.assertIsNone(merge_profiles(self.directory))
+        requests = Queue()
+        responses = Queue()
+        for component in ('Model', 'Algorithm', 'Simulator'):
+            requests.put(10)
+            profiled(run, self.directory, component)(requests, responses)
+
+        report_path = merge_profiles(self.directory)
+        self.assertEqual(report_path, os.path.join(self.directory, 'report.txt'))
+        with open(report_path) as report:
+            text = report.read()
+        self.assertIn('PyDynDS profile of 3 threads', text)
+        for category in ('run', 'get_stats', 'ipc'):
+            self.assertIn('    ' + category, text)
+        merged = os.path.join(self.directory, 'merged' + PROFILE_SUFFIX)
+        self.assertEqual(pstats.Stats(merged).total_calls,
+                         sum(pstats.Stats(os.path.join(self.directory, f)).total_calls
+                             for f in self._profile_files() if f != 'merged' + PROFILE_SUFFIX))
+
+        merge_profiles(self.directory) #The merged profile is not merged into itself.
+        with open(report_path) as report:
+            self.assertIn('PyDynDS profile of 3 threads', report.read())
+
+    def test_summarize(self):
+        requests = Queue()
+        requests.put(10)
+        profiled(run, self.directory, 'Model')(requests, Queue())
+        summary = summarize(pstats.Stats(os.path.join(self.directory, self._profile_files()[0])))
+        self.assertEqual(set(summary), {'run', '_update', 'ready', 'get_stats', 'ipc'})
+        self.assertGreater(summary['run'], 0)
+        self.assertGreater(summary['ipc'], 0)
+        self.assertLessEqual(summary['ipc'], summary['run'])
+        self.assertEqual(summary['_update'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
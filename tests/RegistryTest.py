@@ -0,0 +1,126 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from Algorithms import Registry
+from Algorithms.Algorithm import Algorithm, SampleAlgorithm
+
+__author__ = 'Victor Szczepanski'
+
+
+class _EntryPoint(object):
+
+    def __init__(self, algorithm_class):
+        self.algorithm_class = algorithm_class
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self.algorithm_class
+
+
+class RegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        sys.path.insert(0, self.directory)
+        self.modules = []
+        self.names = []
+        Registry.clear_cache()
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        for module_name in self.modules:
+            sys.modules.pop(module_name, None)
+            if module_name in Registry._modules:
+                Registry._modules.remove(module_name)
+        for name in self.names:
+            Registry._specs.pop(name, None)
+        Registry.clear_cache()
+        shutil.rmtree(self.directory)
+
+    def _module(self, module_name, *class_names):
+        """
+        Writes a module defining a subclass of SampleAlgorithm for each of `class_names`, without importing it.
+        """
+        with open(os.path.join(self.directory, module_name + '.py'), 'w') as f:
+            f.write('from Algorithms.Algorithm import SampleAlgorithm\n')
+            for class_name in class_names:
+                f.write('\n\nclass ' + class_name + '(SampleAlgorithm):\n    pass\n')
+        self.modules.append(module_name)
+        self.names.extend(class_names)
+
+    def test_registered_spec_is_imported_on_lookup(self):
+        self._module('registry_test_spec', 'RegistryTestSpec')
+        Registry.register('RegistryTestSpec', 'registry_test_spec:RegistryTestSpec')
+        self.assertNotIn('registry_test_spec', sys.modules)
+        algorithm_class = Registry.get_algorithm_class('RegistryTestSpec')
+        self.assertIn('registry_test_spec', sys.modules)
+        self.assertEqual(algorithm_class.__module__, 'registry_test_spec')
+
+    def test_imported_subclass_at_any_depth(self):
+        self.assertIs(Registry.get_algorithm_class('SampleAlgorithm'), SampleAlgorithm)
+
+        class RegistryTestDeep(SampleAlgorithm):
+            pass
+        self.assertIs(Registry.get_algorithm_class('RegistryTestDeep'), RegistryTestDeep)
+
+    def test_configured_modules_are_imported_only_when_needed(self):
+        self._module('registry_test_module', 'RegistryTestModule')
+        self._module('registry_test_environment', 'RegistryTestEnvironment')
+        Registry.register_module('registry_test_module')
+        with mock.patch.dict(os.environ, {Registry.MODULES_ENVIRONMENT_VARIABLE: ' registry_test_environment, '}):
+            self.assertIs(Registry.get_algorithm_class('SampleAlgorithm'), SampleAlgorithm)
+            self.assertNotIn('registry_test_module', sys.modules)
+            self.assertNotIn('registry_test_environment', sys.modules)
+
+            self.assertEqual(Registry.get_algorithm_class('RegistryTestEnvironment').__module__,
+                             'registry_test_environment')
+            self.assertIn('registry_test_module', sys.modules) #Searched first, and not found there.
+        self.assertEqual(Registry.get_algorithm_class('RegistryTestModule').__module__, 'registry_test_module')
+
+    def test_lookup_order(self):
+        class RegistryTestOrder(SampleAlgorithm):
+            pass
+        self.assertIs(Registry.get_algorithm_class('RegistryTestOrder'), RegistryTestOrder)
+
+        #An entry point comes before an imported subclass.
+        Registry.clear_cache()
+        entry_point = _EntryPoint(SampleAlgorithm)
+        with mock.patch.object(Registry, '_entry_point', lambda name: entry_point):
+            self.assertIs(Registry.get_algorithm_class('RegistryTestOrder'), SampleAlgorithm)
+
+            #A registered spec comes before an entry point. Registering replaces the cached class.
+            self._module('registry_test_order', 'RegistryTestOrder')
+            Registry.register('RegistryTestOrder', 'registry_test_order:RegistryTestOrder')
+            self.assertEqual(Registry.get_algorithm_class('RegistryTestOrder').__module__, 'registry_test_order')
+        self.assertEqual(entry_point.loads, 1)
+
+    def test_cache(self):
+        entry_point = _EntryPoint(SampleAlgorithm)
+        with mock.patch.object(Registry, '_entry_point', lambda name: entry_point):
+            for _ in range(3):
+                self.assertIs(Registry.get_algorithm_class('RegistryTestCached'), SampleAlgorithm)
+            self.assertEqual(entry_point.loads, 1)
+            Registry.clear_cache()
+            Registry.get_algorithm_class('RegistryTestCached')
+            self.assertEqual(entry_point.loads, 2)
+
+    def test_not_found_is_not_cached(self):
+        self.assertIsNone(Registry.get_algorithm_class('RegistryTestMissing'))
+        self.assertNotIn('RegistryTestMissing', Registry._cache)
+        with self.assertRaises(NotImplementedError):
+            Algorithm.factory('RegistryTestMissing')
+
+    def test_not_an_algorithm(self):
+        self.names.append('RegistryTestNotAnAlgorithm')
+        Registry.register('RegistryTestNotAnAlgorithm', 'os.path:join')
+        with self.assertRaises(TypeError):
+            Registry.get_algorithm_class('RegistryTestNotAnAlgorithm')
+
+
+if __name__ == '__main__':
+    unittest.main()
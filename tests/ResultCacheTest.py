@@ -0,0 +1,137 @@
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+from threading import Thread
+
+from Benchmarks.Generators import graph_coloring
+from DCOP.DCOP import DCOP
+from DCOP.Tables import DenseTable, SparseTable, FunctionalTable
+from common.ResultCache import ResultCache, result_key, snapshot_digest
+
+__author__ = 'Victor Szczepanski'
+
+
+class _CountingCost(object):
+    """
+    A picklable cost function that counts its calls.
+    """
+    calls = 0
+
+    def __call__(self, *values):
+        _CountingCost.calls += 1
+        return sum(values)
+
+
+def _scaled_cost(scale, *values):
+    return scale * sum(values)
+
+
+def _snapshot(table, start_cycle=0):
+    return {'start_cycle': start_cycle, 'variables': ['v0', 'v1'], 'domains': {'v0': 3, 'v1': 3},
+            'constraints': [(('v0', 'v1'), table)]}
+
+
+class SnapshotDigestTest(unittest.TestCase):
+
+    def test_canonical(self):
+        snapshot = graph_coloring(6, num_steps=1, seed=2)[0]
+        reordered = dict(snapshot, start_cycle=100, variables=list(reversed(snapshot['variables'])),
+                         constraints=list(reversed(snapshot['constraints'])))
+        self.assertEqual(snapshot_digest(snapshot), snapshot_digest(reordered))
+        self.assertEqual(snapshot_digest(snapshot), snapshot_digest(DCOP.from_snapshot(snapshot)))
+
+    def test_costs_change_digest(self):
+        table = [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+        changed = [[0, 1, 2], [3, 4, 5], [6, 7, 9]]
+        self.assertNotEqual(snapshot_digest(_snapshot(table)), snapshot_digest(_snapshot(changed)))
+        self.assertEqual(snapshot_digest(_snapshot(table)), snapshot_digest(_snapshot(DenseTable((3, 3), table))))
+
+    def test_sparse_and_dict_tables(self):
+        sparse = SparseTable((3, 3), 0, {(0, 0): 5, (2, 1): 1})
+        self.assertEqual(snapshot_digest(_snapshot(sparse)), snapshot_digest(_snapshot({(2, 1): 1, (0, 0): 5})))
+        self.assertNotEqual(snapshot_digest(_snapshot(sparse)),
+                            snapshot_digest(_snapshot(SparseTable((3, 3), 1, {(0, 0): 5, (2, 1): 1}))))
+
+    def test_functional_tables_are_not_expanded(self):
+        _CountingCost.calls = 0
+        table = FunctionalTable((10 ** 6, 10 ** 6), _CountingCost())
+        snapshot = {'start_cycle': 0, 'variables': ['v0', 'v1'], 'domains': {'v0': 10 ** 6, 'v1': 10 ** 6},
+                    'constraints': [(('v0', 'v1'), table)]}
+        snapshot_digest(snapshot)
+        self.assertEqual(_CountingCost.calls, 0)
+
+        double = FunctionalTable((3, 3), functools.partial(_scaled_cost, 2))
+        triple = FunctionalTable((3, 3), functools.partial(_scaled_cost, 3))
+        self.assertNotEqual(snapshot_digest(_snapshot(double)), snapshot_digest(_snapshot(triple)))
+
+    def test_result_key(self):
+        snapshot = _snapshot([[0] * 3] * 3)
+        key = result_key(snapshot, 'A', 1, {'p': 1})
+        self.assertEqual(key, result_key(snapshot, 'A', 1, {'p': 1}))
+        self.assertNotEqual(key, result_key(snapshot, 'A', 2, {'p': 1}))
+        self.assertNotEqual(key, result_key(snapshot, 'A', 1, {'p': 2}))
+        self.assertNotEqual(key, result_key(snapshot, 'B', 1, {'p': 1}))
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_and_get(self):
+        cache = ResultCache(self.directory)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', {'cost': 3})
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get('a'), {'cost': 3})
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get('a'), ResultCache(self.directory).get('a'))
+
+    def test_replacing_does_not_grow_size(self):
+        cache = ResultCache(self.directory)
+        cache.put('a', {'solution': list(range(100))})
+        for _ in range(10):
+            cache.put('a', {'solution': list(range(100))})
+        self.assertEqual(cache._size, cache.size)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.directory)
+        for age, key in enumerate(('old', 'used', 'new')):
+            cache.put(key, {'solution': list(range(100))})
+            os.utime(cache._path(key), (1000 + age, 1000 + age))
+        cache.get('used')
+        cache.evict(cache.size - 1)
+        self.assertEqual(('old' in cache, 'used' in cache, 'new' in cache), (False, True, True))
+
+        cache.max_bytes = 0
+        cache.put('newest', {})
+        self.assertEqual(len(cache), 0)
+
+    def test_concurrent_puts_of_one_key(self):
+        cache = ResultCache(self.directory)
+        errors = []
+
+        def put(value):
+            try:
+                for _ in range(50):
+                    cache.put('a', {'value': value})
+            except Exception as error:
+                errors.append(error)
+
+        threads = [Thread(target=put, args=(value,)) for value in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertIn(cache.get('a')['value'], range(4))
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(cache._path('a'))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from common.Results import ResultsWriter, read_results, COLUMNS
+
+__author__ = 'Victor Szczepanski'
+
+
+class ResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_csv_round_trip(self):
+        writer = ResultsWriter(self.path, chunk_size=3)
+        for cycle in range(10):
+            writer.write_row(cycle, cycle * 2, cycle, cycle * 8, 1, None if cycle == 0 else 5.5, 0)
+        writer.close()
+
+        results = read_results(self.path)
+        self.assertEqual(sorted(results), sorted(COLUMNS))
+        self.assertEqual(results['cycle'], [float(cycle) for cycle in range(10)])
+        self.assertEqual(results['messages_sent'], [float(cycle * 2) for cycle in range(10)])
+        self.assertEqual(results['current_cost'], [None] + [5.5] * 9)
+
+    def test_selected_columns(self):
+        writer = ResultsWriter(self.path)
+        writer.write_row(*range(len(COLUMNS)))
+        writer.close()
+        self.assertEqual(read_results(self.path, ['cycle', 'bytes']), {'cycle': [0.0], 'bytes': [3.0]})
+
+    def test_replaces_existing_file(self):
+        for cycle in range(2):
+            writer = ResultsWriter(self.path)
+            writer.write_row(cycle, 0, 0, 0, 0, 0, 0)
+            writer.close()
+        self.assertEqual(read_results(self.path)['cycle'], [1.0])
+
+    def test_appends_to_existing_file_with_one_header(self):
+        for cycle in range(2):
+            writer = ResultsWriter(self.path, append=True)
+            writer.write_row(cycle, 0, 0, 0, 0, 0, 0)
+            writer.close()
+        with open(self.path) as f:
+            self.assertEqual(sum(1 for line in f if line.startswith('cycle')), 1)
+        self.assertEqual(read_results(self.path)['cycle'], [0.0, 1.0])
+
+    def test_flushes_after_interval(self):
+        writer = ResultsWriter(self.path, chunk_size=1000, flush_interval=0)
+        writer.write_row(0, 0, 0, 0, 0, 0, 0)
+        self.assertEqual(writer._rows, 0)
+        writer.close()
+        self.assertEqual(read_results(self.path)['cycle'], [0.0])
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            ResultsWriter(self.path, 'xlsx')
+
+
+if __name__ == '__main__':
+    unittest.main()
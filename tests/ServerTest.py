@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+
+from Server import SimulationServer, submit, write_token, read_token
+from SimulationController import SimulationController
+from Benchmarks.Generators import graph_coloring
+from common.DynDCOPFile import save_dyndcop, load_dyndcop
+
+__author__ = 'Victor Szczepanski'
+
+
+class DynDCOPFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_untrusted_files_must_be_json(self):
+        dyndcop = graph_coloring(4, num_steps=2, seed=0)
+        json_path = os.path.join(self.directory, 'dyndcop.json')
+        pickle_path = os.path.join(self.directory, 'dyndcop.pickle')
+        save_dyndcop(dyndcop, json_path)
+        save_dyndcop(dyndcop, pickle_path)
+        self.assertEqual(load_dyndcop(json_path, trusted=False), load_dyndcop(pickle_path))
+        with self.assertRaises(ValueError):
+            load_dyndcop(pickle_path, trusted=False)
+
+
+class FailedSetupTest(unittest.TestCase):
+
+    def test_failed_setup_stops_components(self):
+        controller = SimulationController(log_level=logging.CRITICAL)
+        with self.assertRaises(NotImplementedError):
+            controller.setup('NoSuchAlgorithm', graph_coloring(4, num_steps=2, seed=0))
+        self.assertIs(controller.current_state, SimulationController.states.STOPPED)
+        control_threads = [thread for thread in threading.enumerate() if '(_control)' in thread.name]
+        for thread in control_threads:
+            thread.join(5)
+        self.assertEqual([thread for thread in control_threads if thread.is_alive()], [])
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dyndcop_path = os.path.join(self.directory, 'dyndcop.json')
+        save_dyndcop(graph_coloring(5, num_steps=2, seed=1), self.dyndcop_path)
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            self._call(self._close(server))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    async def _close(self, server):
+        server.close()
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(60)
+
+    def _start(self, max_jobs=1, token=None, tcp=False):
+        server = SimulationServer(max_jobs, logging.CRITICAL, token)
+        self.servers.append(server)
+        if tcp:
+            listener = self._call(server.start(host='127.0.0.1', port=0))
+            return {'port': listener.sockets[0].getsockname()[1]}
+        socket_path = os.path.join(self.directory, 'server.sock')
+        self._call(server.start(socket_path))
+        return {'socket_path': socket_path}
+
+    def _job(self, **job):
+        return dict({'dyndcop': self.dyndcop_path, 'algorithm': 'SampleAlgorithm', 'message_delay': 1,
+                     'computation_cost': 1}, **job)
+
+    def test_synchronous_job(self):
+        address = self._start()
+        self.assertEqual(stat.S_IMODE(os.stat(address['socket_path']).st_mode), 0o600)
+        messages = list(submit(self._job(cycles=150), **address))
+        self.assertEqual([message['status'] for message in messages], ['running', 'stats', 'stats', 'done'])
+        self.assertEqual(messages[-1]['metrics']['cycle'], messages[-2]['metrics']['cycle'])
+        self.assertGreater(messages[-1]['stats']['total_messages'], 0)
+
+    def test_invalid_jobs(self):
+        address = self._start()
+        pickle_path = os.path.join(self.directory, 'dyndcop.pickle')
+        save_dyndcop(graph_coloring(5, num_steps=2, seed=1), pickle_path)
+        for job, error in ((self._job(dyndcop=pickle_path, cycles=1), 'Only JSON'),
+                           (self._job(algorithm='NoSuchAlgorithm'), 'Unknown algorithm'),
+                           ({'algorithm': 'SampleAlgorithm'}, 'needs a')):
+            messages = list(submit(job, **address))
+            self.assertEqual(messages[-1]['status'], 'error')
+            self.assertIn(error, messages[-1]['error'])
+        #The worker is still usable after a failed job.
+        self.assertEqual(list(submit(self._job(cycles=1), **address))[-1]['status'], 'done')
+
+    def test_tcp_requires_token(self):
+        with self.assertRaises(ValueError):
+            self._start(tcp=True)
+        token_path = os.path.join(self.directory, 'token')
+        token = write_token(token_path)
+        self.assertEqual(stat.S_IMODE(os.stat(token_path).st_mode), 0o600)
+        self.assertEqual(read_token(token_path), token)
+        address = self._start(token=token, tcp=True)
+        self.assertEqual(list(submit(self._job(cycles=1), token='wrong', **address))[-1],
+                         {'status': 'error', 'error': 'Invalid token.'})
+        self.assertEqual(list(submit(self._job(cycles=1), token=token, **address))[-1]['status'], 'done')
+
+    def test_jobs_queue_for_workers(self):
+        address = self._start(max_jobs=1)
+        results = {}
+
+        def run(name, job):
+            results[name] = list(submit(job, **address))
+
+        first = threading.Thread(target=run, args=('first', self._job(duration=2, stats_interval=0.5)))
+        first.start()
+        while 'first' not in results and not self.servers[0]._idle.empty():
+            pass
+        second = threading.Thread(target=run, args=('second', self._job(cycles=1)))
+        second.start()
+        first.join(60)
+        second.join(60)
+        self.assertEqual(results['first'][-1]['status'], 'done')
+        self.assertEqual(results['second'][0], {'status': 'queued', 'position': 1})
+        self.assertEqual(results['second'][-1]['status'], 'done')
+
+    def test_jobs_run_in_separate_worker_processes(self):
+        address = self._start(max_jobs=2)
+        pids = set(worker.process.pid for worker in self.servers[0]._workers)
+        self.assertEqual(len(pids), 2)
+        self.assertNotIn(os.getpid(), pids)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(list(submit(self._job(duration=1), **address))))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+        self.assertEqual([messages[0]['status'] for messages in results], ['running', 'running'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import pickle
+import unittest
+
+from DCOP.Tables import DenseTable, SparseTable, FunctionalTable, make_table
+
+__author__ = 'Victor Szczepanski'
+
+
+def _difference(a, b):
+    return abs(a - b)
+
+
+#Costs of a 2 x 3 table, indexed by the value of the first variable, then the second.
+_COSTS = [[4, 0, 2], [1, 5, 3]]
+
+
+class TablesTest(unittest.TestCase):
+
+    def assertCosts(self, table):
+        self.assertEqual(table.num_assignments, 6)
+        self.assertEqual([(assignment, cost) for assignment, cost in table.costs()],
+                         [((a, b), _COSTS[a][b]) for a in range(2) for b in range(3)])
+        self.assertEqual(table[(1, 2)], 3)
+        self.assertEqual((table.min_cost(), table.max_cost()), (0, 5))
+        self.assertEqual(table.min_over(0), [0, 1])
+        self.assertEqual(table.min_over(1), [1, 0, 2])
+
+    def test_dense(self):
+        table = DenseTable((2, 3), _COSTS)
+        self.assertCosts(table)
+        self.assertCosts(DenseTable((2, 3), [4, 0, 2, 1, 5, 3]))
+        self.assertCosts(pickle.loads(pickle.dumps(table)))
+        self.assertIs(table.to_dense(), table)
+        self.assertEqual(table.nbytes, 6 * 8)
+        with self.assertRaises(ValueError):
+            DenseTable((2, 2), _COSTS)
+
+    def test_sparse(self):
+        table = SparseTable((2, 3), 0, dict(((a, b), _COSTS[a][b]) for a in range(2) for b in range(3)
+                                             if _COSTS[a][b] != 0))
+        self.assertCosts(table)
+        self.assertCosts(table.to_dense())
+
+        sparse = SparseTable((3, 3), 2, {(0, 0): 7, (1, 1): 0})
+        self.assertAlmostEqual(sparse.density, 2 / 9)
+        self.assertEqual((sparse.min_cost(), sparse.max_cost()), (0, 7))
+        self.assertEqual(sparse.min_over(0), [2, 0, 2])
+
+    def test_sparse_without_default_assignments(self):
+        table = SparseTable((2,), 0, {(0,): 3, (1,): 4})
+        self.assertEqual((table.min_cost(), table.max_cost()), (3, 4))
+        self.assertEqual(table.min_over(0), [3, 4])
+
+    def test_functional(self):
+        table = FunctionalTable((3, 3), _difference)
+        self.assertEqual(table[(0, 2)], 2)
+        self.assertEqual(table.min_over(0), [0, 0, 0])
+        self.assertEqual(table.max_cost(), 2)
+        self.assertEqual(table.nbytes, 0)
+        self.assertEqual(pickle.loads(pickle.dumps(table))[(2, 0)], 2)
+
+    def test_make_table(self):
+        self.assertIsInstance(make_table((3, 3), function=_difference), FunctionalTable)
+        self.assertIsInstance(make_table((2, 3), _COSTS), DenseTable)
+
+        mostly_one = [[1, 1, 1], [1, 1, 9]]
+        table = make_table((2, 3), mostly_one)
+        self.assertIsInstance(table, SparseTable)
+        self.assertEqual((table.default, table.exceptions), (1, {(1, 2): 9}))
+
+        table = make_table((3, 3), {(0, 1): 5, (2, 2): 0})
+        self.assertIsInstance(table, SparseTable)
+        self.assertEqual((table.default, table.exceptions), (0, {(0, 1): 5}))
+        self.assertIsInstance(make_table((2,), {(0,): 1, (1,): 2}), DenseTable)
+
+
+if __name__ == '__main__':
+    unittest.main()
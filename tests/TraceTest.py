@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from Benchmarks.Generators import graph_coloring
+from Model.Model import Model
+from common.Computation import Computation
+from common.IDGenerator import IDGenerator
+from common.Message import Message
+from common.Trace import TraceWriter, TraceReader, InvalidTrace, RECORD_MESSAGE, RECORD_COMPUTATION, RECORD_CYCLE
+
+__author__ = 'Victor Szczepanski'
+
+
+def _message(message_id, source, destination, start_cycle, delivery_cycle, size):
+    message = Message(source, destination, size=size)
+    message.id = message_id
+    message.startCycle = start_cycle
+    message.deliveryCycle = delivery_cycle
+    return message
+
+
+def _computation(computation_id, agent, start_cycle, end_cycle, operations, cpu_time):
+    computation = Computation(agent, operations=operations, cpu_time=cpu_time)
+    computation.id = computation_id
+    computation.startCycle = start_cycle
+    computation.endCycle = end_cycle
+    return computation
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trace.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_run(self, cycles):
+        writer = TraceWriter(self.path)
+        for cycle in cycles:
+            writer.write_message(_message(cycle, 'v1', 'v2', cycle - 1, cycle, 10))
+            writer.write_cycle(cycle)
+        writer.close()
+
+    def test_round_trip(self):
+        writer = TraceWriter(self.path)
+        writer.write_message(_message(1, 'v1', 'v2', 0, 3, 42))
+        writer.write_computation(_computation(1, 'v1', 0, 2, 9, 0.5))
+        writer.write_cycle(3)
+        writer.write_cycle(3)
+        writer.close()
+
+        records = list(TraceReader(self.path).records())
+        self.assertEqual(records, [(RECORD_MESSAGE, 1, 0, 3, 42, 'v1', 'v2'),
+                                   (RECORD_COMPUTATION, 1, 0, 2, 9, 0.5, 'v1'),
+                                   (RECORD_CYCLE, 3), (RECORD_CYCLE, 3)])
+        updates = list(TraceReader(self.path).updates())
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(updates[1], ([], [], 3))
+
+    def test_message_size(self):
+        message = _message(1, 'v1', 'v2', 0, 3, 42)
+        message.data = [1, 2.0, 'ab'] #Recorded with the message's size, not the size of its data.
+        sizeless = _message(2, 'v1', 'v2', 0, 3, None)
+        del sizeless.size
+        sizeless.data = 'abcd'
+        writer = TraceWriter(self.path)
+        writer.write_message(message)
+        writer.write_message(message, size=7)
+        writer.write_message(sizeless)
+        writer.close()
+        self.assertEqual([record[4] for record in TraceReader(self.path).records()], [42, 7, 4])
+
+    def test_truncated_record_is_ignored(self):
+        self._write_run([1, 2])
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual([cycle for _, _, cycle in TraceReader(self.path).updates()], [1])
+
+    def test_new_run_replaces_old_trace(self):
+        self._write_run([1, 2, 3])
+        self._write_run([5])
+        self.assertEqual([cycle for _, _, cycle in TraceReader(self.path).updates()], [5])
+
+    def test_not_a_trace(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a trace file')
+        with self.assertRaises(InvalidTrace):
+            TraceReader(self.path)
+
+    def test_replay_reproduces_cycles(self):
+        live = Model(message_delay=2, computation_cost=3, trace_path=self.path)
+        live._trace_writer = TraceWriter(self.path)
+        live._advance([Message('v1', 'v2', size=8)], [Computation('v1')])
+        live._advance([Message('v2', 'v1', size=8), Message('v2', 'v3', size=8)], [])
+        live._advance([], [])
+        live._trace_writer.close()
+
+        replayed = Model(message_delay=2, computation_cost=3).replay(self.path)
+        self.assertEqual(replayed, {'cycle': live.currentCycle, 'total_messages': 3, 'total_computations': 1})
+        self.assertEqual(live.currentCycle, 5)
+
+    def test_replay_uses_recorded_ids_and_cycles(self):
+        dyndcop = graph_coloring(5, num_steps=3, step_cycles=4, seed=1)
+        live = Model(message_delay=2, computation_cost=3, message_id_counter=IDGenerator.make_counter())
+        live._messageIDs.skip_to(100)
+        live._trace_writer = TraceWriter(self.path)
+        live._advance([Message('v1', 'v2', size=8)], [Computation('v1')])
+        live._advance([Message('v2', 'v1', size=8), Message('v2', 'v3', size=8)], [])
+        live._trace_writer.close()
+
+        replay_path = os.path.join(self.directory, 'replay.bin')
+        replaying = Model(dyn_dcop=dyndcop, message_delay=9, computation_cost=1)
+        replaying._trace_writer = TraceWriter(replay_path)
+        replayed = replaying.replay(self.path)
+        replaying._trace_writer.close()
+        self.assertEqual(replayed, {'cycle': 5, 'total_messages': 3, 'total_computations': 1})
+        self.assertEqual(list(TraceReader(replay_path).records()), list(TraceReader(self.path).records()))
+        self.assertEqual(replaying.currentDCOP['start_cycle'], 4)
+        self.assertGreater(replaying._messageIDs.nextID(), 102)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,7 @@
+import os
+import sys
+
 __author__ = 'greenpants'
+
+# The PyDynDS modules import each other from the pydynds directory, as they do when run from it.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pydynds'))